@@ -1,4 +1,13 @@
 # Ejecutar la aplicación
 if __name__ == "__main__":
+    import os
+    import sys
+
+    # Con `python -m app` el nombre `app` es este directorio (un paquete) y no
+    # `app.py`; los módulos se importan sin paquete, como con `python app`
+    APP_DIR = os.path.dirname(os.path.abspath(__file__))
+    if sys.path[0] != APP_DIR:
+        sys.path.insert(0, APP_DIR)
+        sys.modules.pop("app", None)
     from app import main
     main()
@@ -1,29 +1,130 @@
 """
 Main Application - Orquesta todas las clases del sistema
 """
-from database import DatabaseManager
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, List
+
+from database import BACKENDS, DatabaseManager
 from user_manager import UserManager
 from resource_manager import ResourceManager
-from reservation_manager import ReservationManager
+from reservation_manager import BATCH_MODES, ReservationManager
 from menu_manager import MenuManager
+from journal import ReservationJournal, UserJournal
+from archive import COMPRESSIONS, ReservationArchive
+from binary_store import read_binary, write_binary
+from sqlite_store import migrate_json_to_sqlite
+from server import serve
+from auth import DEFAULT_SESSION_TTL, SESSION_SECRET_ENV
+from metrics import METRICS
+from serialization import CODECS, DEFAULT_CODEC
 
 
 class ReservationApp:
     """Aplicación principal de gestión de reservas"""
     
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, backend: str = "json", journal: bool = False,
+                 compact_max_bytes: int = 4 * 1024 * 1024, compact_interval: float = 3600.0,
+                 metrics: bool = False, archive_compression: str = "gzip",
+                 auto_archive: bool = False, group_commit: float = None,
+                 group_commit_batch: int = 64, codecs: Dict[str, str] = None,
+                 default_codec: str = DEFAULT_CODEC, journal_sync: bool = True):
         """
         Inicializa la aplicación.
         
         Args:
             base_dir: Directorio base para los archivos JSON
+            backend: Motor de almacenamiento ('json' o 'sqlite')
+            journal: Si es True reservas y usuarios se guardan en modo journal (solo 'json')
+            compact_max_bytes: Tamaño del journal que dispara la compactación
+            compact_interval: Segundos entre compactaciones si hay registros pendientes
+            metrics: Si es True se activa `metrics.METRICS` y se miden los métodos
+                de los Managers (sin esta opción la instrumentación no cuesta nada)
+            archive_compression: Compresión de las particiones de `archive/`
+                ('gzip' o 'lzma', ver `archive.COMPRESSIONS`)
+            auto_archive: Si es True, al arrancar se archivan las reservas de
+                meses ya cerrados (`ReservationManager.archive_past`)
+            group_commit: Si se indica (segundos), las escrituras se agrupan y
+                se guardan con `fsync` como mucho cada `group_commit` segundos
+                (ver `GroupCommit`; solo 'json' sin journal)
+            group_commit_batch: Cambios que disparan la escritura del grupo sin esperar
+            codecs: Codec de cada archivo (`{'reservations.json': 'pickle'}`,
+                ver `serialization.CODECS`; solo 'json')
+            default_codec: Codec del resto de archivos ('json-pretty' por defecto)
+            journal_sync: Si es True (por defecto) cada registro del journal se
+                escribe con `fsync` antes de confirmarse (ver `JsonJournal`)
         """
+        if journal and backend != "json":
+            raise ValueError("Journal mode is only available with the 'json' backend")
+        if journal and group_commit is not None:
+            raise ValueError("Group commit cannot be combined with journal mode")
+        
         # Inicializar componentes
-        self.db = DatabaseManager(base_dir)
-        self.user_mgr = UserManager(self.db)
+        self.db = DatabaseManager(base_dir, backend=backend, group_commit_interval=group_commit,
+                                  group_commit_batch=group_commit_batch, codecs=codecs,
+                                  default_codec=default_codec)
+        self.journal = None
+        self.user_journal = None
+        if journal:
+            self.journal = ReservationJournal(self.db, compact_max_bytes=compact_max_bytes,
+                                              compact_interval=compact_interval, sync=journal_sync)
+            self.user_journal = UserJournal(self.db, compact_max_bytes=compact_max_bytes,
+                                            compact_interval=compact_interval, sync=journal_sync)
+        self.user_mgr = UserManager(self.db, self.user_journal)
         self.resource_mgr = ResourceManager(self.db)
-        self.reservation_mgr = ReservationManager(self.db, self.resource_mgr)
+        self.archive = ReservationArchive(self.db, compression=archive_compression)
+        self.reservation_mgr = ReservationManager(self.db, self.resource_mgr, self.journal,
+                                                  self.archive)
         self.menu_mgr = MenuManager(self.user_mgr, self.resource_mgr, self.reservation_mgr)
+        if metrics:
+            self._instrument()
+        if journal:
+            self.recover()
+        if auto_archive:
+            ok, _ = self.reservation_mgr.archive_past()
+            if not ok:
+                print("Error archiving past reservations.")
+    
+    def _instrument(self) -> None:
+        """Activa la instrumentación y envuelve los métodos de los Managers.
+
+        Además de los públicos se miden los privados donde suele ir el tiempo:
+        lectura/parseo de archivos, índices y el KDF.
+        """
+        METRICS.enable()
+        METRICS.instrument(self.db, "DatabaseManager", ("_load_entry", "_write_atomic"))
+        METRICS.instrument(self.resource_mgr, "ResourceManager")
+        METRICS.instrument(self.reservation_mgr, "ReservationManager",
+                           ("_rebuild_indexes", "_transact", "_prepare_vehicle", "_prepare_hotel"))
+        METRICS.instrument(self.user_mgr, "UserManager",
+                           ("_find_user", "_get_index", "_hash_password", "_verify_password"))
+    
+    def recover(self) -> None:
+        """Recuperación de los journals al arrancar (ver `JsonJournal.recover`).
+
+        Avisa si se descartó un registro a medio escribir o si un snapshot no
+        se puede leer; el tiempo queda en `stats()` de cada journal y, con
+        `--metrics`, en los histogramas `<Clase>.recover`.
+        """
+        for journal in (self.journal, self.user_journal):
+            report = journal.recover()
+            if report["torn_bytes"]:
+                print(f"Recovered {journal.journal_file}: discarded {report['torn_bytes']} byte(s) "
+                      f"of an unfinished record.")
+            if report["damaged"]:
+                print(f"Warning: {journal.snapshot_file} is unreadable; changes are refused "
+                      f"until it is restored.")
+    
+    def shutdown(self) -> None:
+        """Persiste el estado en memoria que se reutiliza al arrancar (libro de ocupación).
+
+        Antes escribe lo que quede pendiente del group commit, y lo detiene al final.
+        """
+        self.db.flush()
+        self.reservation_mgr.save_ledger()
+        self.db.close()
     
     def run(self) -> None:
         """Inicia la aplicación"""
@@ -41,10 +142,331 @@ class ReservationApp:
             print("Thank you for using our system!")
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """Construye el parser de la línea de comandos (`python app [comando]`)."""
+    parser = argparse.ArgumentParser(prog="app", description="Reservation Management System")
+    parser.add_argument("--base-dir", default=None,
+                        help="Directory holding the data files (default: the app directory)")
+    parser.add_argument("--backend", choices=BACKENDS, default="json",
+                        help="Storage backend (default: json)")
+    parser.add_argument("--journal", action="store_true",
+                        help="Append reservation and user changes to reservations.journal and "
+                             "login.journal (json backend)")
+    parser.add_argument("--compact-bytes", type=int, default=4 * 1024 * 1024,
+                        help="Journal size in bytes that triggers compaction (0 disables)")
+    parser.add_argument("--compact-interval", type=float, default=3600.0,
+                        help="Seconds between compactions when the journal is not empty (0 disables)")
+    parser.add_argument("--no-journal-fsync", dest="journal_fsync", action="store_false",
+                        help="Do not fsync each journal record (faster; a power cut may lose the "
+                             "last changes)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record per-method latency histograms and I/O counters")
+    parser.add_argument("--archive-compression", choices=sorted(COMPRESSIONS), default="gzip",
+                        help="Compression of the monthly archive partitions (default: gzip)")
+    parser.add_argument("--auto-archive", action="store_true",
+                        help="Archive reservations that ended before the current month at startup")
+    parser.add_argument("--group-commit", type=float, default=None, metavar="MS",
+                        help="Coalesce concurrent writes into one fsync'ed write at most every MS "
+                             "milliseconds (json backend without --journal)")
+    parser.add_argument("--group-commit-batch", type=int, default=64,
+                        help="Changes that trigger a group commit write before MS elapses (default: 64)")
+    parser.add_argument("--codec", action="append", default=[], metavar="[FILE=]CODEC",
+                        help=f"Format used to write FILE, or every file without FILE= "
+                             f"({', '.join(CODECS)}; default: {DEFAULT_CODEC}). Reads detect the "
+                             f"format, so existing files convert on their next write. Repeatable")
+    commands = parser.add_subparsers(dest="command")
+    
+    commands.add_parser("run", help="Start the interactive menu (default)")
+    
+    migrate = commands.add_parser("migrate-sqlite", help="Import the JSON files into a SQLite database")
+    migrate.add_argument("--sqlite-file", default="reservations.db",
+                         help="Database file name inside --base-dir (default: reservations.db)")
+    
+    commands.add_parser("compact", help="Fold the journals into fresh reservations.json and login.json")
+    
+    check = commands.add_parser("check-ledger",
+                                help="Compare the daily occupancy ledger with a full recount")
+    check.add_argument("--repair", action="store_true", help="Rebuild the ledger if it differs")
+    
+    archive = commands.add_parser("archive",
+                                  help="Move reservations of past months to compressed monthly partitions")
+    archive.add_argument("--before", type=date.fromisoformat, default=None,
+                         help="Archive what ended before the first day of this date's month, "
+                              "YYYY-MM-DD (default: today)")
+    
+    export = commands.add_parser("export-binary",
+                                 help="Write the reservations to a memory-mappable binary file")
+    export.add_argument("--output", default="reservations.bin",
+                        help="Binary file (default: reservations.bin inside --base-dir)")
+    
+    load = commands.add_parser("import-binary",
+                               help="Replace the reservations with the contents of a binary file")
+    load.add_argument("binary_file", help="File written by export-binary")
+    
+    batch = commands.add_parser("book-batch", help="Book every request of a JSON file in one pass")
+    batch.add_argument("requests_file",
+                       help="JSON file with a list of booking requests (see ReservationManager.book_batch)")
+    batch.add_argument("--mode", choices=BATCH_MODES, default="best-effort",
+                       help="best-effort saves the valid requests; all-or-nothing saves none if any fails")
+    batch.add_argument("--output", default=None,
+                       help="Write the per-request results to this JSON file")
+    
+    report = commands.add_parser("report", help="Occupancy, availability and revenue for a period")
+    report.add_argument("--from", dest="start", type=date.fromisoformat, default=None,
+                        help="First day, YYYY-MM-DD (default: today)")
+    report.add_argument("--days", type=int, default=30, help="Number of days (default: 30)")
+    report.add_argument("--type", dest="reservation_type", choices=("vehicle", "hotel"), default=None,
+                        help="Only this reservation type (default: both)")
+    
+    server = commands.add_parser("serve", help="Serve the HTTP/JSON API (see server.ReservationServer)")
+    server.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    server.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    server.add_argument("--workers", type=int, default=8, help="Threads for reads (default: 8)")
+    server.add_argument("--kdf-workers", type=int, default=None,
+                        help="Threads verifying passwords (default: one per CPU)")
+    server.add_argument("--kdf-queue", type=int, default=64,
+                        help="Logins allowed to wait for a KDF thread before answering 503 (default: 64)")
+    server.add_argument("--session-ttl", type=float, default=DEFAULT_SESSION_TTL,
+                        help="Seconds a session token stays valid (default: 3600)")
+    server.add_argument("--public-metrics", action="store_true",
+                        help="Serve GET /metrics without an admin session token")
+    return parser
+
+
+def book_batch_file(app: ReservationApp, requests_file: str, mode: str, output: str = None) -> bool:
+    """Ejecuta `book_batch` con las solicitudes de `requests_file` e imprime el resultado.
+
+    Returns:
+        True si el lote se guardó.
+    """
+    try:
+        with open(requests_file, 'r', encoding='utf-8') as file:
+            requests = json.load(file)
+    except (IOError, ValueError) as e:
+        print(f"Error reading {requests_file}: {e}")
+        return False
+    if isinstance(requests, dict):
+        requests = requests.get("requests", [])
+    if not isinstance(requests, list):
+        print(f"Error reading {requests_file}: expected a list of requests")
+        return False
+    
+    saved, results = app.reservation_mgr.book_batch(requests, mode)
+    for number, (ok, result) in enumerate(results, 1):
+        if ok:
+            print(f"#{number}: OK {result['id']}")
+        else:
+            print(f"#{number}: FAILED {result}")
+    booked = sum(1 for ok, _ in results if ok)
+    print(f"{booked}/{len(results)} booking(s) {'saved' if saved else 'not saved'} ({mode}).")
+    
+    if output:
+        try:
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump([{"ok": ok, "result": result} for ok, result in results],
+                          file, indent=4, ensure_ascii=False)
+        except IOError as e:
+            print(f"Error saving to {output}: {e}")
+    return saved
+
+
+def print_report(app: ReservationApp, start: date, days: int, reservation_type: str = None) -> None:
+    """Imprime ocupación diaria, recursos agotados e ingresos del periodo (ver `ColumnarStore`)."""
+    store = app.reservation_mgr.get_columnar()
+    end = start + timedelta(days=days)
+    print(f"Report {start} to {end} ({days} days, {len(store)} reservations, {store.backend} backend)")
+    for kind in ([reservation_type] if reservation_type else ["vehicle", "hotel"]):
+        occupancy = store.daily_occupancy(kind, start, days)
+        peak = max(range(days), key=occupancy.__getitem__) if occupancy else 0
+        print(f"\n{kind.capitalize()} reservations active per day: "
+              f"avg {sum(occupancy) / max(days, 1):.1f}, peak {occupancy[peak] if occupancy else 0} "
+              f"on {start + timedelta(days=peak)}")
+        full = [(name, subtype) for name, subtype, total, free in
+                app.reservation_mgr.bulk_availability(start, end, kind) if total and not free]
+        print(f"Not bookable for the whole period: {len(full)}")
+        for name, subtype in full[:10]:
+            print(f"  - {name}{' / ' + subtype if subtype else ''}")
+        revenue = store.revenue(kind, start, end, by="resource")
+        print(f"Revenue (reservations starting in the period): {sum(revenue.values()):.2f}")
+        for name, total in sorted(revenue.items(), key=lambda item: -item[1])[:5]:
+            print(f"  {name}: {total:.2f}")
+
+
+def archive_past(app: ReservationApp, before: date = None) -> bool:
+    """Archiva las reservas de meses cerrados e imprime cuántas fueron a cada partición.
+
+    Returns:
+        True si el archivado terminó correctamente.
+    """
+    ok, written = app.reservation_mgr.archive_past(before)
+    if not ok:
+        print("Error archiving past reservations.")
+        return False
+    if not any(written.values()):
+        print("No past reservations to archive.")
+    for month, count in sorted(written.items()):
+        print(f"  {month}: {count} reservation(s)")
+    stats = app.archive.stats()
+    print(f"Archive: {stats['partitions']} partition(s), {stats['bytes']} bytes in {app.archive.path}")
+    return True
+
+
+def convert_binary(app: ReservationApp, path: str, export: bool) -> bool:
+    """Exporta las reservas al formato binario (`binary_store`) o las importa desde él.
+
+    Returns:
+        True si la conversión terminó correctamente.
+    """
+    path = path if os.path.isabs(path) else app.db.resolve_path(path)
+    if export:
+        try:
+            count = write_binary(app.reservation_mgr.load_reservations(readonly=True), path)
+        except (OSError, ValueError) as e:
+            print(f"Error writing {path}: {e}")
+            return False
+        print(f"Exported {count} reservation(s) to {path} ({os.path.getsize(path)} bytes).")
+        return True
+    try:
+        data = read_binary(path)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {path}: {e}")
+        return False
+    if not app.reservation_mgr.save_reservations(data):
+        print("Error saving reservations.")
+        return False
+    print(f"Imported {sum(len(items) for items in data.values())} reservation(s) from {path}.")
+    return True
+
+
+def check_ledger(app: ReservationApp, repair: bool = False) -> bool:
+    """Comprueba el libro de ocupación e imprime las diferencias (ver `ReservationManager.check_ledger`).
+
+    Returns:
+        True si el libro es consistente (o se reparó).
+    """
+    mismatches = app.reservation_mgr.check_ledger()
+    if not mismatches:
+        print("Occupancy ledger is consistent with the reservations.")
+        return True
+    print(f"Occupancy ledger differs from a full recount on {len(mismatches)} day(s):")
+    for (reservation_type, name, subtype), day, units, expected in mismatches[:20]:
+        print(f"  {reservation_type} {name}{' / ' + subtype if subtype else ''} {day}: "
+              f"ledger {units}, recount {expected}")
+    if not repair:
+        print("Run with --repair to rebuild it.")
+        return False
+    if app.reservation_mgr.rebuild_ledger() and not app.reservation_mgr.check_ledger():
+        print("Ledger rebuilt.")
+        return True
+    print("Error rebuilding the ledger.")
+    return False
+
+
+def compact_journals(app: ReservationApp) -> bool:
+    """Compacta los journals de reservas y usuarios.
+
+    Sin `--journal` solo se compactan los que tienen archivo `.journal` (de
+    una ejecución anterior con journal); si no hay ninguno no se escribe nada.
+
+    Returns:
+        True si todos los journals se compactaron (o no había ninguno).
+    """
+    if app.journal is not None:
+        journals = [app.journal, app.user_journal]
+    elif app.db.sql is not None:
+        journals = []
+    else:
+        journals = [journal for journal in (ReservationJournal(app.db), UserJournal(app.db))
+                    if os.path.exists(journal.journal_path)]
+    if not journals:
+        print("Nothing to compact: no journal files found (run with --journal to use them).")
+        return True
+    ok = True
+    for journal in journals:
+        if journal.compact():
+            print(f"Journal compacted into {journal.snapshot_file}.")
+        else:
+            ok = False
+    return ok
+
+
+def parse_codecs(parser: argparse.ArgumentParser, values: List[str]):
+    """Convierte los `--codec [FILE=]CODEC` en `(codec por defecto, {archivo: codec})`."""
+    default_codec = DEFAULT_CODEC
+    codecs: Dict[str, str] = {}
+    for value in values:
+        json_file, _, codec = value.rpartition("=")
+        if codec not in CODECS:
+            parser.error(f"--codec: unknown codec '{codec}' (choose from {', '.join(CODECS)})")
+        if json_file:
+            codecs[json_file] = codec
+        else:
+            default_codec = codec
+    return default_codec, codecs
+
+
+def main(argv: List[str] = None):
     """Punto de entrada de la aplicación"""
-    app = ReservationApp()
-    app.run()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.journal and args.backend != "json":
+        parser.error("--journal requires the json backend")
+    default_codec, codecs = parse_codecs(parser, args.codec)
+    if args.codec and args.backend != "json":
+        parser.error("--codec requires the json backend")
+    
+    if args.command == "migrate-sqlite":
+        base_dir = args.base_dir or os.path.dirname(os.path.abspath(__file__))
+        counts = migrate_json_to_sqlite(base_dir, args.sqlite_file)
+        print(f"Migrated JSON data into {os.path.join(base_dir, args.sqlite_file)}:")
+        for table, count in counts.items():
+            print(f"  {table}: {count} row(s)")
+        return
+    
+    app = ReservationApp(args.base_dir, backend=args.backend, journal=args.journal,
+                         compact_max_bytes=args.compact_bytes,
+                         compact_interval=args.compact_interval, metrics=args.metrics,
+                         archive_compression=args.archive_compression, auto_archive=args.auto_archive,
+                         group_commit=args.group_commit / 1000 if args.group_commit is not None else None,
+                         group_commit_batch=args.group_commit_batch, codecs=codecs,
+                         default_codec=default_codec, journal_sync=args.journal_fsync)
+    
+    try:
+        if args.command == "compact":
+            compact_journals(app)
+            return
+        
+        if args.command == "check-ledger":
+            check_ledger(app, args.repair)
+            return
+        
+        if args.command == "archive":
+            archive_past(app, args.before)
+            return
+        
+        if args.command in ("export-binary", "import-binary"):
+            export = args.command == "export-binary"
+            convert_binary(app, args.output if export else args.binary_file, export)
+            return
+        
+        if args.command == "book-batch":
+            book_batch_file(app, args.requests_file, args.mode, args.output)
+            return
+        
+        if args.command == "report":
+            print_report(app, args.start or date.today(), args.days, args.reservation_type)
+            return
+        
+        if args.command == "serve":
+            serve(app, args.host, args.port, args.workers, kdf_workers=args.kdf_workers,
+                  kdf_queue=args.kdf_queue, session_ttl=args.session_ttl,
+                  session_secret=os.environ.get(SESSION_SECRET_ENV),
+                  public_metrics=args.public_metrics)
+            return
+        
+        app.run()
+    finally:
+        app.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+"""
+Archive - Particiones mensuales comprimidas con las reservas ya terminadas
+"""
+import gzip
+import json
+import lzma
+import os
+import re
+import threading
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database import DatabaseManager
+from metrics import METRICS
+from records import parse_timestamp
+
+# Compresiones soportadas: extensión de las particiones y función `open` del módulo
+COMPRESSIONS = {
+    "gzip": (".jsonl.gz", gzip.open),
+    "lzma": (".jsonl.xz", lzma.open),
+}
+
+# Errores al descomprimir una partición
+_READ_ERRORS = (IOError, OSError, EOFError, lzma.LZMAError, UnicodeDecodeError)
+
+# Nombre de las particiones: reservations-YYYY-MM.jsonl.gz / .jsonl.xz
+_PARTITION_RE = re.compile(r"^reservations-(\d{4}-\d{2})(\.jsonl\.(?:gz|xz))$")
+
+
+def partition_month(res: Dict) -> str:
+    """Partición ('YYYY-MM') de una reserva: el mes de su fecha de fin."""
+    return parse_timestamp(res['end']).strftime('%Y-%m')
+
+
+def month_start(day: date) -> date:
+    """Primer día del mes de `day` (límite por defecto del archivado)."""
+    return day.replace(day=1)
+
+
+class ReservationArchive:
+    """Reservas terminadas, en un archivo comprimido por mes de `end`.
+
+    Cada partición (`archive/reservations-2025-07.jsonl.gz`) guarda una línea
+    JSON por reserva, `{"type": "vehicle"|"hotel", "entry": {...}}`, así que
+    se puede recorrer de forma perezosa sin descomprimirla entera en memoria.
+    Las particiones solo se reescriben al archivar (meses ya cerrados), con un
+    temporal y `os.replace`, y al fusionar se descartan las reservas repetidas:
+    repetir un archivado interrumpido no duplica nada.
+    """
+
+    def __init__(self, db: DatabaseManager, directory: str = "archive", compression: str = "gzip"):
+        """Inicializa el archivo.
+
+        Args:
+            db: Instancia de DatabaseManager (resuelve rutas y bloqueos).
+            directory: Carpeta de las particiones, relativa a `db.base_dir`.
+            compression: Compresión de las particiones nuevas, clave de
+                `COMPRESSIONS`; las existentes se leen con la suya.
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown archive compression '{compression}'")
+        self.db = db
+        self.directory = directory
+        self.compression = compression
+
+    @property
+    def path(self) -> str:
+        """Ruta absoluta de la carpeta de particiones."""
+        return self.db.resolve_path(self.directory)
+
+    def partitions(self) -> List[Tuple[str, str]]:
+        """Retorna `(mes, ruta)` de las particiones existentes, de la más antigua a la más nueva."""
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _PARTITION_RE.match(name)
+            if match:
+                found.append((match.group(1), os.path.join(self.path, name)))
+        return sorted(found)
+
+    # ===== Lectura =====
+
+    def iter_reservations(self, reservation_type: str = None, user: str = None,
+                          months: Iterable[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Recorre de forma perezosa las reservas archivadas.
+
+        Descomprime una partición cada vez y línea a línea, así que la memoria
+        no depende del tamaño del historial.
+
+        Args:
+            reservation_type: 'vehicle', 'hotel' o None para ambos.
+            user: Si se indica, solo reservas de ese usuario.
+            months: Si se indica, solo esas particiones ('YYYY-MM').
+
+        Yields:
+            Tuplas `(tipo, reserva)` en orden de mes y, dentro de cada mes, de archivado.
+        """
+        wanted = set(months) if months is not None else None
+        for month, path in self.partitions():
+            if wanted is not None and month not in wanted:
+                continue
+            try:
+                for kind, res in self._read_partition(path):
+                    if reservation_type and kind != reservation_type:
+                        continue
+                    if user is not None and res.get('user') != user:
+                        continue
+                    yield kind, res
+            except _READ_ERRORS as e:
+                print(f"Error reading archive {os.path.basename(path)}: {e}")
+
+    def _read_partition(self, path: str) -> Iterator[Tuple[str, Dict]]:
+        """Líneas `(tipo, reserva)` de una partición (se omiten las que no son registros válidos).
+
+        Raises:
+            IOError, OSError, EOFError, lzma.LZMAError si el archivo no se puede descomprimir.
+        """
+        opener = next(open_ for ext, open_ in COMPRESSIONS.values() if path.endswith(ext))
+        if METRICS.enabled:
+            METRICS.incr("file_opens", os.path.basename(path))
+        with opener(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    yield record["type"], record["entry"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    # ===== Escritura =====
+
+    def write(self, records: List[Tuple[str, Dict]]) -> Optional[Dict[str, int]]:
+        """Agrega reservas `(tipo, reserva)` a sus particiones mensuales.
+
+        Cada partición afectada se reescribe entera (existente + nuevas, sin
+        repetidas) en la compresión configurada; si antes estaba en otra, se
+        borra la anterior al terminar.
+
+        Returns:
+            `{mes: reservas nuevas}` o None si falló alguna escritura.
+        """
+        by_month: Dict[str, List[Tuple[str, Dict]]] = {}
+        for reservation_type, res in records:
+            by_month.setdefault(partition_month(res), []).append((reservation_type, res))
+        if not by_month:
+            return {}
+        os.makedirs(self.path, exist_ok=True)
+        written = {}
+        with self.db.lock(os.path.join(self.directory, "archive")):
+            existing: Dict[str, List[str]] = {}
+            for month, path in self.partitions():
+                existing.setdefault(month, []).append(path)
+            for month, items in sorted(by_month.items()):
+                old_paths = existing.get(month, [])
+                current = []
+                for old_path in old_paths:
+                    try:
+                        current.extend(self._read_partition(old_path))
+                    except _READ_ERRORS as e:
+                        # No se reescribe una partición que no se pudo leer entera
+                        print(f"Error reading archive {os.path.basename(old_path)}: {e}")
+                        return None
+                seen = set()
+                merged = []
+                for reservation_type, res in current:
+                    identity = _identity(reservation_type, res)
+                    if identity not in seen:
+                        seen.add(identity)
+                        merged.append((reservation_type, res))
+                added = 0
+                for reservation_type, res in items:
+                    identity = _identity(reservation_type, res)
+                    if identity not in seen:
+                        seen.add(identity)
+                        merged.append((reservation_type, res))
+                        added += 1
+                written[month] = added
+                if not added and len(old_paths) == 1:
+                    continue
+                path = self._write_partition(month, merged)
+                if path is None:
+                    return None
+                for old_path in old_paths:
+                    if old_path != path:
+                        os.unlink(old_path)
+        return written
+
+    def _write_partition(self, month: str, records: List[Tuple[str, Dict]]) -> Optional[str]:
+        """Escribe la partición `month` completa en un temporal y lo renombra; retorna su ruta."""
+        extension, opener = COMPRESSIONS[self.compression]
+        path = os.path.join(self.path, f"reservations-{month}{extension}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with opener(tmp_path, 'wt', encoding='utf-8') as file:
+                for reservation_type, res in records:
+                    file.write(json.dumps({"type": reservation_type, "entry": res}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            print(f"Error saving archive {os.path.basename(path)}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return None
+        if METRICS.enabled:
+            METRICS.incr("file_opens", os.path.basename(path))
+            METRICS.incr("bytes_written", os.path.basename(path), os.path.getsize(path))
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna número de particiones y bytes comprimidos en disco."""
+        partitions = self.partitions()
+        return {
+            "partitions": len(partitions),
+            "bytes": sum(os.path.getsize(path) for _, path in partitions),
+        }
+
+
+def _identity(reservation_type: str, res: Dict) -> Tuple:
+    """Clave para no archivar dos veces la misma reserva."""
+    return (reservation_type, res.get('id'), res.get('start'), res.get('end'))
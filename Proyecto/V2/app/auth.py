@@ -0,0 +1,252 @@
+"""
+Auth - Pool acotado para PBKDF2 y tokens de sesión firmados
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from metrics import METRICS
+
+# Segundos de validez de un token de sesión
+DEFAULT_SESSION_TTL = 3600
+# Variable de entorno con la clave HMAC compartida por los procesos del servidor
+SESSION_SECRET_ENV = "RESERVATION_SESSION_SECRET"
+# Documento con las sesiones revocadas (ver `SessionTokens`)
+REVOKED_SESSIONS_FILE = "revoked_sessions.json"
+
+
+class PoolBusy(Exception):
+    """El pool de verificación tiene la cola llena; el cliente debe reintentar."""
+
+
+class _Timing:
+    """Acumula cantidad, total y máximo de una medida en segundos."""
+
+    def __init__(self):
+        """Crea el acumulador vacío."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Registra una medida."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Retorna `{count, total_ms, avg_ms, max_ms}`."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class PasswordPool:
+    """Pool de hilos acotado para la verificación de contraseñas (PBKDF2).
+
+    `hashlib.pbkdf2_hmac` libera el GIL, así que varios hilos verifican en
+    paralelo sin bloquear al llamador. Como cada verificación cuesta decenas de
+    milisegundos, la cola se limita: con `workers` verificaciones en curso y
+    `max_pending` esperando, `submit` rechaza con `PoolBusy` en lugar de dejar
+    que la espera crezca sin límite (el servidor responde 503).
+
+    Por cada tarea se mide por separado el tiempo en cola (desde `submit` hasta
+    que un hilo la toma) y el de cálculo, para distinguir saturación del pool
+    de un KDF caro.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = 64):
+        """Crea el pool.
+
+        Args:
+            workers: Hilos de cálculo (por defecto, uno por CPU).
+            max_pending: Tareas que pueden esperar en cola además de las que corren.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="kdf")
+        self._slots = threading.BoundedSemaphore(self.workers + max_pending)
+        self._stats_lock = threading.Lock()
+        self._queue_wait = _Timing()
+        self._compute = _Timing()
+        self.rejected = 0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Encola `fn(*args)` y retorna su Future.
+
+        Raises:
+            PoolBusy: si ya hay `workers + max_pending` tareas en el pool.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise PoolBusy("Too many pending logins, retry later")
+        submitted = time.perf_counter()
+        try:
+            return self._executor.submit(self._run, submitted, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def run(self, fn: Callable, *args):
+        """Ejecuta `fn(*args)` en el pool y espera el resultado (uso síncrono)."""
+        return self.submit(fn, *args).result()
+
+    def _run(self, submitted: float, fn: Callable, args: Tuple):
+        """Ejecuta la tarea midiendo la espera en cola y el cálculo."""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            self._slots.release()
+            with self._stats_lock:
+                self._queue_wait.add(started - submitted)
+                self._compute.add(finished - started)
+            if METRICS.enabled:
+                METRICS.observe("kdf.queue_wait", started - submitted)
+                METRICS.observe("kdf.compute", finished - started)
+
+    def stats(self) -> Dict:
+        """Retorna las métricas del pool (tiempos en milisegundos)."""
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "queue_wait": self._queue_wait.summary(),
+                "compute": self._compute.summary(),
+            }
+
+    def shutdown(self) -> None:
+        """Detiene los hilos del pool (las tareas en curso terminan)."""
+        self._executor.shutdown(wait=False)
+
+
+def _b64encode(raw: bytes) -> str:
+    """Base64 URL-safe sin relleno."""
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    """Inversa de `_b64encode`."""
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """Tokens de sesión firmados con HMAC-SHA256 y con caducidad.
+
+    El token es `payload.firma`, con `payload = {"u": usuario, "r": rol,
+    "exp": epoch, "n": nonce}` en JSON base64. Verificarlo es un HMAC (µs) en
+    lugar de PBKDF2 (ms), y no hace falta guardar las sesiones abiertas: solo
+    se recuerdan los tokens revocados con `revoke` hasta que caducan.
+
+    Con el mismo `secret`, varios procesos aceptan los tokens de los demás; sin
+    `secret` se genera uno aleatorio y los tokens dejan de valer al reiniciar.
+    Con `db` las revocaciones se guardan en `REVOKED_SESSIONS_FILE` y las ven
+    todos los procesos que comparten el directorio de datos (un logout vale en
+    todos); sin `db` solo valen en este proceso.
+    """
+
+    def __init__(self, secret: Optional[bytes] = None, ttl: float = DEFAULT_SESSION_TTL,
+                 db: 'DatabaseManager' = None):
+        """Prepara el firmador.
+
+        Args:
+            secret: Clave HMAC (bytes o str); aleatoria si es None.
+            ttl: Segundos de validez de cada token.
+            db: DatabaseManager donde se comparten las revocaciones (opcional).
+        """
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self._secret = secret or secrets.token_bytes(32)
+        self.ttl = ttl
+        self.db = db
+        # firma del token -> caducidad, para poder cerrar sesiones antes de que expiren
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _sign(self, payload: str) -> str:
+        """Firma `payload` con la clave del firmador."""
+        return _b64encode(hmac.new(self._secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, username: str, role: str) -> Tuple[str, float]:
+        """Emite un token para `username` con rol `role`.
+
+        Returns:
+            (token, caducidad en epoch segundos)
+        """
+        expires = time.time() + self.ttl
+        claims = {"u": username, "r": role, "exp": int(expires), "n": secrets.token_hex(8)}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode('utf-8'))
+        return (f"{payload}.{self._sign(payload)}", int(expires))
+
+    def verify(self, token: str) -> Optional[Tuple[str, str]]:
+        """Valida firma, caducidad y revocación de `token`.
+
+        Returns:
+            (username, role) si el token es válido, None en caso contrario.
+        """
+        token = token or ""
+        if not token.isascii():
+            return None
+        payload, _, signature = token.partition(".")
+        if not payload or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) <= time.time():
+            return None
+        with self._lock:
+            if signature in self._revoked:
+                return None
+        if self.db is not None and signature in self._shared_revocations():
+            return None
+        return (claims.get("u"), claims.get("r"))
+
+    def _shared_revocations(self) -> Dict[str, float]:
+        """Revocaciones guardadas en `REVOKED_SESSIONS_FILE` (el caché de `db` evita releerlo)."""
+        data = self.db.load_json_file(REVOKED_SESSIONS_FILE, readonly=True)
+        revoked = data.get("revoked") if isinstance(data, dict) else None
+        return revoked if isinstance(revoked, dict) else {}
+
+    def revoke(self, token: str) -> bool:
+        """Invalida `token` antes de su caducidad (logout).
+
+        Returns:
+            True si el token era válido (y, con `db`, la revocación se guardó).
+        """
+        if self.verify(token) is None:
+            return False
+        payload, _, signature = token.partition(".")
+        expires = json.loads(_b64decode(payload))["exp"]
+        now = time.time()
+        with self._lock:
+            # Los revocados ya caducados no hace falta recordarlos
+            self._revoked = {s: exp for s, exp in self._revoked.items() if exp > now}
+            self._revoked[signature] = expires
+        if self.db is None:
+            return True
+
+        def operation(data):
+            if not isinstance(data, dict):
+                return False, False
+            revoked = data.get("revoked") if isinstance(data.get("revoked"), dict) else {}
+            revoked = {s: exp for s, exp in revoked.items() if exp > now}
+            revoked[signature] = expires
+            data["revoked"] = revoked
+            return True, True
+        ok, saved = self.db.update_json_file(REVOKED_SESSIONS_FILE, operation, atomic=True)
+        return ok and saved
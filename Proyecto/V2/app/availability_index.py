@@ -0,0 +1,214 @@
+"""
+Availability Index - Índice de intervalos para consultas de disponibilidad
+"""
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from operator import attrgetter
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from records import ReservationRecord
+
+# Claves de ordenación de `ReservationRecord`
+_record_start = attrgetter("start")
+_record_order = attrgetter("order")
+
+
+class IntervalIndex:
+    """Índice de intervalos `[start, end)` agrupados por clave.
+
+    Para cada clave (por ejemplo `('hotel', nombre, tipo_habitacion)`) mantiene
+    los intervalos ordenados por inicio y, aparte, los finales ordenados. El
+    número de reservas que se solapan con `[start, end)` es:
+
+        #(inicios < end) - #(finales <= start)
+
+    lo que se resuelve con dos búsquedas binarias (O(log N)) en lugar de recorrer
+    toda la lista. Las altas y bajas mantienen el orden con `insort`/`bisect`.
+
+    Los intervalos degenerados (`end < start`, datos corruptos) no cumplen la
+    fórmula anterior, así que se guardan aparte y se cuentan linealmente para
+    conservar exactamente el resultado del recorrido completo.
+    """
+
+    def __init__(self):
+        """Crea un índice vacío."""
+        self._intervals: Dict[Hashable, List[Tuple[Any, Any]]] = {}
+        self._ends: Dict[Hashable, List[Any]] = {}
+        self._degenerate: Dict[Hashable, List[Tuple[Any, Any]]] = {}
+
+    def add(self, key: Hashable, start: Any, end: Any) -> None:
+        """Registra el intervalo `[start, end)` bajo `key`."""
+        if end < start:
+            self._degenerate.setdefault(key, []).append((start, end))
+        else:
+            insort(self._intervals.setdefault(key, []), (start, end))
+            insort(self._ends.setdefault(key, []), end)
+
+    def remove(self, key: Hashable, start: Any, end: Any) -> bool:
+        """Elimina una ocurrencia del intervalo `[start, end)` de `key`.
+
+        Returns:
+            True si el intervalo estaba indexado, False en caso contrario.
+        """
+        if end < start:
+            items = self._degenerate.get(key, [])
+            if (start, end) not in items:
+                return False
+            items.remove((start, end))
+            return True
+
+        intervals = self._intervals.get(key)
+        if not intervals:
+            return False
+        ends = self._ends[key]
+        i = bisect_left(intervals, (start, end))
+        if i == len(intervals) or intervals[i] != (start, end):
+            return False
+        del intervals[i]
+        del ends[bisect_left(ends, end)]
+        return True
+
+    def count_overlapping(self, key: Hashable, start: Any, end: Any) -> int:
+        """Cuenta los intervalos de `key` que se solapan con `[start, end)`.
+
+        Usa el mismo criterio que `ReservationManager.is_resource_available`:
+        hay solapamiento cuando `start < res_end and res_start < end`.
+        """
+        count = 0
+        intervals = self._intervals.get(key)
+        if intervals:
+            # Intervalos con inicio < end (los primeros `n` del arreglo)
+            n = bisect_left(intervals, (end,))
+            if start < end:
+                count += n - bisect_right(self._ends[key], start)
+            elif start == end:
+                # Los intervalos vacíos exactamente en `start` se restan sin haber
+                # sido contados entre los `n`, así que se compensan aquí
+                empty = bisect_right(intervals, (start, end)) - bisect_left(intervals, (start, end))
+                count += n - bisect_right(self._ends[key], start) + empty
+            else:
+                # Consulta invertida: la fórmula no aplica, se revisan los candidatos
+                count += sum(1 for _, res_end in intervals[:n] if start < res_end)
+        for res_start, res_end in self._degenerate.get(key, ()):
+            if start < res_end and res_start < end:
+                count += 1
+        return count
+
+
+class UserReservationIndex:
+    """Índice usuario -> reservas ordenadas por inicio, por tipo de reserva.
+
+    Permite resolver la política de exclusión mutua y el listado "View My
+    Reservations" mirando solo las reservas del usuario (normalmente pocas) y
+    mantiene conteos por usuario para las vistas administrativas.
+
+    Cada entrada es un `ReservationRecord` (fechas ya parseadas); su `order`
+    es la posición de alta y sirve para devolver las reservas en el orden del
+    archivo.
+    """
+
+    def __init__(self):
+        """Crea un índice vacío."""
+        self._entries: Dict[Tuple[str, str], List[ReservationRecord]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._next_order = 0
+
+    def add(self, record: ReservationRecord) -> None:
+        """Registra la reserva de `record.user` (le asigna su `order`)."""
+        record.order = self._next_order
+        self._next_order += 1
+        insort(self._entries.setdefault((record.user, record.kind), []), record)
+        counts = self._counts.setdefault(record.user, {})
+        counts[record.kind] = counts.get(record.kind, 0) + 1
+
+    def remove(self, reservation_type: str, res: Dict) -> bool:
+        """Elimina la reserva con el mismo `id`, inicio y fin que `res`.
+
+        Returns:
+            True si estaba indexada.
+        """
+        user = res.get('user')
+        entries = self._entries.get((user, reservation_type), [])
+        for i, record in enumerate(entries):
+            if record.same_reservation(res):
+                del entries[i]
+                self._counts[user][reservation_type] -= 1
+                if not any(self._counts[user].values()):
+                    del self._counts[user]
+                return True
+        return False
+
+    def find_overlap(self, reservation_type: str, user: str, start: int, end: int) -> Optional[Dict]:
+        """Retorna la primera reserva (en orden de alta) de `user` que se solapa con `[start, end)`.
+
+        Solo las reservas con inicio < `end` pueden solaparse: se delimitan con
+        una búsqueda binaria y se revisan únicamente esas.
+        """
+        entries = self._entries.get((user, reservation_type))
+        if not entries:
+            return None
+        n = bisect_left(entries, end, key=_record_start)
+        best = None
+        for record in entries[:n]:
+            if start < record.end and (best is None or record.order < best.order):
+                best = record
+        return best.res if best else None
+
+    def user_reservations(self, reservation_type: str, user: str) -> List[Dict]:
+        """Retorna las reservas de `user` del tipo dado en orden de alta (vistas de solo lectura)."""
+        entries = self._entries.get((user, reservation_type), [])
+        return [record.res for record in sorted(entries, key=_record_order)]
+
+    def counts(self, user: str) -> Dict[str, int]:
+        """Retorna `{tipo: cantidad}` de las reservas de `user`."""
+        return dict(self._counts.get(user, {}))
+
+    def top_users(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Retorna los `limit` usuarios con más reservas como `(usuario, total)`.
+
+        Trabaja sobre los conteos, sin recorrer las reservas.
+        """
+        totals = ((user, sum(c.values())) for user, c in self._counts.items())
+        return heapq.nlargest(limit, totals, key=lambda item: (item[1], item[0] or ''))
+
+
+class ReservationIdIndex:
+    """Índice `id -> [(tipo, reserva)]` para cancelar sin recorrer las reservas.
+
+    Normalmente cada id tiene una sola reserva; la lista conserva los datos
+    anteriores a `ReservationIdGenerator`, donde dos reservas podían compartir id.
+    """
+
+    def __init__(self):
+        """Crea un índice vacío."""
+        self._entries: Dict[str, List[Tuple[str, Dict]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, reservation_type: str, res: Dict) -> None:
+        """Registra `res` bajo su `id`."""
+        self._entries.setdefault(res.get('id'), []).append((reservation_type, res))
+
+    def remove(self, reservation_type: str, res: Dict) -> bool:
+        """Elimina la reserva con el mismo tipo, `id`, inicio y fin que `res`.
+
+        Returns:
+            True si estaba indexada.
+        """
+        entries = self._entries.get(res.get('id'))
+        if not entries:
+            return False
+        for i, (kind, entry) in enumerate(entries):
+            if kind == reservation_type and entry.get('start') == res.get('start') \
+                    and entry.get('end') == res.get('end'):
+                del entries[i]
+                if not entries:
+                    del self._entries[res.get('id')]
+                return True
+        return False
+
+    def get(self, res_id: str, reservation_type: str = None) -> List[Tuple[str, Dict]]:
+        """Retorna las reservas `(tipo, reserva)` con `id == res_id` (de `reservation_type` si se indica)."""
+        return [(kind, res) for kind, res in self._entries.get(res_id, ())
+                if reservation_type is None or kind == reservation_type]
@@ -0,0 +1,396 @@
+"""
+Binary Store - Reservas en un archivo binario de registros de ancho fijo, leído con mmap
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from occupancy import day_range
+from records import from_epoch, to_epoch
+from sqlite_store import RESERVATION_KEYS
+
+MAGIC = b"RSVB"
+FORMAT_VERSION = 1
+
+# Cabecera: magic, versión, tamaño de registro, nº de reservas, nº de cadenas y
+# desplazamientos de las secciones (registros, índice por usuario, offsets de cadenas, bytes de cadenas)
+_HEADER = struct.Struct("<4sHHIIQQQQ")
+# Registro (64 bytes): start, end, total_price, tipo, flags y ids de cadena de
+# resource, subtype, user, driver, id, created_at y extra; después pax y days
+_RECORD = struct.Struct("<qqdBB2xIIIIIIIII")
+
+# Tipos de reserva por código (posición en el registro)
+KINDS = tuple(RESERVATION_KEYS)
+
+# Id de cadena para los valores ausentes (None)
+NO_STRING = 0xFFFFFFFF
+
+# Flags del registro
+_FLAG_INT_PRICE = 1   # `total_price` era entero
+_FLAG_DATE_START = 2  # `start` era 'YYYY-MM-DD' (sin hora)
+_FLAG_DATE_END = 4    # `end` era 'YYYY-MM-DD' (sin hora)
+_FLAG_RAW = 8         # la reserva no tiene la forma habitual: `extra` es el dict completo
+
+# Campos de cada tipo, en el orden en que los escribe `ReservationManager`
+_FIELDS = {
+    "vehicle": ("id", "user", "car_type", "driver", "start", "end", "days", "total_price", "created_at"),
+    "hotel": ("id", "user", "hotel", "room_type", "pax", "start", "end", "days", "total_price", "created_at"),
+}
+
+
+def _u32(values) -> bytes:
+    """Serializa enteros sin signo de 32 bits en little-endian."""
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _pad(size: int) -> int:
+    """Bytes de relleno para alinear `size` a 8."""
+    return -size % 8
+
+
+def _date_flag(value: str, seconds: int, flag: int) -> Optional[int]:
+    """Flag de formato de una fecha, o None si `value` no se puede reconstruir desde `seconds`."""
+    moment = from_epoch(seconds)
+    if moment.isoformat() == value:
+        return 0
+    if moment.date().isoformat() == value and moment.hour == moment.minute == moment.second == 0:
+        return flag
+    return None
+
+
+def _is_regular(kind: str, res: Dict) -> bool:
+    """True si los campos de `res` tienen los tipos que escribe la aplicación."""
+    fields = _FIELDS[kind]
+    if any(name not in res for name in fields):
+        return False
+    strings = [res['id'], res['user'], res['created_at'], res.get('driver') if kind == 'vehicle' else '']
+    strings += [res['car_type']] if kind == 'vehicle' else [res['hotel'], res['room_type']]
+    if not all(value is None or isinstance(value, str) for value in strings):
+        return False
+    if kind == 'hotel' and (type(res['pax']) is not int or not 0 <= res['pax'] < NO_STRING):
+        return False
+    return (type(res['days']) is int and 0 <= res['days'] < NO_STRING
+            and type(res['total_price']) in (int, float))
+
+
+def write_binary(reservations: Dict, path: str) -> int:
+    """Convierte reservas en formato JSON al archivo binario `path`.
+
+    La conversión no pierde información: los campos fuera de la forma habitual
+    se guardan como JSON en la cadena `extra` y `read_binary` devuelve los
+    mismos dicts. El archivo se escribe en un temporal y se renombra.
+
+    Args:
+        reservations: `{"vehicle_reservations": [...], "hotel_reservations": [...]}`.
+        path: Archivo de destino.
+
+    Returns:
+        Número de reservas escritas.
+
+    Raises:
+        ValueError si alguna reserva no tiene `start`/`end` válidos.
+        OSError si no se puede escribir el archivo.
+    """
+    rows = []
+    strings = set()
+    for kind_code, kind in enumerate(KINDS):
+        for res in reservations.get(RESERVATION_KEYS[kind], []):
+            start, end = to_epoch(res['start']), to_epoch(res['end'])
+            flags = 0
+            regular = _is_regular(kind, res)
+            if regular:
+                start_flag = _date_flag(res['start'], start, _FLAG_DATE_START)
+                end_flag = _date_flag(res['end'], end, _FLAG_DATE_END)
+                regular = start_flag is not None and end_flag is not None
+            if regular:
+                flags = start_flag | end_flag
+                if type(res['total_price']) is int:
+                    flags |= _FLAG_INT_PRICE
+                extras = {k: v for k, v in res.items() if k not in _FIELDS[kind]}
+                extra = json.dumps(extras, ensure_ascii=False) if extras else None
+            else:
+                flags = _FLAG_RAW
+                extra = json.dumps(res, ensure_ascii=False)
+            if kind == 'vehicle':
+                resource, subtype = res.get('car_type'), ''
+            else:
+                resource, subtype = res.get('hotel'), res.get('room_type')
+            texts = [_text(resource), _text(subtype), _text(res.get('user')), _text(res.get('driver')),
+                     _text(res.get('id')), _text(res.get('created_at')), extra]
+            strings.update(value for value in texts if value is not None)
+            price = res.get('total_price')
+            price = float(price) if type(price) in (int, float) else 0.0
+            pax = res.get('pax') if regular and kind == 'hotel' else 0
+            days = res.get('days') if regular else 0
+            rows.append((start, end, price, kind_code, flags, texts, pax, days))
+
+    encoded = sorted(value.encode('utf-8') for value in strings)
+    ids = {value.decode('utf-8'): i for i, value in enumerate(encoded)}
+    records = bytearray(len(rows) * _RECORD.size)
+    user_ids = []
+    for i, (start, end, price, kind_code, flags, texts, pax, days) in enumerate(rows):
+        text_ids = [NO_STRING if value is None else ids[value] for value in texts]
+        _RECORD.pack_into(records, i * _RECORD.size, start, end, price, kind_code, flags, *text_ids, pax, days)
+        user_ids.append(text_ids[2])
+    order = sorted(range(len(rows)), key=lambda i: (user_ids[i], i))
+    user_index = _u32(user_ids[i] for i in order) + _u32(order)
+    offsets, position = [0], 0
+    for value in encoded:
+        position += len(value)
+        offsets.append(position)
+    string_offsets = _u32(offsets)
+
+    records_offset = _HEADER.size + _pad(_HEADER.size)
+    user_offset = records_offset + len(records)
+    strings_offset = user_offset + len(user_index) + _pad(user_offset + len(user_index))
+    blob_offset = strings_offset + len(string_offsets)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, _RECORD.size, len(rows), len(encoded),
+                          records_offset, user_offset, strings_offset, blob_offset)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(header + bytes(_pad(_HEADER.size)))
+            file.write(records)
+            file.write(user_index + bytes(strings_offset - user_offset - len(user_index)))
+            file.write(string_offsets)
+            for value in encoded:
+                file.write(value)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return len(rows)
+
+
+def read_binary(path: str) -> Dict:
+    """Convierte el archivo binario `path` de vuelta al formato JSON de las reservas."""
+    with BinaryReservationFile(path) as store:
+        return store.to_json()
+
+
+def _text(value) -> Optional[str]:
+    """Valor de una columna de texto (None se conserva; el resto se guarda como cadena)."""
+    return None if value is None else str(value)
+
+
+class BinaryReservationFile:
+    """Lectura en sitio de un archivo escrito por `write_binary`.
+
+    El archivo se proyecta con `mmap` y se accede con `memoryview`/`struct`:
+    abrirlo solo lee la cabecera, y las consultas recorren los registros de
+    64 bytes sin construir dicts (solo se decodifican las cadenas y las
+    reservas que se devuelven). Las cadenas están ordenadas, así que buscar
+    el id de un usuario o recurso es una búsqueda binaria; el índice por
+    usuario (ids ordenados + posiciones) resuelve `user_reservations` en
+    O(log N + resultado).
+
+    Es un formato de solo lectura: las altas y bajas siguen yendo al backend
+    JSON o SQLite y el archivo se regenera con `write_binary`.
+    """
+
+    def __init__(self, path: str):
+        """Abre y valida el archivo.
+
+        Raises:
+            ValueError si no es un archivo de reservas de esta versión.
+            OSError si no se puede abrir.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._views: List[memoryview] = []
+        try:
+            if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{path} is not a reservation binary file")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = self._view(0, len(self._mmap))
+            (magic, version, record_size, count, string_count, records_offset, user_offset,
+             strings_offset, blob_offset) = _HEADER.unpack_from(view, 0)
+            if magic != MAGIC or record_size != _RECORD.size:
+                raise ValueError(f"{path} is not a reservation binary file")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported reservation binary format version {version}")
+            self._count = count
+            self._records = self._view(records_offset, count * _RECORD.size)
+            self._user_keys = self._u32(user_offset, count)
+            self._user_order = self._u32(user_offset + 4 * count, count)
+            self._offsets = self._u32(strings_offset, string_count + 1)
+            self._blob = self._view(blob_offset, len(self._mmap) - blob_offset)
+        except Exception:
+            self.close()
+            raise
+        self._strings: Dict[int, str] = {}
+
+    def _view(self, offset: int, size: int) -> memoryview:
+        """Vista de `size` bytes del archivo desde `offset` (se libera en `close`)."""
+        if offset + size > len(self._mmap):
+            raise ValueError(f"{self.path} is truncated")
+        view = memoryview(self._mmap)[offset:offset + size]
+        self._views.append(view)
+        return view
+
+    def _u32(self, offset: int, count: int):
+        """Arreglo de `count` enteros de 32 bits en `offset`, sin copiar en máquinas little-endian."""
+        view = self._view(offset, 4 * count)
+        if sys.byteorder == 'little':
+            cast = view.cast('I')
+            self._views.append(cast)
+            return cast
+        data = array('I', view.tobytes())
+        data.byteswap()
+        return data
+
+    def close(self) -> None:
+        """Libera las vistas, el mapeo y el archivo."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self) -> 'BinaryReservationFile':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ===== Cadenas =====
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        """Bytes UTF-8 de la cadena `string_id`."""
+        return self._blob[self._offsets[string_id]:self._offsets[string_id + 1]].tobytes()
+
+    def string(self, string_id: int) -> Optional[str]:
+        """Cadena con id `string_id` (None para `NO_STRING`); se decodifica una sola vez."""
+        if string_id == NO_STRING:
+            return None
+        value = self._strings.get(string_id)
+        if value is None:
+            value = self._strings[string_id] = self._string_bytes(string_id).decode('utf-8')
+        return value
+
+    def string_id(self, value: str) -> Optional[int]:
+        """Id de `value` (búsqueda binaria en la tabla ordenada) o None si no aparece."""
+        target = value.encode('utf-8')
+        lo, hi = 0, len(self._offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._offsets) - 1 and self._string_bytes(lo) == target:
+            return lo
+        return None
+
+    # ===== Reservas =====
+
+    def _reservation(self, fields: Tuple) -> Tuple[str, Dict]:
+        """Construye `(tipo, reserva)` a partir de los campos de un registro."""
+        (start, end, price, kind_code, flags, resource, subtype, user, driver,
+         res_id, created_at, extra, pax, days) = fields
+        kind = KINDS[kind_code]
+        if flags & _FLAG_RAW:
+            return kind, json.loads(self.string(extra))
+        start_text = from_epoch(start)
+        end_text = from_epoch(end)
+        res = {"id": self.string(res_id), "user": self.string(user)}
+        if kind == 'vehicle':
+            res["car_type"] = self.string(resource)
+            res["driver"] = self.string(driver)
+        else:
+            res["hotel"] = self.string(resource)
+            res["room_type"] = self.string(subtype)
+            res["pax"] = pax
+        res["start"] = (start_text.date() if flags & _FLAG_DATE_START else start_text).isoformat()
+        res["end"] = (end_text.date() if flags & _FLAG_DATE_END else end_text).isoformat()
+        res["days"] = days
+        res["total_price"] = int(price) if flags & _FLAG_INT_PRICE else price
+        res["created_at"] = self.string(created_at)
+        if extra != NO_STRING:
+            res.update(json.loads(self.string(extra)))
+        return kind, res
+
+    def reservation(self, position: int) -> Tuple[str, Dict]:
+        """Reserva número `position` (orden del archivo) como `(tipo, dict)`."""
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        return self._reservation(_RECORD.unpack_from(self._records, position * _RECORD.size))
+
+    def iter_reservations(self) -> Iterator[Tuple[str, Dict]]:
+        """Recorre todas las reservas como `(tipo, dict)` en orden del archivo."""
+        for fields in _RECORD.iter_unpack(self._records):
+            yield self._reservation(fields)
+
+    def to_json(self) -> Dict:
+        """Todas las reservas en el formato de `reservations.json`."""
+        data = {key: [] for key in RESERVATION_KEYS.values()}
+        for kind, res in self.iter_reservations():
+            data[RESERVATION_KEYS[kind]].append(res)
+        return data
+
+    def user_reservations(self, user: str, reservation_type: str = None) -> List[Dict]:
+        """Reservas de `user` (opcionalmente de un tipo) en orden del archivo.
+
+        Usa el índice por usuario: búsqueda binaria del id y lectura directa
+        de sus registros.
+        """
+        user_id = self.string_id(user) if user is not None else NO_STRING
+        if user_id is None:
+            return []
+        lo = bisect_left(self._user_keys, user_id)
+        hi = bisect_right(self._user_keys, user_id, lo)
+        result = []
+        for i in range(lo, hi):
+            fields = _RECORD.unpack_from(self._records, self._user_order[i] * _RECORD.size)
+            if reservation_type is None or KINDS[fields[3]] == reservation_type:
+                result.append(self._reservation(fields)[1])
+        return result
+
+    def _matching(self, reservation_type: str, resource: str, subtype: str) -> Iterator[Tuple[int, int]]:
+        """`(start, end)` de los registros del recurso, recorriendo los registros en sitio."""
+        resource_id = self.string_id(resource) if resource is not None else NO_STRING
+        subtype_id = self.string_id(subtype) if subtype is not None else NO_STRING
+        if resource_id is None or subtype_id is None:
+            return
+        kind_code = KINDS.index(reservation_type)
+        for fields in _RECORD.iter_unpack(self._records):
+            if fields[3] == kind_code and fields[5] == resource_id and fields[6] == subtype_id:
+                yield fields[0], fields[1]
+
+    def count_overlapping(self, reservation_type: str, resource: str, subtype: str,
+                          start: int, end: int) -> int:
+        """Reservas del recurso que se solapan con `[start, end)` (segundos, ver `records.to_epoch`)."""
+        return sum(1 for res_start, res_end in self._matching(reservation_type, resource, subtype)
+                   if start < res_end and res_start < end)
+
+    def max_units(self, reservation_type: str, resource: str, subtype: str,
+                  start: int, end: int) -> int:
+        """Máximo de unidades reservadas en un día de `[start, end)`.
+
+        Mismo criterio que `occupancy.OccupancyLedger.max_units`; `subtype` es
+        el tipo de habitación ('' para vehículos).
+        """
+        days = day_range(start, end)
+        if not days:
+            return 0
+        counts = [0] * len(days)
+        for res_start, res_end in self._matching(reservation_type, resource, subtype):
+            touched = day_range(res_start, res_end)
+            for day in range(max(touched.start, days.start), min(touched.stop, days.stop)):
+                counts[day - days.start] += 1
+        return max(counts)
@@ -0,0 +1,81 @@
+"""
+Resource Catalog - Índices hash sobre el archivo de recursos
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+def _fold(value) -> str:
+    """Normaliza un nombre para comparaciones sin distinguir mayúsculas."""
+    return str(value or '').casefold()
+
+
+class ResourceCatalog:
+    """Índices en memoria sobre una versión concreta de `res_data.json`.
+
+    Se construye una vez por versión del archivo y resuelve en O(1) las
+    búsquedas que antes recorrían las listas comparando con `.lower()`:
+
+        - tipo de coche -> coche
+        - nombre de hotel -> hotel
+        - (hotel, tipo de habitación) -> habitación
+        - tipo de licencia -> choferes (en orden de alta)
+
+    Si hay nombres repetidos se conserva el primero, igual que `next(...)` sobre
+    la lista. Los dicts indexados son vistas de solo lectura del caché.
+    """
+
+    def __init__(self, data: Dict, version=None):
+        """Construye los índices.
+
+        Args:
+            data: Contenido de `res_data.json` (claves `cars`, `hotels`, `chofer`).
+            version: Versión del archivo desde la que se construyó el catálogo.
+        """
+        self.version = version
+        self.cars_by_type: Dict[str, Dict] = {}
+        self.hotels_by_name: Dict[str, Dict] = {}
+        self.rooms: Dict[Tuple[str, str], Dict] = {}
+        self.drivers_by_license: Dict[str, List[Dict]] = {}
+
+        for car in data.get('cars', []):
+            self.cars_by_type.setdefault(_fold(car.get('type')), car)
+        for hotel in data.get('hotels', []):
+            name = _fold(hotel.get('name'))
+            if name in self.hotels_by_name:
+                continue
+            self.hotels_by_name[name] = hotel
+            for room in hotel.get('room', []):
+                self.rooms.setdefault((name, _fold(room.get('type'))), room)
+        for driver in data.get('chofer', []):
+            self.drivers_by_license.setdefault(_fold(driver.get('license_type')), []).append(driver)
+
+    def get_car(self, car_type: str) -> Optional[Dict]:
+        """Retorna el coche de tipo `car_type` o None."""
+        return self.cars_by_type.get(_fold(car_type))
+
+    def get_hotel(self, hotel_name: str) -> Optional[Dict]:
+        """Retorna el hotel llamado `hotel_name` o None."""
+        return self.hotels_by_name.get(_fold(hotel_name))
+
+    def get_room(self, hotel_name: str, room_type: str) -> Optional[Dict]:
+        """Retorna el tipo de habitación `room_type` del hotel o None."""
+        return self.rooms.get((_fold(hotel_name), _fold(room_type)))
+
+    def canonical_columns(self, kind: str, resource: str, subtype: str) -> Tuple[str, str]:
+        """Nombres del catálogo para las columnas `(resource, subtype)` de una reserva.
+
+        Las reservas antiguas guardan el nombre tal como se escribió
+        ('melia varadero'); así cuentan para el mismo recurso que las demás.
+        Los nombres que no están en el catálogo se devuelven sin cambios.
+        """
+        if kind == 'vehicle':
+            car = self.get_car(resource)
+            return (car.get('type', resource) if car else resource), subtype
+        room = self.get_room(resource, subtype)
+        if room is None:
+            return resource, subtype
+        return self.get_hotel(resource).get('name', resource), room.get('type', subtype)
+
+    def drivers_with_license(self, license_type: str) -> List[Dict]:
+        """Retorna los choferes con `license_type` en orden de alta."""
+        return self.drivers_by_license.get(_fold(license_type), [])
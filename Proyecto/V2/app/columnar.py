@@ -0,0 +1,271 @@
+"""
+Columnar - Reservas en columnas para informes y consultas masivas de disponibilidad
+"""
+from array import array
+from datetime import date
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy: columnas `array` de la biblioteca estándar y bucles en Python
+    np = None
+
+from records import DAY_SECONDS, to_epoch
+from sqlite_store import RESERVATION_KEYS, reservation_columns
+
+# Tipo de cada columna: código de `array` y dtype equivalente de NumPy
+_COLUMN_TYPES = {
+    "start": "q", "end": "q",
+    "resource": "l", "subtype": "l", "slot": "l", "user": "l", "pax": "l",
+    "price": "d",
+}
+_NUMPY_TYPES = {"q": "int64", "l": "int64", "d": "float64"}
+
+# Agrupaciones aceptadas por `ColumnarStore.revenue`
+REVENUE_GROUPS = ("resource", "user")
+
+Instant = Union[int, str, date]
+
+
+class StringDictionary:
+    """Codifica valores (cadenas o tuplas) como enteros consecutivos y al revés."""
+
+    def __init__(self):
+        """Crea un diccionario vacío."""
+        self.ids: Dict[Hashable, int] = {}
+        self.values: List[Hashable] = []
+
+    def encode(self, value: Hashable) -> int:
+        """Retorna el id de `value`, asignándole uno nuevo si no lo tenía."""
+        found = self.ids.get(value)
+        if found is None:
+            found = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+    def get(self, value: Hashable) -> Optional[int]:
+        """Retorna el id de `value` o None si no aparece en las reservas."""
+        return self.ids.get(value)
+
+    def decode(self, value_id: int) -> Hashable:
+        """Retorna el valor con id `value_id`."""
+        return self.values[value_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ReservationColumns:
+    """Columnas de un tipo de reserva (una fila por reserva, en orden del archivo).
+
+    - `start`, `end`: segundos desde `records.EPOCH`.
+    - `resource`, `subtype`, `user`: ids de los `StringDictionary` del almacén
+      (para vehículos `resource` es el `car_type` y `subtype` es '').
+    - `slot`: id del par `(resource, subtype)`, la clave de disponibilidad.
+    - `price`: `total_price`; `pax`: huéspedes (0 en vehículos).
+    """
+
+    def __init__(self, rows: Dict[str, List], numeric):
+        """Convierte las listas de `rows` en columnas (`numpy.ndarray` o `array`)."""
+        self.size = len(rows["start"])
+        for name, typecode in _COLUMN_TYPES.items():
+            if numeric is not None:
+                column = numeric.array(rows[name], dtype=_NUMPY_TYPES[typecode])
+            else:
+                column = array(typecode, rows[name])
+            setattr(self, name, column)
+
+
+class ColumnarStore:
+    """Vista columnar (de solo lectura) de `vehicle_reservations` y `hotel_reservations`.
+
+    Evalúa los predicados sobre todas las reservas a la vez: con NumPy como
+    operaciones vectorizadas (máscaras, `bincount`, `cumsum`) y, si NumPy no
+    está instalado, con un único recorrido en Python sobre columnas `array`.
+    Ambos caminos devuelven lo mismo.
+
+    El solapamiento usa el mismo criterio que los índices:
+    `start < res_end and res_start < end`.
+    """
+
+    def __init__(self, reservations: Dict, use_numpy: Optional[bool] = None):
+        """Construye las columnas a partir de `ReservationManager.load_reservations`.
+
+        Args:
+            reservations: `{"vehicle_reservations": [...], "hotel_reservations": [...]}`.
+            use_numpy: None usa NumPy si está disponible; False fuerza el camino
+                en Python puro.
+
+        Raises:
+            ImportError: si `use_numpy` es True y NumPy no está instalado.
+            ValueError: si alguna reserva tiene fechas inválidas.
+        """
+        if use_numpy and np is None:
+            raise ImportError("NumPy is not installed")
+        self._np = np if use_numpy is not False else None
+        self.resources = StringDictionary()
+        self.subtypes = StringDictionary()
+        self.users = StringDictionary()
+        self.slots: Dict[str, StringDictionary] = {}
+        self.tables: Dict[str, ReservationColumns] = {}
+        for reservation_type, key in RESERVATION_KEYS.items():
+            slots = self.slots[reservation_type] = StringDictionary()
+            rows = {name: [] for name in _COLUMN_TYPES}
+            for res in reservations.get(key, []):
+                resource, subtype = reservation_columns(reservation_type, res)
+                rows["start"].append(to_epoch(res['start']))
+                rows["end"].append(to_epoch(res['end']))
+                rows["resource"].append(self.resources.encode(resource))
+                rows["subtype"].append(self.subtypes.encode(subtype))
+                rows["slot"].append(slots.encode((resource, subtype)))
+                rows["user"].append(self.users.encode(res.get('user')))
+                rows["price"].append(float(res.get('total_price') or 0))
+                rows["pax"].append(int(res.get('pax') or 0))
+            self.tables[reservation_type] = ReservationColumns(rows, self._np)
+
+    @property
+    def backend(self) -> str:
+        """'numpy' o 'python', según el camino que se usa."""
+        return "numpy" if self._np is not None else "python"
+
+    def __len__(self) -> int:
+        return sum(table.size for table in self.tables.values())
+
+    # ===== Disponibilidad =====
+
+    def overlap_counts(self, reservation_type: str, start: Instant,
+                       end: Instant) -> Dict[Tuple[str, str], int]:
+        """Cuenta, para cada recurso, las reservas que se solapan con `[start, end)`.
+
+        Returns:
+            `{(resource, subtype): reservas}` solo con los recursos que tienen alguna.
+        """
+        table, slots = self.tables[reservation_type], self.slots[reservation_type]
+        start, end = _instant(start), _instant(end)
+        if self._np is not None:
+            mask = (table.start < end) & (table.end > start)
+            counts = self._np.bincount(table.slot[mask], minlength=len(slots)).tolist()
+        else:
+            counts = [0] * len(slots)
+            for slot, res_start, res_end in zip(table.slot, table.start, table.end):
+                if start < res_end and res_start < end:
+                    counts[slot] += 1
+        return {slots.decode(i): n for i, n in enumerate(counts) if n}
+
+    def count_overlapping(self, reservation_type: str, resource: str, subtype: str,
+                          start: Instant, end: Instant) -> int:
+        """Reservas de `(resource, subtype)` que se solapan con `[start, end)`."""
+        slot = self.slots[reservation_type].get((resource, subtype))
+        if slot is None:
+            return 0
+        table = self.tables[reservation_type]
+        start, end = _instant(start), _instant(end)
+        if self._np is not None:
+            return int(((table.slot == slot) & (table.start < end) & (table.end > start)).sum())
+        return sum(1 for s, res_start, res_end in zip(table.slot, table.start, table.end)
+                   if s == slot and start < res_end and res_start < end)
+
+    def daily_occupancy(self, reservation_type: str, first_day: date, days: int,
+                        resource: str = None, subtype: str = '') -> List[int]:
+        """Reservas activas en cada día `[first_day + i, first_day + i + 1)`.
+
+        Cada reserva suma +1 en un arreglo de diferencias sobre los días que
+        toca y una suma prefija da la ocupación (O(N + días)).
+
+        Args:
+            reservation_type: 'vehicle' o 'hotel'.
+            first_day: Primer día del periodo.
+            days: Número de días.
+            resource, subtype: Si se indica `resource`, solo ese recurso
+                (`subtype` es el tipo de habitación; '' para vehículos).
+
+        Returns:
+            Lista de `days` enteros.
+        """
+        if days <= 0:
+            return []
+        table = self.tables[reservation_type]
+        base = to_epoch(first_day)
+        slot = None
+        if resource is not None:
+            slot = self.slots[reservation_type].get((resource, subtype))
+            if slot is None:
+                return [0] * days
+
+        if self._np is not None:
+            numeric = self._np
+            starts, ends = table.start, table.end
+            if slot is not None:
+                mask = table.slot == slot
+                starts, ends = starts[mask], ends[mask]
+            # Día d tocado si base + d*DIA < end y start < base + (d+1)*DIA
+            first = numeric.maximum((starts - base) // DAY_SECONDS, 0)
+            last = numeric.minimum(-((base - ends) // DAY_SECONDS) - 1, days - 1)
+            touched = first <= last
+            diff = (numeric.bincount(first[touched], minlength=days + 1)
+                    - numeric.bincount(last[touched] + 1, minlength=days + 1))
+            return numeric.cumsum(diff[:days]).tolist()
+
+        diff = [0] * (days + 1)
+        for s, res_start, res_end in zip(table.slot, table.start, table.end):
+            if slot is not None and s != slot:
+                continue
+            first = max((res_start - base) // DAY_SECONDS, 0)
+            last = min(-((base - res_end) // DAY_SECONDS) - 1, days - 1)
+            if first <= last:
+                diff[first] += 1
+                diff[last + 1] -= 1
+        occupancy, running = [], 0
+        for value in diff[:days]:
+            running += value
+            occupancy.append(running)
+        return occupancy
+
+    # ===== Informes =====
+
+    def revenue(self, reservation_type: str = None, start: Instant = None, end: Instant = None,
+                by: str = None) -> Union[float, Dict[Any, float]]:
+        """Suma `total_price` de las reservas que empiezan en `[start, end)`.
+
+        Args:
+            reservation_type: 'vehicle', 'hotel' o None para ambos.
+            start, end: Límites del periodo (None = sin límite).
+            by: None para el total, 'resource' (`car_type` u hotel) o 'user'.
+
+        Returns:
+            El total, o `{recurso_o_usuario: total}` si se agrupa.
+        """
+        if by is not None and by not in REVENUE_GROUPS:
+            raise ValueError(f"Unknown revenue grouping '{by}' (expected one of {', '.join(REVENUE_GROUPS)})")
+        start = None if start is None else _instant(start)
+        end = None if end is None else _instant(end)
+        kinds = [reservation_type] if reservation_type else list(self.tables)
+        dictionary = self.resources if by == "resource" else self.users
+        totals = [0.0] * len(dictionary) if by else [0.0]
+        for kind in kinds:
+            table = self.tables[kind]
+            groups = getattr(table, by) if by else None
+            if self._np is not None:
+                mask = self._np.ones(table.size, dtype=bool)
+                if start is not None:
+                    mask &= table.start >= start
+                if end is not None:
+                    mask &= table.start < end
+                if groups is None:
+                    totals[0] += float(table.price[mask].sum())
+                else:
+                    sums = self._np.bincount(groups[mask], weights=table.price[mask],
+                                             minlength=len(dictionary))
+                    totals = [a + b for a, b in zip(totals, sums.tolist())]
+                continue
+            for i, (res_start, price) in enumerate(zip(table.start, table.price)):
+                if (start is None or res_start >= start) and (end is None or res_start < end):
+                    totals[groups[i] if groups is not None else 0] += price
+        if not by:
+            return totals[0]
+        return {dictionary.decode(i): total for i, total in enumerate(totals) if total}
+
+
+def _instant(value: Instant) -> int:
+    """Convierte una fecha (o un instante ya entero) a segundos desde `records.EPOCH`."""
+    return value if isinstance(value, int) else to_epoch(value)
@@ -1,27 +1,116 @@
 """
 Database Manager - Maneja todas las operaciones con archivos JSON
 """
-import json
 import os
-from typing import Any, Dict, List, Union
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos, solo la comprobación de versión
+    fcntl = None
+
+from group_commit import GroupCommit
+from metrics import METRICS
+from serialization import DEFAULT_CODEC, Codec, decode_document, get_codec
+from sqlite_store import SQLiteStore
+
+# Motores de almacenamiento soportados
+BACKENDS = ("json", "sqlite")
+
+# Clave con el número de secuencia que cada escritura guarda en los documentos JSON
+VERSION_KEY = "_version"
+
+# Sufijo del archivo auxiliar sobre el que se toma el bloqueo de cada documento
+LOCK_SUFFIX = ".lock"
+
+
+def clone_json(value: Any) -> Any:
+    """Copia recursiva de estructuras JSON (dict/list); los escalares se comparten.
+
+    Es bastante más barata que `copy.deepcopy` y que volver a parsear el archivo,
+    y es la forma en que el caché entrega copias mutables a los llamadores.
+    """
+    if isinstance(value, dict):
+        return {k: clone_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone_json(v) for v in value]
+    return value
 
 
 class DatabaseManager:
     """Gestiona la lectura y escritura de archivos JSON"""
     
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, cache_enabled: bool = True,
+                 backend: str = "json", sqlite_file: str = "reservations.db",
+                 group_commit_interval: float = None, group_commit_batch: int = 64,
+                 codecs: Dict[str, str] = None, default_codec: str = DEFAULT_CODEC):
         """Inicializa el gestor de base de datos.
 
         Args:
             base_dir: Directorio base donde se almacenan los archivos JSON.
                 Si es None, se usa el directorio del módulo (`__file__`).
+            cache_enabled: Si es True, el contenido decodificado de cada archivo
+                se mantiene en memoria y se reutiliza mientras el archivo no cambie.
+            backend: 'json' (por defecto, un archivo por documento) o 'sqlite'
+                (una base SQLite en modo WAL, ver `SQLiteStore`).
+            sqlite_file: Nombre del archivo de base de datos para el backend 'sqlite'.
+            group_commit_interval: Si se indica (segundos), `update_json_file` y
+                `save_json_file` usan group commit (`GroupCommit`): los cambios
+                que llegan juntos se escriben en una sola escritura con `fsync`
+                como mucho cada `group_commit_interval` segundos o cada
+                `group_commit_batch` cambios. Solo backend 'json'.
+            group_commit_batch: Cambios por escritura que la disparan sin esperar.
+            codecs: Codec con el que se escribe cada archivo (`{'reservations.json':
+                'pickle'}`, ver `serialization.CODECS`); backend 'json'.
+            default_codec: Codec de los archivos que no están en `codecs`
+                ('json-pretty', el JSON legible de siempre).
 
         Notas:
             - Todas las operaciones de lectura/escritura usan rutas absolutas
               resueltas con `resolve_path`.
             - No se realizan cambios en disco hasta que se invoca `save_json_file`.
+            - El caché se valida contra `st_mtime_ns`, tamaño e inode del archivo,
+              por lo que detecta cambios hechos por otros procesos.
+            - Con el backend 'sqlite' los nombres de archivo siguen siendo la
+              interfaz (`load_json_file('reservations.json')`), pero además
+              `self.sql` expone consultas indexadas para los Managers.
+            - Al leer, el formato se detecta por el contenido: un archivo se
+              puede pasar a otro codec sin migrarlo (la próxima escritura lo
+              convierte). 'pickle' solo debe usarse con archivos locales de
+              confianza y 'marshal' depende de la versión de Python.
+            - Las escrituras toman un bloqueo exclusivo (`lock`), guardan en el
+              documento un número de secuencia (`VERSION_KEY`) y reemplazan el
+              archivo de forma atómica; las lecturas no se bloquean nunca.
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown storage backend '{backend}'")
+        if group_commit_interval is not None and backend != "json":
+            raise ValueError("Group commit is only available with the 'json' backend")
+        if (codecs or default_codec != DEFAULT_CODEC) and backend != "json":
+            raise ValueError("Codecs are only available with the 'json' backend")
+        # Valida los nombres antes de tocar nada (ValueError si alguno no existe)
+        self.default_codec = get_codec(default_codec)
+        self.codecs: Dict[str, Codec] = {name: get_codec(codec) for name, codec in (codecs or {}).items()}
         self.base_dir = base_dir or os.path.dirname(__file__)
+        self.backend = backend
+        self.sql: Optional[SQLiteStore] = None
+        if backend == "sqlite":
+            self.sql = SQLiteStore(self.resolve_path(sqlite_file))
+        self.cache_enabled = cache_enabled
+        # path -> (versión del archivo, datos decodificados, secuencia guardada)
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], Any, int]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Reintentos optimistas de `update_json_file` antes de serializar con el bloqueo
+        self.write_retries = 3
+        self.write_conflicts = 0
+        # path -> versión del archivo tras la última escritura de este proceso
+        self._written: Dict[str, Tuple[int, int, int]] = {}
+        self.group_commit: Optional[GroupCommit] = None
+        if group_commit_interval is not None:
+            self.group_commit = GroupCommit(self, group_commit_interval, group_commit_batch)
     
     def resolve_path(self, json_file: str) -> str:
         """Construye y retorna el path absoluto para el archivo JSON dado.
@@ -34,17 +123,18 @@ class DatabaseManager:
         """
         return os.path.join(self.base_dir, json_file)
     
-    def load(self, json_file: str, default: Any = None) -> Any:
+    def load(self, json_file: str, default: Any = None, readonly: bool = False) -> Any:
         """Carga datos desde `json_file` y devuelve `default` si el resultado es vacío.
 
         Args:
             json_file: Nombre del archivo JSON a leer.
             default: Valor que se retorna si el archivo no existe o está vacío.
+            readonly: Ver `load_json_file`.
 
         Returns:
             Contenido decodificado del JSON o `default` si no hay datos.
         """
-        return self.load_json_file(json_file) or default
+        return self.load_json_file(json_file, readonly) or default
     
     def save(self, json_file: str, data: Any) -> bool:
         """Guarda `data` en `json_file` usando `save_json_file`.
@@ -58,40 +148,345 @@ class DatabaseManager:
         """
         return self.save_json_file(json_file, data)
     
-    def load_json_file(self, json_file: str) -> Union[Dict, List]:
+    def file_version(self, json_file: str) -> Optional[Tuple[int, int, int]]:
+        """Retorna un identificador de versión del archivo en disco.
+
+        Returns:
+            Tupla `(st_mtime_ns, st_size, st_ino)` o None si el archivo no existe.
+            Con el backend 'sqlite' es `(version,)`, el contador de escrituras del
+            documento. Dos lecturas con la misma versión devuelven el mismo contenido.
+        """
+        if self.sql is not None:
+            return (self.sql.version(json_file),)
+        try:
+            st = os.stat(self.resolve_path(json_file))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def load_json_file(self, json_file: str, readonly: bool = False) -> Union[Dict, List]:
         """Lee y decodifica el archivo JSON indicado.
 
         Comportamiento:
             - Si el archivo no existe devuelve `{}`.
             - Si el JSON es inválido devuelve `{}`.
+            - Si el archivo no cambió desde la última lectura se sirve desde el caché.
+
+        Args:
+            json_file: Nombre del archivo JSON a leer.
+            readonly: Si es True se devuelve el objeto compartido del caché, que
+                el llamador NO debe modificar. Si es False se devuelve una copia
+                propia que puede mutarse libremente.
 
         Returns:
             Dict o List según el contenido del JSON; `{}` en caso de error o ausencia.
         """
+        entry = self._load_entry(json_file)
+        if entry is None:
+            return {}
+        data = entry[1]
+        return data if readonly else clone_json(data)
+    
+    def codec_for(self, json_file: str) -> Codec:
+        """Codec con el que se escribe `json_file` (la lectura detecta el de cada archivo)."""
+        return self.codecs.get(json_file, self.default_codec)
+
+    def _load_entry(self, json_file: str) -> Optional[Tuple[Any, Any, int]]:
+        """Retorna `(versión, datos, secuencia)` de `json_file`, usando el caché si sigue vigente.
+
+        La secuencia (`VERSION_KEY`) se separa de los datos al leer, así que los
+        llamadores nunca la ven. Retorna None si el archivo no existe o su
+        contenido no es válido en ningún codec.
+        """
         path = self.resolve_path(json_file)
+        version = self.file_version(json_file)
+        if version is None:
+            self._cache.pop(path, None)
+            return None
+        
+        entry = self._cache.get(path)
+        if entry is not None and entry[0] == version:
+            self.cache_hits += 1
+            if METRICS.enabled:
+                METRICS.incr("cache_hits", json_file)
+            return entry
+        
+        self.cache_misses += 1
+        if METRICS.enabled:
+            METRICS.incr("cache_misses", json_file)
+            if self.sql is None:
+                METRICS.incr("file_opens", json_file)
+                METRICS.incr("bytes_read", json_file, version[1])
         try:
-            with open(path, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            if self.sql is not None:
+                data = self.sql.load_document(json_file)
+            else:
+                with open(path, 'rb') as file:
+                    data = decode_document(file.read())
         except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            return {}
+            return None
+        except ValueError:
+            # JSON mal formado, binario truncado o de otra versión
+            return None
+        if self.sql is not None:
+            seq = version[0]
+        elif isinstance(data, dict):
+            seq = data.pop(VERSION_KEY, 0)
+        else:
+            seq = 0
+        entry = (version, data, seq)
+        if self.cache_enabled:
+            self._cache[path] = entry
+        return entry
+    
+    def is_damaged(self, json_file: str) -> bool:
+        """True si `json_file` existe pero no se puede decodificar (p. ej. quedó truncado).
+
+        `load_json_file` lo lee como `{}`; las escrituras que parten de lo leído
+        (`update_json_file`, el journal) se niegan a reemplazarlo para no borrar
+        su contenido.
+        """
+        if self.sql is not None:
+            return False
+        return self._load_entry(json_file) is None and self.file_version(json_file) is not None
     
-    def save_json_file(self, json_file: str, data: Union[Dict, List]) -> bool:
-        """Serializa y guarda `data` en `json_file`.
+    def document_version(self, json_file: str) -> int:
+        """Retorna el número de secuencia guardado en `json_file` (0 si no existe).
+
+        Aumenta en 1 con cada escritura hecha por `save_json_file` o
+        `update_json_file`, desde cualquier proceso.
+        """
+        entry = self._load_entry(json_file)
+        return entry[2] if entry is not None else 0
+    
+    def last_write_version(self, json_file: str) -> Optional[Tuple[int, int, int]]:
+        """Versión (`file_version`) que dejó la última escritura de este proceso en `json_file`.
+
+        Se toma todavía con el bloqueo, así que identifica exactamente el
+        contenido escrito aunque otro proceso escriba justo después.
+        """
+        if self.sql is not None:
+            return self.file_version(json_file)
+        return self._written.get(self.resolve_path(json_file))
+    
+    @contextmanager
+    def lock(self, json_file: str):
+        """Bloqueo exclusivo entre procesos (advisory, `fcntl.flock`) para escribir `json_file`.
+
+        Se toma sobre `<json_file>.lock` y no sobre el documento, que se reemplaza
+        en cada escritura. No es reentrante: quien lo tiene no debe volver a
+        pedirlo para el mismo archivo. Sin `fcntl` (Windows) no bloquea.
+        """
+        handle = self.acquire_lock(json_file)
+        try:
+            yield
+        finally:
+            self.release_lock(handle)
+    
+    def acquire_lock(self, json_file: str):
+        """Toma el bloqueo de `lock` sin bloque `with` (lo libera `release_lock`).
+
+        Returns:
+            El archivo `.lock` abierto, o None si no hay bloqueo entre procesos.
+        """
+        if fcntl is None or self.sql is not None:
+            return None
+        handle = open(self.resolve_path(json_file) + LOCK_SUFFIX, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        except BaseException:
+            handle.close()
+            raise
+        return handle
+    
+    def release_lock(self, handle) -> None:
+        """Libera un bloqueo tomado con `acquire_lock`."""
+        if handle is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            finally:
+                handle.close()
+    
+    @contextmanager
+    def deferred_commits(self):
+        """Bloque en el que las escrituras con group commit no esperan al disco.
+
+        Yields:
+            Lista de futures (`(ok, resultado)`) de los cambios hechos dentro del
+            bloque; vacía sin group commit, donde cada escritura ya es síncrona.
+        """
+        if self.group_commit is None:
+            yield []
+            return
+        with self.group_commit.deferred() as commits:
+            yield commits
+    
+    def flush(self) -> None:
+        """Escribe los lotes pendientes del group commit (no hace nada sin él)."""
+        if self.group_commit is not None:
+            self.group_commit.flush()
+    
+    def close(self) -> None:
+        """Escribe lo pendiente y detiene el group commit; las escrituras siguientes son directas."""
+        if self.group_commit is not None:
+            self.group_commit.close()
+            self.group_commit = None
+    
+    def invalidate(self, json_file: str = None) -> None:
+        """Descarta la entrada de caché de `json_file` (o todo el caché si es None)."""
+        if json_file is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(self.resolve_path(json_file), None)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Retorna los contadores del caché de lectura.
+
+        Returns:
+            Dict con `hits`, `misses` (lecturas que parsearon el archivo) y
+            `entries` (archivos actualmente en memoria).
+        """
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "entries": len(self._cache),
+        }
+    
+    def save_json_file(self, json_file: str, data: Union[Dict, List], durable: bool = False) -> bool:
+        """Serializa y guarda `data` en `json_file` (reemplazando el contenido).
+
+        Para lectura-modificación-escritura usar `update_json_file`, que no
+        pierde cambios hechos por otros procesos entre la lectura y la escritura.
 
         Args:
             json_file: Nombre del archivo de destino.
             data: Dict o List que será serializado a JSON.
+            durable: Si es True retorna cuando el archivo ya está en disco
+                (`fsync`); el group commit lo hace siempre.
 
         Returns:
             True si se guardó correctamente, False y se imprime el error en pantalla en caso contrario.
         """
+        self._cache.pop(self.resolve_path(json_file), None)
+        if self.sql is not None:
+            return self.sql.save_document(json_file, data)
+        if self.group_commit is not None:
+            return self.group_commit.replace(json_file, clone_json(data))
+        with self.lock(json_file):
+            return self._write_atomic(json_file, data, self.document_version(json_file) + 1, durable)
+    
+    def update_json_file(self, json_file: str, operation, retries: int = None,
+                         atomic: bool = False) -> Tuple[bool, Any]:
+        """Lectura-modificación-escritura de `json_file` segura entre procesos.
+
+        `operation(data)` recibe una copia mutable del documento, la modifica y
+        retorna `(guardar, resultado)`. Cada intento lee sin bloqueo y solo toma
+        el bloqueo para escribir, comprobando que la secuencia del archivo sigue
+        siendo la leída (compare-and-swap). Si otro proceso escribió antes, se
+        vuelve a leer y a ejecutar `operation`, que así revalida sobre los datos
+        nuevos. Tras `retries` conflictos el último intento se hace entero con el
+        bloqueo tomado, por lo que siempre termina.
+
+        Con group commit `operation` se ejecuta una sola vez, sobre el estado
+        pendiente del lote, y la llamada retorna cuando el lote está en disco
+        (dentro de `deferred_commits`, sin esperar).
+
+        Args:
+            json_file: Nombre del archivo.
+            operation: Función `data -> (guardar, resultado)`; puede ejecutarse
+                varias veces y no debe pedir el bloqueo de `json_file`.
+            retries: Intentos optimistas; por defecto `self.write_retries`.
+            atomic: True si `operation` no modifica `data` cuando lanza una
+                excepción; con group commit evita copiar el estado del lote
+                (ver `GroupCommit.submit`).
+
+        Returns:
+            (ok, resultado): `ok` es False solo si falló la escritura (también
+            si el archivo existe pero no se puede leer: ver `is_damaged`).
+        """
+        if self.sql is not None:
+            self._cache.pop(self.resolve_path(json_file), None)
+            return (True, self.sql.update_document(json_file, operation))
+        if self.group_commit is not None:
+            return self.group_commit.update(json_file, operation, atomic)
+        
+        if retries is None:
+            retries = self.write_retries
+        for attempt in range(retries + 1):
+            pessimistic = attempt == retries
+            with ExitStack() as stack:
+                if pessimistic:
+                    stack.enter_context(self.lock(json_file))
+                token = self._version_token(json_file)
+                entry = self._load_entry(json_file)
+                data = clone_json(entry[1]) if entry is not None else {}
+                commit, result = operation(data)
+                if not commit:
+                    return (True, result)
+                if entry is None and self.file_version(json_file) is not None:
+                    print(f"Error saving to {json_file}: the file is unreadable, refusing to overwrite it")
+                    return (False, result)
+                if not pessimistic:
+                    stack.enter_context(self.lock(json_file))
+                    if self._version_token(json_file) != token:
+                        self.write_conflicts += 1
+                        continue
+                return (self._write_atomic(json_file, data, token[1] + 1), result)
+    
+    def _version_token(self, json_file: str) -> Tuple[Any, int]:
+        """Retorna `(file_version, secuencia)` para el compare-and-swap.
+
+        La secuencia guardada identifica la escritura; la versión del archivo
+        cubre además los documentos sin secuencia (listas o archivos editados a mano).
+        """
+        entry = self._load_entry(json_file)
+        if entry is None:
+            return (None, 0)
+        return (entry[0], entry[2])
+    
+    def _write_atomic(self, json_file: str, data: Union[Dict, List], seq: int,
+                      durable: bool = False) -> bool:
+        """Escribe `data` con la secuencia `seq` en un temporal y lo renombra sobre `json_file`.
+
+        `os.replace` es atómico: un lector ve el archivo anterior o el nuevo,
+        nunca uno a medio escribir. Con `durable` se hace `fsync` del temporal
+        antes de renombrarlo y del directorio después, así que al retornar el
+        cambio sobrevive a un corte de luz. Debe llamarse con el bloqueo tomado.
+        """
         path = self.resolve_path(json_file)
+        self._cache.pop(path, None)
+        payload = dict(data, **{VERSION_KEY: seq}) if isinstance(data, dict) else data
+        # Se codifica antes de abrir el temporal: un dato no serializable no deja basura
+        raw = self.codec_for(json_file).encode(payload)
+        # Con el bloqueo tomado basta con que el nombre sea único por proceso e hilo
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=4, ensure_ascii=False)
-            return True
-        except IOError as e:
+            with open(tmp_path, 'wb') as file:
+                file.write(raw)
+                if durable:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+            if durable:
+                fsync_dir(os.path.dirname(path))
+        except (IOError, OSError) as e:
             print(f"Error saving to {json_file}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
             return False
+        self._written[path] = self.file_version(json_file)
+        if METRICS.enabled:
+            METRICS.incr("file_opens", json_file)
+            METRICS.incr("bytes_written", json_file, self._written[path][1])
+        return True
+
+
+def fsync_dir(directory: str) -> None:
+    """`fsync` del directorio para que el renombrado sea durable (no existe en Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
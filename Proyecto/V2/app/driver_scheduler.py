@@ -0,0 +1,74 @@
+"""
+Driver Scheduler - Calendario por chofer y asignación balanceada
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from availability_index import IntervalIndex
+
+
+class DriverScheduler:
+    """Calendario de cada chofer construido a partir de `vehicle_reservations[].driver`.
+
+    Cada chofer tiene sus intervalos en un `IntervalIndex`, así que saber si está
+    libre en `[start, end)` cuesta O(log N) por candidato. Además se lleva la
+    carga (número de reservas asignadas) para repartir el trabajo: entre los
+    choferes libres se elige el de menor carga y, a igualdad, el primero del
+    listado de recursos.
+    """
+
+    def __init__(self):
+        """Crea un calendario vacío."""
+        self._calendar = IntervalIndex()
+        self._load: Dict[str, int] = {}
+
+    def add(self, driver: str, start: Any, end: Any) -> None:
+        """Registra una reserva `[start, end)` asignada a `driver`."""
+        if not driver:
+            return
+        self._calendar.add(driver, start, end)
+        self._load[driver] = self._load.get(driver, 0) + 1
+
+    def remove(self, driver: str, start: Any, end: Any) -> None:
+        """Elimina una reserva `[start, end)` del calendario de `driver`."""
+        if driver and self._calendar.remove(driver, start, end):
+            self._load[driver] -= 1
+            if not self._load[driver]:
+                del self._load[driver]
+
+    def is_free(self, driver: str, start: Any, end: Any) -> bool:
+        """Indica si `driver` no tiene reservas que se solapen con `[start, end)`."""
+        return self._calendar.count_overlapping(driver, start, end) == 0
+
+    def load(self, driver: str) -> int:
+        """Número de reservas asignadas a `driver`."""
+        return self._load.get(driver, 0)
+
+    def pick(self, candidates: List[Dict], start: Any, end: Any) -> Optional[Dict]:
+        """Elige un chofer libre en `[start, end)` entre `candidates` (ver `choose`)."""
+        stats = {}
+        for driver in candidates:
+            name = driver.get('name')
+            if name not in stats:
+                stats[name] = (not self.is_free(name, start, end), self.load(name))
+        return self.choose(candidates, stats)
+
+    @staticmethod
+    def choose(candidates: List[Dict], stats: Dict[str, Tuple[bool, int]]) -> Optional[Dict]:
+        """Elige el chofer libre de menor carga.
+
+        Args:
+            candidates: Choferes (dicts de `res_data.json`) en orden de alta.
+            stats: `{nombre: (ocupado, carga)}`; los nombres ausentes se
+                consideran libres y sin reservas.
+
+        Returns:
+            El chofer elegido, o None si todos están ocupados.
+        """
+        best = None
+        for position, driver in enumerate(candidates):
+            busy, load = stats.get(driver.get('name'), (False, 0))
+            if busy:
+                continue
+            if best is None or (load, position) < best[0]:
+                best = ((load, position), driver)
+        return best[1] if best else None
@@ -0,0 +1,356 @@
+"""
+Group Commit - Agrupa varias escrituras de un documento JSON en una sola escritura durable
+"""
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+
+
+def _clone_json(value: Any) -> Any:
+    """`database.clone_json` (se importa al usarlo: `database` importa este módulo)."""
+    from database import clone_json
+    return clone_json(value)
+
+
+class _Batch:
+    """Cambios pendientes de un documento: estado en memoria y quién espera su escritura."""
+
+    __slots__ = ("handle", "data", "seq", "opened", "waiters", "changes", "damaged")
+
+    def __init__(self, handle: Any, data: Any, seq: int, damaged: bool = False):
+        self.handle = handle
+        self.data = data
+        self.seq = seq
+        # El archivo existe pero no se pudo leer: el lote no debe escribirse sobre él
+        self.damaged = damaged
+        self.opened = time.monotonic()
+        # (future, resultado de la operación); el future recibe `(ok, resultado)`
+        self.waiters: List[Tuple[Future, Any]] = []
+        # Cuántos de ellos modificaron el estado (el resto solo esperan a que se escriba)
+        self.changes = 0
+
+
+class GroupCommit:
+    """Group commit para `DatabaseManager.update_json_file` (backend JSON).
+
+    - La primera escritura de un lote toma el bloqueo entre procesos del
+      documento (`DatabaseManager.lock`) y carga su estado; esa escritura y las
+      siguientes aplican su `operation` sobre ese estado en memoria, de una en
+      una, así que cada una valida contra las anteriores del lote.
+    - Un hilo de fondo escribe el estado una sola vez (con `fsync`) cuando el
+      lote llega a `batch_size` cambios o pasaron `interval` segundos desde que
+      se abrió, y después libera el bloqueo.
+    - Cada llamador recibe un `Future` que se resuelve con `(ok, resultado)`
+      solo cuando su cambio ya está en disco. Mientras el lote está abierto
+      ningún otro proceso puede escribir el documento, así que el resultado
+      calculado al encolar es el definitivo; solo `ok` depende de la escritura.
+    - El lote se escribe fuera del mutex: mientras dura el `fsync` se pueden
+      encolar cambios de otros documentos (los del mismo documento esperan a
+      que termine, para partir de lo escrito).
+    - Si una `operation` lanza una excepción el lote sigue como estaba antes
+      de ella (ver `submit`): el error es solo de ese llamador.
+
+    Lectura de lo pendiente: `load_json_file` y los demás lectores del archivo
+    ven lo que hay en disco, pero `pending` expone el estado del lote (abierto o
+    escribiéndose) y quien lo use ve los cambios encolados antes de que sean
+    durables. `ReservationManager` lo hace con sus índices: una reserva cuenta
+    para la disponibilidad (y aparece en `get_user_reservations`) desde que se
+    encola, aunque su llamador todavía espera la escritura; si el lote falla,
+    los índices se descartan y se reconstruyen desde el disco.
+    """
+
+    def __init__(self, db: 'DatabaseManager', interval: float = 0.01, batch_size: int = 64):
+        """Inicializa el group commit (el hilo de escritura arranca con el primer lote).
+
+        Args:
+            db: DatabaseManager dueño de los archivos (bloqueos y escritura atómica).
+            interval: Segundos máximos que un cambio espera a que se escriba su lote.
+            batch_size: Cambios que disparan la escritura sin esperar a `interval`.
+        """
+        self.db = db
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._batches: Dict[str, _Batch] = {}
+        # Lotes cerrados que se están escribiendo (fuera del mutex)
+        self._flushing: Dict[str, _Batch] = {}
+        self._listeners: Dict[str, List[Callable[[Any], None]]] = {}
+        # Un solo mutex: encolar, escribir y avisar a los oyentes nunca se solapan
+        self._mutex = threading.RLock()
+        self._wakeup = threading.Condition(self._mutex)
+        # Avisa cuando termina la escritura de un lote (ver `_enqueue`)
+        self._flushed = threading.Condition(self._mutex)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Escrituras diferidas del hilo actual (ver `deferred`)
+        self._local = threading.local()
+        self.flushes = 0
+        self.changes = 0
+
+    # ===== Encolado =====
+
+    def submit(self, json_file: str, operation, atomic: bool = False) -> Future:
+        """Aplica `operation` al estado pendiente de `json_file` y retorna su future.
+
+        Si `operation` lanza una excepción se propaga al llamador y el lote
+        queda como estaba: sin `atomic` se ejecuta sobre una copia del estado
+        (`clone_json`) cuando el lote ya tiene cambios de otros llamadores.
+
+        Args:
+            json_file: Nombre del documento.
+            operation: Función `data -> (guardar, resultado)`, como en
+                `DatabaseManager.update_json_file`; se ejecuta una sola vez y
+                solo debe modificar `data` si pide guardar.
+            atomic: True si `operation` no modifica `data` cuando lanza una
+                excepción (valida antes de modificar); ahorra la copia.
+
+        Returns:
+            Future que se resuelve con `(ok, resultado)` cuando el cambio es
+            durable (de inmediato si no había nada que guardar).
+        """
+        return self._enqueue(json_file, operation, atomic=atomic)[0]
+
+    def update(self, json_file: str, operation, atomic: bool = False) -> Tuple[bool, Any]:
+        """Como `submit`, pero espera a que el cambio sea durable y retorna `(ok, resultado)`.
+
+        Dentro de `deferred` no espera: retorna `(True, resultado)` y deja el
+        future en la lista del bloque.
+        """
+        future, result = self._enqueue(json_file, operation, atomic=atomic)
+        collected = getattr(self._local, "collected", None)
+        if collected is None or future.done():
+            return future.result()
+        collected.append(future)
+        return (True, result)
+
+    def replace(self, json_file: str, data: Any) -> bool:
+        """Reemplaza el contenido de `json_file` dentro del lote y espera a que se escriba.
+
+        `data` pasa a ser el estado del lote: el llamador no debe volver a usarlo.
+        """
+        future, _ = self._enqueue(json_file, lambda current: (True, None), replacement=data, atomic=True)
+        return future.result()[0]
+
+    @contextmanager
+    def deferred(self):
+        """Bloque en el que `update` no espera al disco.
+
+        Yields:
+            Lista de futures de los cambios encolados dentro del bloque; quien
+            responde al cliente debe esperarlos antes de confirmar.
+        """
+        previous = getattr(self._local, "collected", None)
+        collected: List[Future] = []
+        self._local.collected = collected
+        try:
+            yield collected
+        finally:
+            self._local.collected = previous
+
+    def _enqueue(self, json_file: str, operation, replacement: Any = None,
+                 atomic: bool = False) -> Tuple[Future, Any]:
+        """Ejecuta `operation` sobre el lote de `json_file` (abriéndolo si hace falta).
+
+        Con `replacement` el lote pasa a tener ese contenido, que reemplaza el
+        archivo aunque no se haya podido leer.
+
+        El bloqueo entre procesos de un lote nuevo se toma fuera del mutex: si
+        otro proceso lo tiene, esperar no debe impedir que el hilo de fondo
+        escriba (y libere) los lotes abiertos de otros archivos. Si el lote
+        anterior del mismo archivo se está escribiendo, el nuevo espera a que
+        termine para leer lo escrito.
+        """
+        future = Future()
+        handle, locked = None, False
+        try:
+            while True:
+                with self._mutex:
+                    if self._closed:
+                        raise RuntimeError("Group commit is closed")
+                    batch = self._batches.get(json_file)
+                    if batch is None and json_file in self._flushing:
+                        self._flushed.wait_for(lambda: json_file not in self._flushing)
+                        continue
+                    if batch is None and locked:
+                        batch = self._open(json_file, handle)
+                        locked = False
+                    if batch is not None:
+                        return self._apply(json_file, batch, operation, replacement, atomic, future)
+                handle, locked = self.db.acquire_lock(json_file), True
+        finally:
+            if locked:
+                # Otro hilo abrió el lote mientras se esperaba (solo sin bloqueo entre procesos)
+                self.db.release_lock(handle)
+
+    def _apply(self, json_file: str, batch: _Batch, operation, replacement: Any,
+               atomic: bool, future: Future) -> Tuple[Future, Any]:
+        """Aplica `operation` al lote y encola (o resuelve) su future; requiere el mutex."""
+        if replacement is not None:
+            batch.damaged = False
+        # Sin cambios de otros el lote se puede descartar entero si `operation` falla
+        copied = not atomic and bool(batch.waiters)
+        state = _clone_json(batch.data) if copied else batch.data
+        try:
+            commit, result = operation(state)
+        except BaseException:
+            if not batch.waiters:
+                self._abort(json_file)  # No hay cambios de otros que conservar
+            raise
+        if replacement is not None:
+            batch.data = replacement
+        elif copied and commit:
+            batch.data = state
+        if commit and batch.damaged:
+            print(f"Error saving to {json_file}: the file is unreadable, refusing to overwrite it")
+            self._abort(json_file)
+            future.set_result((False, result))
+            return future, result
+        if not commit and not batch.waiters:
+            # Nada pendiente: el resultado ya refleja lo que hay en disco
+            self._close(json_file)
+            future.set_result((True, result))
+            return future, result
+        batch.waiters.append((future, result))
+        batch.changes += bool(commit)
+        self._wakeup.notify()
+        return future, result
+
+    def _open(self, json_file: str, handle: Any) -> _Batch:
+        """Registra el lote de `json_file` con su bloqueo ya tomado (`handle`) y carga su estado."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+        # Con el bloqueo tomado nadie más cambia el archivo hasta que se escriba el lote
+        batch = _Batch(handle, self.db.load_json_file(json_file), self.db.document_version(json_file),
+                       self.db.is_damaged(json_file))
+        self._batches[json_file] = batch
+        return batch
+
+    def _close(self, json_file: str) -> _Batch:
+        """Quita el lote de `json_file` y libera su bloqueo."""
+        batch = self._batches.pop(json_file)
+        self.db.release_lock(batch.handle)
+        return batch
+
+    def _abort(self, json_file: str) -> None:
+        """Descarta el lote de `json_file`: sus futures se resuelven con `ok=False`."""
+        batch = self._close(json_file)
+        self._notify(json_file, None)
+        for future, result in batch.waiters:
+            future.set_result((False, result))
+
+    def pending(self, json_file: str) -> Optional[Any]:
+        """Estado del lote de `json_file` (solo lectura) o None si no hay lote.
+
+        Incluye el lote que se está escribiendo: hasta que se avisa a los
+        oyentes sus cambios pueden no estar en disco todavía. No toma el mutex:
+        se llama mientras se encola un cambio (desde la reconstrucción de
+        índices) y desde lectores que no deben esperar al disco.
+        """
+        batch = self._batches.get(json_file) or self._flushing.get(json_file)
+        return batch.data if batch is not None else None
+
+    # ===== Escritura =====
+
+    def listen(self, json_file: str, callback: Callable[[Any], None]) -> None:
+        """Registra `callback(versión)` tras cada escritura de `json_file`.
+
+        Se llama con el mutex tomado (ningún cambio se encola a la vez), con la
+        versión escrita (`DatabaseManager.last_write_version`) o None si el lote
+        no se pudo escribir.
+        """
+        self._listeners.setdefault(json_file, []).append(callback)
+
+    def _notify(self, json_file: str, version: Any) -> None:
+        for callback in self._listeners.get(json_file, ()):
+            callback(version)
+
+    def flush(self, json_file: str = None) -> None:
+        """Escribe ya los lotes pendientes (o solo el de `json_file`).
+
+        No debe llamarse con el mutex tomado (p. ej. desde una `operation`).
+        """
+        with self._mutex:
+            names = [json_file] if json_file is not None else list(self._batches)
+            taken = [(name, self._take(name)) for name in names if name in self._batches]
+        for name, batch in taken:
+            self._flush(name, batch)
+
+    def _take(self, json_file: str) -> _Batch:
+        """Cierra el lote de `json_file` a nuevos cambios y lo pasa a `_flushing`; requiere el mutex."""
+        # Primero en `_flushing`: `pending` (sin mutex) siempre encuentra el lote
+        batch = self._flushing[json_file] = self._batches[json_file]
+        del self._batches[json_file]
+        return batch
+
+    def _flush(self, json_file: str, batch: _Batch) -> None:
+        """Escribe un lote tomado con `_take` (con `fsync`), libera el bloqueo y resuelve sus futures.
+
+        La escritura se hace sin el mutex; el aviso a los oyentes y a los
+        llamadores, con él.
+        """
+        ok = False
+        try:
+            ok = self.db._write_atomic(json_file, batch.data, batch.seq + 1, durable=True)
+        except (TypeError, ValueError) as e:
+            # Un dato no serializable no debe dejar a los llamadores esperando
+            print(f"Error saving to {json_file}: {e}")
+        finally:
+            try:
+                with self._mutex:
+                    self._finish(json_file, batch, ok)
+            finally:
+                # Después de `_finish`: el siguiente lote del archivo parte de lo escrito
+                self.db.release_lock(batch.handle)
+
+    def _finish(self, json_file: str, batch: _Batch, ok: bool) -> None:
+        """Avisa a oyentes y llamadores de la escritura de `batch`; requiere el mutex."""
+        del self._flushing[json_file]
+        self._flushed.notify_all()
+        self.flushes += 1
+        self.changes += batch.changes
+        if METRICS.enabled:
+            METRICS.incr("group_commits", json_file)
+            METRICS.incr("group_commit_changes", json_file, batch.changes)
+        self._notify(json_file, self.db.last_write_version(json_file) if ok else None)
+        for future, result in batch.waiters:
+            future.set_result((ok, result))
+
+    def _run(self) -> None:
+        """Hilo de fondo: escribe cada lote al llenarse o al vencer su `interval`."""
+        while True:
+            with self._mutex:
+                now = time.monotonic()
+                due = None
+                taken = []
+                for name, batch in list(self._batches.items()):
+                    if self._closed or batch.changes >= self.batch_size \
+                            or now - batch.opened >= self.interval:
+                        taken.append((name, self._take(name)))
+                    else:
+                        deadline = batch.opened + self.interval
+                        due = deadline if due is None else min(due, deadline)
+                if not taken:
+                    if self._closed and not self._batches:
+                        return
+                    self._wakeup.wait(None if due is None else max(0.0, due - time.monotonic()))
+                    continue
+            for name, batch in taken:
+                self._flush(name, batch)
+
+    def close(self) -> None:
+        """Escribe lo pendiente y detiene el hilo de fondo."""
+        with self._mutex:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna escrituras físicas, cambios escritos y lotes abiertos."""
+        return {"flushes": self.flushes, "changes": self.changes, "pending": len(self._batches)}
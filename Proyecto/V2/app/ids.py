@@ -0,0 +1,46 @@
+"""
+Ids - Identificadores de reserva únicos y ordenados por tiempo
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+
+class ReservationIdGenerator:
+    """Genera ids `'<instante>-<nodo>-<secuencia>'`, p. ej. `'20261017093015123456-1a2b9f0c-7'`.
+
+    - instante: `created_at` con 20 dígitos fijos (`%Y%m%d%H%M%S%f`), así que
+      el orden alfabético de los ids es el orden de alta. Es estrictamente
+      creciente dentro del proceso aunque el reloj no avance o retroceda.
+    - nodo: pid del proceso (16 bits) y 16 bits aleatorios; distingue dos
+      procesos que reservan en el mismo microsegundo. Se renueva tras un `fork`.
+    - secuencia: contador del proceso, nunca se repite dentro de él.
+
+    Antes el id era `created_at.isoformat()`, que se repetía entre procesos
+    (o en un lote) dentro del mismo microsegundo; esos ids siguen siendo
+    válidos para consultar y cancelar.
+    """
+
+    def __init__(self):
+        """Crea un generador vacío (el nodo se calcula en el primer id)."""
+        self._lock = threading.Lock()
+        self._last: Optional[datetime] = None
+        self._seq = 0
+        self._pid = None
+        self._node = ""
+
+    def next(self) -> Tuple[str, str]:
+        """Retorna `(id, created_at)` de una reserva nueva (`created_at` en ISO)."""
+        with self._lock:
+            pid = os.getpid()
+            if pid != self._pid:
+                self._pid = pid
+                self._node = f"{pid & 0xFFFF:04x}{os.urandom(2).hex()}"
+                self._seq = 0
+            now = datetime.now()
+            if self._last is not None and now <= self._last:
+                now = self._last + timedelta(microseconds=1)
+            self._last = now
+            self._seq += 1
+            return f"{now:%Y%m%d%H%M%S%f}-{self._node}-{self._seq:x}", now.isoformat()
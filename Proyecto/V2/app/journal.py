@@ -0,0 +1,502 @@
+"""
+Journal - Registro append-only con compactación para reservas y usuarios
+"""
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import DatabaseManager, clone_json, fsync_dir
+from metrics import METRICS
+from sqlite_store import RESERVATION_KEYS
+
+
+class JsonJournal:
+    """Almacena un documento JSON como snapshot + journal de líneas JSON.
+
+    - El snapshot (p. ej. `reservations.json`) conserva el formato de siempre y
+      además la clave `journal_seq`: el último registro del journal que ya incluye.
+    - El journal (p. ej. `reservations.journal`) recibe un registro por cambio
+      `{"seq": n, "op": ..., ...}`; cada subclase define los registros en
+      `_apply_record`. Escribir un cambio cuesta O(1) sin importar el tamaño
+      del documento.
+    - El estado se reconstruye aplicando sobre el snapshot los registros con
+      `seq > journal_seq`. En memoria solo se leen los bytes nuevos del journal
+      desde la última lectura.
+    - `compact` vuelca el estado a un snapshot nuevo y vacía el journal. Se
+      dispara sola cuando el journal supera `compact_max_bytes` o cuando pasaron
+      `compact_interval` segundos desde el último snapshot.
+    - Las escrituras (registros, compactación) se serializan entre procesos con
+      `DatabaseManager.lock` sobre el journal; las lecturas no se bloquean.
+    - Es un write-ahead log: cada registro se escribe con `fsync` antes de
+      confirmarse, y el snapshot solo cambia al compactar (también con
+      `fsync`, antes de vaciar el journal). Si el proceso muere a mitad de un
+      registro, `recover` (al arrancar) o el siguiente `append` recortan la
+      línea incompleta; ese cambio nunca se había confirmado.
+    - Si el snapshot existe pero no se puede leer no se escribe nada (ni
+      registros ni compactación) hasta restaurarlo: ver `damaged`.
+    """
+
+    def __init__(self, db: DatabaseManager, snapshot_file: str, journal_file: str,
+                 compact_max_bytes: int = 4 * 1024 * 1024, compact_interval: float = 3600.0,
+                 sync: bool = True):
+        """Inicializa el journal.
+
+        Args:
+            db: Instancia de DatabaseManager (resuelve rutas y lee/escribe el snapshot).
+            snapshot_file: Nombre del archivo snapshot.
+            journal_file: Nombre del archivo journal (JSON lines).
+            compact_max_bytes: Tamaño del journal que dispara la compactación (0 = nunca).
+            compact_interval: Segundos desde el último snapshot que disparan la
+                compactación si hay registros pendientes (0 = nunca).
+            sync: Si es True (por defecto) cada escritura hace `fsync` antes de
+                retornar; con False un corte de luz puede perder los últimos
+                registros (nunca el resto del journal).
+        """
+        self.db = db
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_max_bytes = compact_max_bytes
+        self.compact_interval = compact_interval
+        self.sync = sync
+        self.compactions = 0
+        # Estado reconstruido y posición de lectura del journal
+        self._state: Optional[Dict] = None
+        self._snapshot_version = None
+        self._snapshot_seq = 0
+        self._offset = 0
+        self._seq = 0
+        # El snapshot existe pero no se pudo decodificar (ver `_refresh`)
+        self.damaged = False
+        # Bytes de registros a medio escribir descartados y resultado del último `recover`
+        self.torn_bytes = 0
+        self.last_recovery: Optional[Dict[str, Any]] = None
+        # `seq` del último registro escrito por este proceso (ver `update`)
+        self.last_write_seq = None
+        self.write_conflicts = 0
+        # Protege el estado en memoria cuando varios hilos leen a la vez
+        self._mutex = threading.RLock()
+
+    @property
+    def journal_path(self) -> str:
+        """Ruta absoluta del archivo journal."""
+        return self.db.resolve_path(self.journal_file)
+
+    def _journal_size(self) -> int:
+        """Tamaño actual del journal en bytes (0 si no existe)."""
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    # ===== Lectura =====
+
+    def version(self):
+        """Retorna el número del último registro aplicado.
+
+        Cambia con cada alta/cancelación (de este u otro proceso) pero no con la
+        compactación, que no altera el contenido lógico.
+        """
+        self._refresh()
+        return self._seq
+
+    def load(self, readonly: bool = False) -> Dict:
+        """Retorna el estado actual de las reservas (snapshot + journal).
+
+        Args:
+            readonly: Si es True devuelve el estado interno, que no debe modificarse.
+        """
+        with self._mutex:
+            self._refresh()
+            self._settle()
+            return self._state if readonly else clone_json(self._state)
+
+    def _refresh(self) -> None:
+        """Sincroniza el estado en memoria con los archivos en disco.
+
+        Si el snapshot cambió (o el journal se truncó) se reconstruye todo; en
+        otro caso solo se aplican las líneas nuevas del journal.
+        """
+        with self._mutex:
+            snapshot_version = self.db.file_version(self.snapshot_file)
+            size = self._journal_size()
+            if self._state is None or snapshot_version != self._snapshot_version or size < self._offset:
+                data = self.db.load_json_file(self.snapshot_file)
+                # Vacío puede ser un snapshot ilegible, que no se debe reemplazar por `{}`
+                self.damaged = not data and snapshot_version is not None \
+                    and self.db.is_damaged(self.snapshot_file)
+                self._seq = data.pop("journal_seq", 0) if isinstance(data, dict) else 0
+                self._snapshot_seq = self._seq
+                self._state = self._normalize(data)
+                self._snapshot_version = snapshot_version
+                self._offset = 0
+            if size > self._offset:
+                self._read_tail()
+
+    def _read_tail(self) -> None:
+        """Aplica las líneas completas del journal a partir de `self._offset`."""
+        if METRICS.enabled:
+            METRICS.incr("file_opens", self.journal_file)
+            METRICS.incr("bytes_read", self.journal_file, self._journal_size() - self._offset)
+        with open(self.journal_path, 'rb') as file:
+            file.seek(self._offset)
+            for raw in file:
+                if not raw.endswith(b"\n"):
+                    break  # Línea a medio escribir: se leerá cuando esté completa
+                self._offset += len(raw)
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                if record.get("seq", 0) > self._seq:
+                    self._apply(record)
+
+    def _apply(self, record: Dict) -> None:
+        """Aplica un registro del journal al estado en memoria."""
+        self._apply_record(record)
+        self._seq = record["seq"]
+
+    def _normalize(self, data: Any) -> Dict:
+        """Convierte el contenido del snapshot (sin `journal_seq`) en el estado en memoria."""
+        return data if isinstance(data, dict) else {}
+
+    def _apply_record(self, record: Dict) -> None:
+        """Aplica al estado el cambio descrito por `record` (lo define cada subclase)."""
+        raise NotImplementedError
+
+    def _settle(self) -> None:
+        """Termina de aplicar al estado los cambios diferidos (ver `ReservationJournal`)."""
+
+    # ===== Recuperación =====
+
+    def recover(self) -> Dict[str, Any]:
+        """Recuperación al arrancar: reconstruye el estado desde el snapshot y el journal.
+
+        Relee el snapshot, vuelve a aplicar los registros que aún no incluye
+        (`seq > journal_seq`) y recorta el registro a medio escribir que haya
+        dejado un proceso muerto al final del journal. La duración se guarda en
+        `last_recovery` y, con las métricas activas, en el histograma
+        `<Clase>.recover`.
+
+        Returns:
+            Dict con `replayed` (registros aplicados sobre el snapshot),
+            `torn_bytes` (bytes descartados), `damaged` (el snapshot no se pudo
+            leer) y `recovery_ms`.
+        """
+        started = time.perf_counter()
+        with self.db.lock(self.journal_file), self._mutex:
+            self._state = None
+            self._refresh()
+            torn = self._discard_torn_tail()
+            self._settle()
+            elapsed = time.perf_counter() - started
+            self.last_recovery = {
+                "replayed": self._seq - self._snapshot_seq,
+                "torn_bytes": torn,
+                "damaged": self.damaged,
+                "recovery_ms": round(elapsed * 1000, 3),
+            }
+        if METRICS.enabled:
+            METRICS.observe(f"{type(self).__name__}.recover", elapsed)
+        return self.last_recovery
+
+    def _discard_torn_tail(self) -> int:
+        """Recorta los bytes que siguen a la última línea completa; requiere el bloqueo y `_refresh`.
+
+        Con el bloqueo tomado nadie está escribiendo, así que una línea sin
+        salto final es de un proceso que murió a mitad de `append`. Si se
+        dejara, el siguiente registro quedaría pegado a ella y también se perdería.
+
+        Returns:
+            Bytes descartados.
+        """
+        torn = self._journal_size() - self._offset
+        if torn <= 0:
+            return 0
+        try:
+            os.truncate(self.journal_path, self._offset)
+        except OSError as e:
+            print(f"Error truncating {self.journal_file}: {e}")
+            return 0
+        self.torn_bytes += torn
+        return torn
+
+    # ===== Escritura =====
+
+    def append(self, record: Dict) -> bool:
+        """Agrega un registro al journal y lo aplica al estado en memoria.
+
+        Args:
+            record: Registro sin `seq` (se asigna aquí); ver `_apply_record`.
+
+        Returns:
+            True si se escribió correctamente, False en caso de error de IO.
+        """
+        return self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> bool:
+        """Agrega varios registros al journal con una sola escritura.
+
+        Cada registro recibe un `seq` consecutivo; ver `append`.
+        """
+        with self.db.lock(self.journal_file):
+            return self._append_locked(records)
+
+    def update(self, operation, retries: int = None) -> Tuple[bool, Any]:
+        """Valida y agrega registros sin perder escrituras concurrentes.
+
+        Mismo esquema que `DatabaseManager.update_json_file`: `operation()` valida
+        contra el estado actual y retorna `(registros, resultado)`; los registros
+        solo se agregan si nadie escribió en el journal desde que empezó el
+        intento (se compara el `seq`). Si otro proceso ganó, `operation` se vuelve
+        a ejecutar; el último intento se hace entero con el bloqueo tomado.
+
+        Returns:
+            (ok, resultado): `ok` es False solo si falló la escritura.
+        """
+        if retries is None:
+            retries = self.db.write_retries
+        for attempt in range(retries + 1):
+            pessimistic = attempt == retries
+            with ExitStack() as stack:
+                if pessimistic:
+                    stack.enter_context(self.db.lock(self.journal_file))
+                seq = self.version()
+                records, result = operation()
+                if not records:
+                    return (True, result)
+                if not pessimistic:
+                    stack.enter_context(self.db.lock(self.journal_file))
+                    if self.version() != seq:
+                        self.write_conflicts += 1
+                        continue
+                return (self._append_locked(records), result)
+
+    def _append_locked(self, records: List[Dict]) -> bool:
+        """Escribe `records` al final del journal (con `fsync` si `sync`); requiere el bloqueo tomado."""
+        self._refresh()
+        if self.damaged:
+            print(f"Error saving to {self.journal_file}: {self.snapshot_file} is unreadable")
+            return False
+        self._discard_torn_tail()
+        records = [dict(record, seq=self._seq + i) for i, record in enumerate(records, 1)]
+        data = b"".join((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+                        for record in records)
+        try:
+            with open(self.journal_path, 'ab') as file:
+                file.write(data)
+                end = file.tell()
+                if self.sync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            if self.sync and end == len(data):
+                # Journal recién creado: su entrada en el directorio también debe ser durable
+                fsync_dir(os.path.dirname(self.journal_path))
+        except IOError as e:
+            print(f"Error saving to {self.journal_file}: {e}")
+            return False
+        if METRICS.enabled:
+            METRICS.incr("file_opens", self.journal_file)
+            METRICS.incr("bytes_written", self.journal_file, len(data))
+
+        if end - len(data) == self._offset:
+            for record in records:
+                self._apply(record)
+            self._offset = end
+        else:
+            # Con el bloqueo nadie más escribe; esto solo pasa si el journal se
+            # modificó por fuera de la aplicación. Se releerá todo en el próximo acceso
+            self._state = None
+        self.last_write_seq = records[-1]["seq"]
+        if self.should_compact():
+            self._compact_locked()
+        return True
+
+    def replace(self, data: Dict) -> bool:
+        """Reemplaza todo el documento (equivale a guardarlo entero sin journal)."""
+        with self.db.lock(self.journal_file):
+            self._refresh()
+            data = clone_json(data)
+            if isinstance(data, dict):
+                data.pop("journal_seq", None)
+            self._state = self._normalize(data)
+            # Reemplazarlo todo es la forma de restaurar un snapshot ilegible
+            self.damaged = False
+            # Un reemplazo completo cambia el contenido: cuenta como un registro más
+            self._seq += 1
+            self.last_write_seq = self._seq
+            return self._compact_locked()
+
+    def should_compact(self) -> bool:
+        """Indica si se alcanzó el umbral de tamaño o de tiempo de compactación."""
+        size = self._journal_size()
+        if size == 0:
+            return False
+        if self.compact_max_bytes and size >= self.compact_max_bytes:
+            return True
+        if self.compact_interval:
+            try:
+                age = time.time() - os.path.getmtime(self.db.resolve_path(self.snapshot_file))
+            except FileNotFoundError:
+                return True
+            return age >= self.compact_interval
+        return False
+
+    def maybe_compact(self) -> bool:
+        """Compacta si `should_compact()`; retorna True si compactó."""
+        if self.should_compact():
+            return self.compact()
+        return False
+
+    def compact(self) -> bool:
+        """Vuelca el estado actual a un snapshot nuevo y vacía el journal.
+
+        Si el proceso muere entre ambos pasos no se pierde nada: el snapshot
+        guarda `journal_seq` y los registros ya incluidos se ignoran al releer.
+        El bloqueo del journal impide que otro proceso agregue registros entre
+        el snapshot y el vaciado.
+
+        Returns:
+            True si la compactación terminó correctamente.
+        """
+        with self.db.lock(self.journal_file):
+            return self._compact_locked()
+
+    def _compact_locked(self) -> bool:
+        """Implementación de `compact`; requiere el bloqueo del journal."""
+        self._refresh()
+        if self.damaged:
+            print(f"Error compacting {self.journal_file}: {self.snapshot_file} is unreadable")
+            return False
+        self._settle()
+        snapshot = dict(self._state, journal_seq=self._seq)
+        # El snapshot debe estar en disco antes de vaciar el journal que lo respalda
+        if not self.db.save_json_file(self.snapshot_file, snapshot, durable=True):
+            return False
+        try:
+            with open(self.journal_path, 'wb'):
+                pass
+        except IOError as e:
+            print(f"Error truncating {self.journal_file}: {e}")
+            return False
+        self._snapshot_version = self.db.last_write_version(self.snapshot_file)
+        self._snapshot_seq = self._seq
+        self._offset = 0
+        self.compactions += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna tamaño del journal, último `seq`, compactaciones y datos de recuperación."""
+        return {
+            "journal_bytes": self._journal_size(),
+            "seq": self._seq,
+            "compactions": self.compactions,
+            "torn_bytes": self.torn_bytes,
+            "recovery_ms": self.last_recovery["recovery_ms"] if self.last_recovery else None,
+        }
+
+
+class ReservationJournal(JsonJournal):
+    """Journal de `reservations.json`.
+
+    Registros: `{"op": "add", "type": "vehicle"|"hotel", "entry": {...}}` y
+    `{"op": "cancel", "type": ..., "id": ...}`.
+
+    Un `cancel` es una lápida: aplicarlo solo anota el id (O(1)) y las
+    reservas se quitan de las listas en una sola pasada la próxima vez que se
+    lee el estado completo (`load`) o al compactar, que las elimina del
+    snapshot. Los índices del gestor de reservas se actualizan aparte.
+    """
+
+    def __init__(self, db: DatabaseManager, snapshot_file: str = "reservations.json",
+                 journal_file: str = "reservations.journal", **options):
+        """Inicializa el journal de reservas (ver `JsonJournal` para `options`)."""
+        # Lápidas pendientes: clave de la lista -> ids cancelados
+        self._tombstones: Dict[str, set] = {}
+        super().__init__(db, snapshot_file, journal_file, **options)
+
+    def _normalize(self, data: Any) -> Dict:
+        """Garantiza las listas `vehicle_reservations` y `hotel_reservations`."""
+        data = super()._normalize(data)
+        for key in RESERVATION_KEYS.values():
+            data.setdefault(key, [])
+        self._tombstones = {}
+        return data
+
+    def _apply_record(self, record: Dict) -> None:
+        """Agrega una reserva o anota la lápida de su `id`."""
+        key = RESERVATION_KEYS.get(record.get("type"))
+        if key is not None:
+            if record.get("op") == "add":
+                if record["entry"].get("id") in self._tombstones.get(key, ()):
+                    # La lápida es anterior: no debe borrar la reserva nueva con ese id
+                    self._settle()
+                self._state[key].append(record["entry"])
+            elif record.get("op") == "cancel":
+                self._tombstones.setdefault(key, set()).add(record.get("id"))
+
+    def _settle(self) -> None:
+        """Quita de las listas las reservas con lápida."""
+        for key, ids in self._tombstones.items():
+            self._state[key] = [r for r in self._state[key] if r.get("id") not in ids]
+        self._tombstones = {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Como `JsonJournal.stats`, más las lápidas pendientes."""
+        stats = super().stats()
+        stats["tombstones"] = sum(len(ids) for ids in self._tombstones.values())
+        return stats
+
+
+class UserJournal(JsonJournal):
+    """Journal de `login.json`.
+
+    Cada alta o modificación de un usuario es un registro
+    `{"op": "put", "user": {...}}` que reemplaza (o agrega) el usuario con ese
+    `username`, así que registrar o migrar una contraseña no reescribe al resto.
+    El estado lleva además un índice `username -> posición` para `get` en O(1).
+    El snapshot se guarda siempre con el formato `{"users": [...]}`.
+    """
+
+    def __init__(self, db: DatabaseManager, snapshot_file: str = "login.json",
+                 journal_file: str = "login.journal", **options):
+        """Inicializa el journal de usuarios (ver `JsonJournal` para `options`)."""
+        self._positions: Dict[str, int] = {}
+        super().__init__(db, snapshot_file, journal_file, **options)
+
+    def _normalize(self, data: Any) -> Dict:
+        """Acepta `{"users": [...]}` o una lista directa y reconstruye el índice."""
+        if isinstance(data, list):
+            data = {"users": data}
+        data = super()._normalize(data)
+        users = data.setdefault("users", [])
+        self._positions = {}
+        for position, user in enumerate(users):
+            self._positions.setdefault(user.get("username", ""), position)
+        return data
+
+    def _apply_record(self, record: Dict) -> None:
+        """Reemplaza o agrega el usuario del registro."""
+        if record.get("op") != "put":
+            return
+        user = record["user"]
+        username = user.get("username", "")
+        position = self._positions.get(username)
+        if position is None:
+            self._positions[username] = len(self._state["users"])
+            self._state["users"].append(user)
+        else:
+            self._state["users"][position] = user
+
+    def get(self, username: str) -> Optional[Dict]:
+        """Retorna el usuario `username` (vista de solo lectura) o None."""
+        with self._mutex:
+            self._refresh()
+            position = self._positions.get(username)
+            return None if position is None else self._state["users"][position]
+
+    def users(self) -> List[Dict]:
+        """Retorna la lista de usuarios (vista de solo lectura)."""
+        return self.load(readonly=True)["users"]
@@ -1,6 +1,10 @@
 """
 Menu Manager - Gestiona los menús del sistema
 """
+from typing import Optional
+
+from metrics import METRICS
+
 class MenuManager:
     """Gestiona los menús interactivos del sistema"""
     
@@ -39,7 +43,9 @@ class MenuManager:
             2. Make Admin
             3. Manage Resources
             4. View Resources Data
-            5. Logout
+            5. View Top Customers
+            6. View Instrumentation Metrics
+            7. Logout
 
         Notas:
             - Esta función es el bucle principal del menú de administradores y
@@ -50,7 +56,9 @@ class MenuManager:
             "2. Make Admin",
             "3. Manage Resources",
             "4. View Resources Data",
-            "5. Logout"
+            "5. View Top Customers",
+            "6. View Instrumentation Metrics",
+            "7. Logout"
         ]
         
         while True:
@@ -66,6 +74,10 @@ class MenuManager:
             elif choice == "4":
                 self._view_resources_menu()
             elif choice == "5":
+                self._view_top_users()
+            elif choice == "6":
+                self._view_metrics()
+            elif choice == "7":
                 print("Logging out...")
                 break
             else:
@@ -74,7 +86,7 @@ class MenuManager:
     def user_menu(self, username: str, role: str) -> None:
         """Menú interactivo para usuarios con rol 'user'.
 
-        Opciones incluyen ver perfil, rentar vehículo, reservar hotel, ver y cancelar reservas.
+        Opciones incluyen ver perfil, rentar vehículo, reservar hotel, ver y cancelar reservas y ver el historial (incluye las archivadas).
         """
         menu_options = [
             "1. View User Data",
@@ -82,7 +94,8 @@ class MenuManager:
             "3. Reserve Hotel",
             "4. View My Reservations",
             "5. Cancel Reservation",
-            "6. Logout"
+            "6. View Reservation History",
+            "7. Logout"
         ]
         
         while True:
@@ -100,6 +113,8 @@ class MenuManager:
             elif choice == "5":
                 self._cancel_reservation_cli(username)
             elif choice == "6":
+                self._view_user_reservations(username, include_past=True)
+            elif choice == "7":
                 print("Logging out...")
                 break
             else:
@@ -209,30 +224,46 @@ class MenuManager:
             else:
                 print("Invalid choice. Please try again.")
     
+    def _choose_option(self, options: list, describe) -> Optional[dict]:
+        """Lista `options` numeradas con `describe(opción)` y retorna la elegida (None si no es válida)."""
+        for i, option in enumerate(options, 1):
+            print(f"{i}. {describe(option)}")
+        choice = input("Choose an option number: ").strip()
+        if not choice.isdigit() or not 1 <= int(choice) <= len(options):
+            print("Invalid option.")
+            return None
+        return options[int(choice) - 1]
+    
     def _rent_vehicle_cli(self, user: str) -> None:
-        """Interfaz CLI para reservar un vehículo mostrando opciones disponibles.
+        """Interfaz CLI para reservar un vehículo mostrando solo opciones reservables.
 
         Comportamiento:
-            - Muestra `get_available_cars()` para que el usuario elija un tipo válido.
-            - Solicita fechas y si necesita chofer.
+            - Solicita las fechas y muestra los tipos de coche con unidades
+              libres en ese rango (`ReservationManager.search_availability`),
+              con su precio total.
+            - El usuario elige uno por número e indica si necesita chofer.
             - Llama a `ReservationManager.rent_vehicle` y muestra el resultado.
         """
-        # Mostrar tipos de coche disponibles antes de pedir la elección
-        available = self.resource_mgr.get_available_cars()
-        if not available:
-            print("No cars available at the moment.")
+        start = input("Start date (YYYY-MM-DD): ").strip()
+        end = input("End date (YYYY-MM-DD): ").strip()
+
+        ok, options = self.reservation_mgr.search_availability(start, end, filters={'type': 'vehicle'})
+        if not ok:
+            print(f"✗ Error: {options}")
+            return
+        if not options:
+            print("No cars available for the requested dates.")
             return
 
         print("\nAvailable car types:")
-        for c in available:
-            print(f" - {c.get('type')}")
-
-        car_type = input("Choose car type to rent: ").strip()
-        start = input("Start date (YYYY-MM-DD): ").strip()
-        end = input("End date (YYYY-MM-DD): ").strip()
+        car = self._choose_option(options, lambda o: (
+            f"{o['car_type']} - {o['seats']} seats, licence {o['licence_type']} | "
+            f"{o['available']} left | ${o['total_price']} for {o['days']} day(s)"))
+        if car is None:
+            return
         need_driver = input("Need driver? (y/n): ").strip().lower() == 'y'
 
-        ok, result = self.reservation_mgr.rent_vehicle(user, car_type, start, end, need_driver)
+        ok, result = self.reservation_mgr.rent_vehicle(user, car['car_type'], start, end, need_driver)
         if ok:
             print("\n✓ Reservation created:")
             print(result)
@@ -240,25 +271,14 @@ class MenuManager:
             print(f"✗ Error: {result}")
     
     def _reserve_hotel_cli(self, user: str) -> None:
-        """Interfaz CLI para reservar hotel mostrando hoteles y tipos de habitación.
+        """Interfaz CLI para reservar hotel mostrando solo habitaciones reservables.
 
         Comportamiento:
-            - Lista hoteles y sus `room` entries con counts antes de pedir elección.
-            - Solicita pax, fechas y luego llama a `ReservationManager.reserve_hotel`.
+            - Solicita pax y fechas y muestra los pares hotel/tipo de habitación
+              con capacidad para `pax` y unidades libres en ese rango
+              (`ReservationManager.search_availability`), con su precio total.
+            - El usuario elige uno por número y se llama a `ReservationManager.reserve_hotel`.
         """
-        # Mostrar hoteles y tipos de habitación disponibles
-        hotels = self.resource_mgr.get_all_hotels()
-        if not hotels:
-            print("No hotels available at the moment.")
-            return
-
-        print("\nAvailable hotels and room types:")
-        for h in hotels:
-            print(f" - {h.get('name')} ({h.get('location')})")
-
-        hotel = input("Choose hotel name: ").strip()
-        room = input("Room type (Single/Double/Triple): ").strip()
-
         try:
             pax = int(input("Pax count: "))
         except ValueError:
@@ -268,18 +288,33 @@ class MenuManager:
         start = input("Start date (YYYY-MM-DD): ").strip()
         end = input("End date (YYYY-MM-DD): ").strip()
 
-        ok, result = self.reservation_mgr.reserve_hotel(user, hotel, room, start, end, pax)
+        ok, options = self.reservation_mgr.search_availability(start, end, pax, {'type': 'hotel'})
+        if not ok:
+            print(f"✗ Error: {options}")
+            return
+        if not options:
+            print("No rooms available for the requested dates.")
+            return
+
+        print("\nAvailable hotels and room types:")
+        room = self._choose_option(options, lambda o: (
+            f"{o['hotel']} ({o['location']}) - {o['room_type']} | "
+            f"{o['available']} left | ${o['total_price']} for {o['days']} night(s)"))
+        if room is None:
+            return
+
+        ok, result = self.reservation_mgr.reserve_hotel(user, room['hotel'], room['room_type'], start, end, pax)
         if ok:
             print("\n✓ Hotel reservation created:")
             print(result)
         else:
             print(f"✗ Error: {result}")
     
-    def _view_user_reservations(self, user: str) -> None:
-        """Muestra las reservas de un usuario"""
-        vehicle, hotel = self.reservation_mgr.get_user_reservations(user)
+    def _view_user_reservations(self, user: str, include_past: bool = False) -> None:
+        """Muestra las reservas de un usuario (con `include_past`, también las archivadas)"""
+        vehicle, hotel = self.reservation_mgr.get_user_reservations(user, include_past)
         
-        print(f"\n=== Reservations for {user} ===")
+        print(f"\n=== {'Reservation history' if include_past else 'Reservations'} for {user} ===")
         
         print("\n-- Vehicles --")
         if not vehicle:
@@ -310,6 +345,31 @@ class MenuManager:
                 print(f"[{i}] {r.get('hotel')} — {r.get('room_type')} — pax:{pax} — {start} → {end} ({days} days) — ${price}")
                 print(f"     🔑 ID: {res_id}")
     
+    def _view_top_users(self, limit: int = 10) -> None:
+        """Muestra los usuarios con más reservas (vista administrativa)."""
+        top = self.reservation_mgr.get_top_users(limit)
+        
+        print(f"\n=== Top {limit} Customers ===")
+        if not top:
+            print("  (no reservations)")
+            return
+        for i, (user, vehicles, hotels) in enumerate(top, 1):
+            print(f"[{i}] {user} — {vehicles + hotels} reservation(s) (vehicles: {vehicles}, hotels: {hotels})")
+    
+    def _view_metrics(self) -> None:
+        """Muestra la instrumentación (vista administrativa) y permite exportarla."""
+        print("\n=== Instrumentation Metrics ===")
+        if not METRICS.enabled:
+            print("Instrumentation is disabled. Start the app with --metrics to record it.")
+            return
+        print(METRICS.format_table())
+        
+        fmt = input("\nExport to file? (json/prometheus/n): ").strip().lower()
+        if fmt in ("json", "prometheus"):
+            path = input("File path: ").strip()
+            if path and METRICS.save(path, fmt):
+                print(f"Metrics saved to {path}.")
+    
     def _cancel_reservation_cli(self, user: str) -> None:
         """Interfaz CLI para cancelar una reservación"""
         self._view_user_reservations(user)
@@ -319,9 +379,9 @@ class MenuManager:
             print("✗ No ID provided.")
             return
         
-        res_type = input("Is it a vehicle or hotel reservation? (vehicle/hotel): ").strip().lower()
-        if res_type not in ('vehicle', 'hotel'):
-            print("✗ Invalid reservation type.")
+        vehicles, hotels = self.reservation_mgr.get_user_reservations(user)
+        if not any(r.get('id') == res_id for r in vehicles + hotels):
+            print(f"✗ No reservation found with ID: {res_id}")
             return
         
-        self.reservation_mgr.cancel_reservation(res_id, res_type)
+        self.reservation_mgr.cancel_reservation(res_id)
@@ -0,0 +1,225 @@
+"""
+Metrics - Instrumentación opcional: histogramas de latencia y contadores de IO
+"""
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Límites superiores (segundos) de los buckets de latencia; el último es +Inf
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Contadores conocidos y su descripción (exportación Prometheus)
+COUNTERS = {
+    "bytes_read": "Bytes read from data files",
+    "bytes_written": "Bytes written to data files",
+    "file_opens": "Data files opened for reading or writing",
+    "cache_hits": "Document reads served from the in-memory cache",
+    "cache_misses": "Document reads that parsed the file",
+    "rows_scanned": "Records visited by full scans and index rebuilds",
+    "group_commits": "Physical writes made by group commit",
+    "group_commit_changes": "Changes persisted by group commit writes",
+}
+
+# Prefijo de las métricas exportadas
+PROMETHEUS_PREFIX = "reservation_app"
+
+
+class Histogram:
+    """Histograma acumulado de latencias con los límites de `LATENCY_BUCKETS`."""
+
+    def __init__(self):
+        """Crea el histograma vacío."""
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Registra una medida."""
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimación del cuantil `q` (0-1): límite superior del bucket que lo contiene."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_json(self) -> Dict[str, Any]:
+        """Resumen en milisegundos más los conteos por bucket."""
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum * 1000, 4),
+            "mean_ms": round(self.sum * 1000 / self.count, 4) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 4),
+            "p95_ms": round(self.quantile(0.95) * 1000, 4),
+            "p99_ms": round(self.quantile(0.99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+            "buckets": {str(bound): n for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets)},
+        }
+
+
+class Instrumentation:
+    """Registro de métricas por método y contadores de IO.
+
+    Está desactivado por defecto y entonces no cuesta nada: los métodos solo se
+    envuelven al llamar a `instrument` (con `enable`), y los puntos de conteo
+    del código (`DatabaseManager`, `ReservationJournal`, reconstrucción de
+    índices) se limitan a comprobar `METRICS.enabled`.
+
+    - Latencia: un `Histogram` por `Clase.método` (tiempo inclusivo).
+    - Contadores: `COUNTERS`, etiquetados por origen (archivo o componente).
+    """
+
+    def __init__(self):
+        """Crea el registro vacío y desactivado."""
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def enable(self) -> None:
+        """Activa el registro (ver `instrument` para medir métodos)."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Desactiva el registro; los métodos ya envueltos dejan de medir."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Borra todas las medidas."""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Agrega una latencia al histograma `name`."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def incr(self, counter: str, source: str, value: float = 1) -> None:
+        """Suma `value` al contador `counter` del origen `source`."""
+        key = (counter, source)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def instrument(self, obj: Any, prefix: str, extra: Iterable[str] = ()) -> None:
+        """Envuelve en `obj` sus métodos públicos y los privados de `extra`.
+
+        El envoltorio se guarda como atributo de la instancia, así que las
+        llamadas internas (`self.metodo(...)`) también se miden. No hace nada
+        si el registro está desactivado.
+
+        Args:
+            obj: Instancia a instrumentar.
+            prefix: Nombre con el que aparecen sus métodos (`prefix.metodo`).
+            extra: Métodos privados que también se miden.
+        """
+        if not self.enabled:
+            return
+        names = [n for n in dir(type(obj)) if not n.startswith("_")] + list(extra)
+        for name in names:
+            method = getattr(obj, name, None)
+            if callable(method) and hasattr(method, "__self__") and not hasattr(method, "__wrapped__"):
+                setattr(obj, name, self._timed(f"{prefix}.{name}", method))
+
+    def _timed(self, name: str, method):
+        """Retorna `method` envuelto para registrar su latencia en `name`."""
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - start)
+        return wrapper
+
+    # ===== Exportación =====
+
+    def to_json(self) -> Dict[str, Any]:
+        """Retorna `{"enabled", "methods": {nombre: resumen}, "counters": {contador: {origen: valor}}}`."""
+        with self._lock:
+            methods = {name: h.to_json() for name, h in sorted(self.histograms.items())}
+            counters: Dict[str, Dict[str, float]] = {}
+            for (counter, source), value in sorted(self.counters.items()):
+                counters.setdefault(counter, {})[source] = value
+        return {"enabled": self.enabled, "methods": methods, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """Retorna las métricas en el formato de texto de Prometheus (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        metric = f"{PROMETHEUS_PREFIX}_method_latency_seconds"
+        lines.append(f"# HELP {metric} Latency of instrumented methods")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, histogram in histograms:
+            label = _label_value(name)
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), histogram.buckets):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{method="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{method="{label}"}} {histogram.sum!r}')
+            lines.append(f'{metric}_count{{method="{label}"}} {histogram.count}')
+        for counter, help_text in COUNTERS.items():
+            metric = f"{PROMETHEUS_PREFIX}_{counter}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, source), value in counters:
+                if name == counter:
+                    lines.append(f'{metric}{{source="{_label_value(source)}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def format_table(self, limit: int = 20) -> str:
+        """Resumen legible: los métodos con más tiempo acumulado y los contadores."""
+        data = self.to_json()
+        rows = sorted(data["methods"].items(), key=lambda item: item[1]["sum_ms"], reverse=True)[:limit]
+        lines = [f"{'method':<44}{'calls':>8}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, h in rows:
+            lines.append(f"{name:<44}{h['count']:>8}{h['sum_ms']:>12.2f}{h['p50_ms']:>10.3f}"
+                         f"{h['p95_ms']:>10.3f}{h['max_ms']:>10.3f}")
+        for counter, sources in data["counters"].items():
+            detail = ", ".join(f"{source}={value:g}" for source, value in sources.items())
+            lines.append(f"{counter}: {sum(sources.values()):g} ({detail})")
+        return "\n".join(lines)
+
+    def save(self, path: str, fmt: str = "json") -> bool:
+        """Guarda las métricas en `path` como 'json' o 'prometheus'."""
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                if fmt == "prometheus":
+                    file.write(self.to_prometheus())
+                else:
+                    json.dump(self.to_json(), file, indent=4)
+        except IOError as e:
+            print(f"Error saving to {path}: {e}")
+            return False
+        return True
+
+
+def _label_value(value: str) -> str:
+    """Escapa un valor de etiqueta Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registro global del proceso
+METRICS = Instrumentation()
@@ -0,0 +1,165 @@
+"""
+Occupancy - Libro de ocupación diaria por recurso, mantenido en cada escritura
+"""
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from records import DAY_SECONDS, EPOCH, to_epoch
+
+# Formato de `occupancy.json`; los libros de otro formato se recalculan.
+# 2: claves con los nombres del catálogo (antes, tal como se escribieron).
+LEDGER_FORMAT = 2
+
+
+def day_range(start: int, end: int) -> range:
+    """Días (contados desde `records.EPOCH`) que ocupa el intervalo `[start, end)`.
+
+    Un día `d` está ocupado si el intervalo se solapa con `[d, d + 1)`. Las
+    reservas de duración cero (mismo inicio y fin, que se cobran como un día)
+    ocupan su día de inicio; los intervalos invertidos (datos corruptos) no
+    ocupan ninguno.
+
+    Args:
+        start, end: Instantes en segundos (ver `records.to_epoch`).
+    """
+    if end < start:
+        return range(0)
+    first = start // DAY_SECONDS
+    return range(first, max(-(-end // DAY_SECONDS), first + 1))
+
+
+def epoch_day(value: date) -> int:
+    """Número de día (desde `records.EPOCH`) de una fecha."""
+    return to_epoch(value) // DAY_SECONDS
+
+
+def day_date(day: int) -> date:
+    """Fecha del día número `day` (inverso de `epoch_day`)."""
+    return EPOCH.date() + timedelta(days=day)
+
+
+class OccupancyLedger:
+    """Unidades reservadas por día para cada recurso.
+
+    Para cada clave (`('vehicle', car_type, '')` o `('hotel', hotel, room_type)`)
+    guarda un arreglo contiguo de contadores diarios desde su primer día
+    ocupado. Dar de alta o cancelar una reserva cuesta O(días de la reserva) y
+    la pregunta "¿queda una unidad libre en `[start, end)`?" se responde con el
+    máximo de los días del rango, sin depender del número de reservas.
+
+    Como las unidades de un mismo recurso son intercambiables, si ningún día
+    del rango llega al inventario existe una asignación de unidades válida, así
+    que este criterio no sobrevende y acepta reservas consecutivas que el
+    conteo de solapes rechazaba.
+    """
+
+    def __init__(self):
+        """Crea un libro vacío."""
+        self._days: Dict[Hashable, Tuple[int, array]] = {}
+
+    def add(self, key: Hashable, start: int, end: int, units: int = 1) -> None:
+        """Suma `units` a cada día de `[start, end)` (negativo para cancelar)."""
+        days = day_range(start, end)
+        if not days:
+            return
+        first, counts = self._days.get(key, (days.start, None))
+        if counts is None:
+            counts = _zeros(len(days))
+        if days.start < first:
+            counts = _zeros(first - days.start) + counts
+            first = days.start
+        missing = days.stop - (first + len(counts))
+        if missing > 0:
+            counts.extend(_zeros(missing))
+        for day in days:
+            counts[day - first] += units
+        self._days[key] = (first, counts)
+
+    def remove(self, key: Hashable, start: int, end: int) -> None:
+        """Descuenta una reserva `[start, end)` de `key`."""
+        self.add(key, start, end, -1)
+
+    def max_units(self, key: Hashable, start: int, end: int) -> int:
+        """Máximo de unidades reservadas en un día de `[start, end)`."""
+        days = day_range(start, end)
+        if key not in self._days or not days:
+            return 0
+        first, counts = self._days[key]
+        lo, hi = max(days.start - first, 0), min(days.stop - first, len(counts))
+        return max(counts[lo:hi]) if lo < hi else 0
+
+    def maxima(self, start: int, end: int) -> Dict[Hashable, int]:
+        """`max_units` de todos los recursos a la vez: `{clave: unidades}` (solo las > 0)."""
+        days = day_range(start, end)
+        found = {}
+        for key, (first, counts) in self._days.items():
+            lo, hi = max(days.start - first, 0), min(days.stop - first, len(counts))
+            if lo < hi:
+                units = max(counts[lo:hi])
+                if units:
+                    found[key] = units
+        return found
+
+    def units(self, key: Hashable, first_day: int, days: int) -> List[int]:
+        """Unidades reservadas en cada uno de los `days` días desde `first_day`."""
+        result = [0] * max(days, 0)
+        if key not in self._days:
+            return result
+        first, counts = self._days[key]
+        lo, hi = max(first_day, first), min(first_day + days, first + len(counts))
+        if lo < hi:
+            result[lo - first_day:hi - first_day] = counts[lo - first:hi - first]
+        return result
+
+    def entries(self) -> Dict[Hashable, Dict[int, int]]:
+        """Retorna `{clave: {día: unidades}}` sin los días a cero (para comparar)."""
+        return {key: {first + i: n for i, n in enumerate(counts) if n}
+                for key, (first, counts) in self._days.items() if any(counts)}
+
+    def diff(self, other: 'OccupancyLedger') -> List[Tuple[Hashable, int, int, int]]:
+        """Diferencias con `other` como `(clave, día, unidades_aquí, unidades_en_other)`."""
+        mine, theirs = self.entries(), other.entries()
+        found = []
+        for key in sorted(set(mine) | set(theirs), key=repr):
+            a, b = mine.get(key, {}), theirs.get(key, {})
+            for day in sorted(set(a) | set(b)):
+                if a.get(day, 0) != b.get(day, 0):
+                    found.append((key, day, a.get(day, 0), b.get(day, 0)))
+        return found
+
+    # ===== Persistencia =====
+
+    def to_json(self, version: Any) -> Dict:
+        """Documento JSON del libro, sellado con la `version` del almacenamiento de reservas."""
+        ledger = []
+        for key, (first, counts) in self._days.items():
+            if any(counts):
+                ledger.append({"key": list(key), "first_day": day_date(first).isoformat(),
+                               "units": counts.tolist()})
+        return {"format": LEDGER_FORMAT, "version": _stamp(version), "ledger": ledger}
+
+    @classmethod
+    def from_json(cls, data: Any, version: Any) -> Optional['OccupancyLedger']:
+        """Reconstruye el libro de `data` si está sellado con `version` (y `LEDGER_FORMAT`); None si no sirve."""
+        if (not isinstance(data, dict) or data.get("format") != LEDGER_FORMAT
+                or data.get("version") != _stamp(version)):
+            return None
+        ledger = cls()
+        try:
+            for item in data.get("ledger", []):
+                first = epoch_day(date.fromisoformat(item["first_day"]))
+                ledger._days[tuple(item["key"])] = (first, array('l', item["units"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+        return ledger
+
+
+def _zeros(n: int) -> array:
+    """Arreglo de `n` contadores a cero."""
+    return array('l', [0]) * n
+
+
+def _stamp(version: Any) -> Any:
+    """Versión del almacenamiento en forma serializable (las tuplas como listas)."""
+    return list(version) if isinstance(version, tuple) else version
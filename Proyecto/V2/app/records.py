@@ -0,0 +1,100 @@
+"""
+Records - Modelo compacto en memoria de las reservas (fechas como enteros)
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Union
+
+# Origen de los instantes enteros (fechas sin zona horaria, como en los JSON)
+EPOCH = datetime(1970, 1, 1)
+DAY_SECONDS = 86400
+
+# Memo cadena -> segundos: muchas reservas comparten la misma fecha de inicio/fin
+_EPOCH_CACHE: Dict[str, int] = {}
+_EPOCH_CACHE_MAX = 1 << 16
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parsea 'YYYY-MM-DD' o una fecha ISO con hora ('2026-01-01T00:00:00').
+
+    Se prueba primero `fromisoformat` (cubre los dos formatos que escribe la
+    aplicación) y después '%Y-%m-%d' con `strptime`, que además acepta días y
+    meses sin cero ('2026-1-5').
+
+    Raises:
+        ValueError si no coincide con ninguno de los dos formatos.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d')
+
+
+def to_epoch(value: Union[str, datetime, date]) -> int:
+    """Segundos desde `EPOCH` de una fecha (cadena, `datetime` o `date`).
+
+    Las cadenas se memorizan, así que cada fecha distinta se parsea una sola
+    vez y todas las reservas que la usan comparten el mismo entero.
+    """
+    if isinstance(value, str):
+        seconds = _EPOCH_CACHE.get(value)
+        if seconds is None:
+            seconds = to_epoch(parse_timestamp(value))
+            if len(_EPOCH_CACHE) >= _EPOCH_CACHE_MAX:
+                _EPOCH_CACHE.clear()
+            _EPOCH_CACHE[value] = seconds
+        return seconds
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    delta = value - EPOCH
+    return delta.days * DAY_SECONDS + delta.seconds
+
+
+def from_epoch(seconds: int) -> datetime:
+    """Inverso de `to_epoch`."""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class ReservationRecord:
+    """Reserva indexada: fechas ya parseadas y los campos que usan los índices.
+
+    Se construye una vez por reserva al cargar (o al darla de alta): el índice
+    por usuario guarda el registro y los de disponibilidad y choferes sus
+    enteros `start`/`end`, en lugar de volver a parsear las cadenas en cada
+    consulta. `res` es el dict original (vista de solo lectura), que es lo
+    que se devuelve a los llamadores; el formato en disco no cambia.
+
+    Las instancias se ordenan por `(start, end, order)`, donde `order` es la
+    posición de alta (orden del archivo).
+    """
+
+    __slots__ = ("kind", "user", "driver", "start", "end", "order", "res")
+
+    def __init__(self, kind: str, res: Dict, order: int = 0):
+        """Extrae y parsea los campos de `res`.
+
+        Args:
+            kind: 'vehicle' o 'hotel'.
+            res: Reserva tal como está en `reservations.json`.
+            order: Posición de alta.
+
+        Raises:
+            ValueError si `start` o `end` no son fechas válidas.
+        """
+        self.kind = kind
+        self.user = res.get('user')
+        self.driver = res.get('driver')
+        self.start = to_epoch(res['start'])
+        self.end = to_epoch(res['end'])
+        self.order = order
+        self.res = res
+
+    def __lt__(self, other: 'ReservationRecord') -> bool:
+        return (self.start, self.end, self.order) < (other.start, other.end, other.order)
+
+    def same_reservation(self, res: Dict) -> bool:
+        """True si `res` es esta reserva (mismo `id`, inicio y fin)."""
+        return (self.res.get('id') == res.get('id') and self.res.get('start') == res.get('start')
+                and self.res.get('end') == res.get('end'))
+
+    def __repr__(self) -> str:
+        return f"ReservationRecord({self.kind!r}, {self.res.get('id')!r}, {self.start}, {self.end})"
@@ -2,36 +2,92 @@
 Reservation Manager - Gestiona reservas de vehículos y hoteles
 """
 import json
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
+from archive import ReservationArchive, month_start
 from database import DatabaseManager
-from typing import Tuple, Optional, List, Dict
+from availability_index import ReservationIdIndex, UserReservationIndex
+from catalog import ResourceCatalog
+from columnar import ColumnarStore
+from driver_scheduler import DriverScheduler
+from ids import ReservationIdGenerator
+from occupancy import OccupancyLedger, day_date, epoch_day
+from slot_search import find_free_windows_by_day
+from sqlite_store import RESERVATION_KEYS, reservation_columns
+from journal import ReservationJournal
+from metrics import METRICS
+from records import ReservationRecord, parse_timestamp, to_epoch
+from typing import Any, Tuple, Optional, List, Dict, Union
+
+
+# Semánticas de `book_batch`
+BATCH_MODES = ("best-effort", "all-or-nothing")
+
+# Filtros aceptados por `ReservationManager.search_availability`
+SEARCH_FILTERS = ('type', 'location', 'hotel', 'room_type', 'car_type', 'max_price')
 
 
 class ReservationManager:
     """Gestiona reservas de vehículos y hoteles"""
     
-    def __init__(self, db: DatabaseManager, resource_mgr: 'ResourceManager'):
+    def __init__(self, db: DatabaseManager, resource_mgr: 'ResourceManager',
+                 journal: ReservationJournal = None, archive: ReservationArchive = None):
         """
         Inicializa el gestor de reservas.
         
         Args:
             db: Instancia de DatabaseManager
             resource_mgr: Instancia de ResourceManager
+            journal: Si se indica, las altas y cancelaciones se agregan a este
+                journal en lugar de reescribir `reservations.json` (solo backend JSON)
+            archive: Particiones comprimidas de reservas terminadas (ver
+                `archive_past`); por defecto `archive/` con gzip
         """
         self.db = db
         self.resource_mgr = resource_mgr
+        self.journal = journal
+        self.archive = archive or ReservationArchive(db)
         self.reservations_file = "reservations.json"
+        # Libro de ocupación diaria persistido junto a las reservas (backend JSON)
+        self.occupancy_file = "occupancy.json"
+        # Horizonte (en días) de la búsqueda de huecos libres
+        self.slot_search_horizon = 365
+        # Índices (ocupación diaria, por usuario, por chofer y por id) y versión desde la que se construyeron
+        self._ledger: Optional[OccupancyLedger] = None
+        self._user_index: Optional[UserReservationIndex] = None
+        self._id_index: Optional[ReservationIdIndex] = None
+        self._driver_scheduler: Optional[DriverScheduler] = None
+        self._index_version = None
+        # Versión con la que está sellado `occupancy.json` (para no reescribirlo sin cambios)
+        self._ledger_saved_version = None
+        # Almacén columnar para informes: (versión, ColumnarStore), ver `get_columnar`
+        self._columnar: Optional[Tuple[Any, ColumnarStore]] = None
+        # Serializa la reconstrucción de índices entre hilos lectores (servidor HTTP)
+        self._index_lock = threading.Lock()
+        # Durante `book_batch` las consultas usan solo los índices en memoria
+        self._in_batch = False
+        # Ids de las reservas nuevas (únicos aunque se creen seguidas o en otro proceso)
+        self.ids = ReservationIdGenerator()
+        if db.group_commit is not None:
+            db.group_commit.listen(self.reservations_file, self._on_group_commit)
     
-    def load_reservations(self) -> Dict:
+    def load_reservations(self, readonly: bool = False) -> Dict:
         """Carga todas las reservas desde `reservations.json`.
 
+        Args:
+            readonly: Si es True devuelve la vista compartida del caché de
+                `DatabaseManager`; solo debe usarse para consultas.
+
         Returns:
             Diccionario con claves `vehicle_reservations` y `hotel_reservations`.
 
         Nota:
             - Si el archivo no existe devuelve la estructura por defecto.
+            - En modo journal el resultado es el snapshot más los registros del journal.
         """
-        data = self.db.load_json_file(self.reservations_file)
+        if self.journal is not None:
+            return self.journal.load(readonly)
+        data = self.db.load_json_file(self.reservations_file, readonly)
         if not data:
             return {"vehicle_reservations": [], "hotel_reservations": []}
         return data
@@ -45,8 +101,24 @@ class ReservationManager:
         Returns:
             True si el guardado fue exitoso, False en caso de error de IO.
         """
+        if self.journal is not None:
+            return self.journal.replace(reservations)
         return self.db.save_json_file(self.reservations_file, reservations)
     
+    def _storage_version(self):
+        """Versión del almacenamiento de reservas (archivo o journal) para los índices."""
+        if self.journal is not None:
+            return self.journal.version()
+        return self.db.file_version(self.reservations_file)
+    
+    def _use_sql(self) -> bool:
+        """True si las consultas se resuelven en SQLite.
+
+        Dentro de `book_batch` se usan siempre los índices en memoria, que
+        incluyen las reservas del lote todavía no guardadas.
+        """
+        return self.db.sql is not None and not self._in_batch
+    
     def parse_date(self, date_str: str) -> datetime:
         """Parsea una cadena de fecha en un objeto `datetime`.
 
@@ -54,52 +126,362 @@ class ReservationManager:
             - 'YYYY-MM-DD' (sin hora)
             - Formato ISO que incluye tiempo (por ejemplo '2026-01-01T00:00:00')
 
+        Solo se usa para las fechas de entrada (solicitudes); las reservas
+        guardadas se parsean una vez al construir los índices (`ReservationRecord`).
+
         Raises:
             ValueError si la cadena no puede ser parseada por ninguno de los
-            formatos esperados. El método intenta primero '%Y-%m-%d' y luego
-            `fromisoformat`.
+            formatos esperados (ver `records.parse_timestamp`).
         """
-        try:
-            return datetime.strptime(date_str, '%Y-%m-%d')
-        except ValueError:
-            return datetime.fromisoformat(date_str)
+        return parse_timestamp(date_str)
     
     def is_resource_available(self, resource_name: str, resource_type: str, 
                             start_req: datetime, end_req: datetime, 
-                            total_inventory: int, reservations_list: List) -> bool:
+                            total_inventory: int, reservations_list: List = None,
+                            reservation_type: str = 'vehicle') -> bool:
         """Determina si hay al menos una unidad disponible del recurso pedido
         para el rango [start_req, end_req).
 
         Lógica:
-            - Recorre `reservations_list` y cuenta cuántas reservas del mismo
-              recurso y tipo se solapan con el rango solicitado.
-            - Considera solapamiento cuando (start_req < res_end) and (res_start < end_req).
+            - Toma el máximo de unidades reservadas en un mismo día del rango
+              (ver `occupancy.OccupancyLedger`): un día está ocupado por una
+              reserva si (dia < res_end) and (res_start < dia + 1).
             - Retorna True si `total_inventory - ocupadas > 0`.
+            - Si no se pasa `reservations_list` se consulta el libro de
+              ocupación (tabla `occupancy` en SQLite), en O(días del rango); si
+              se pasa, se construye un libro con las reservas de la lista.
 
         Args:
             resource_name: Nombre del recurso (hotel name o car type dependiendo).
             resource_type: Tipo de recurso (para hotels indica room_type, para cars indica car_type).
             start_req, end_req: Rangos de fecha como `datetime`.
             total_inventory: Cantidad total disponible de ese recurso.
-            reservations_list: Lista de reservas del tipo correspondiente.
+            reservations_list: Lista de reservas del tipo correspondiente (opcional).
+            reservation_type: 'vehicle' o 'hotel'; se usa solo con el índice.
 
         Returns:
             True si hay disponibilidad, False si está agotado para el rango.
         """
-        occupied = 0
+        if reservations_list is None:
+            key = self._index_key(reservation_type, resource_name, resource_type)
+            if self._use_sql():
+                occupied = self.db.sql.max_occupancy(reservation_type, key[1:], start_req, end_req)
+            else:
+                occupied = self._get_ledger().max_units(key, to_epoch(start_req), to_epoch(end_req))
+            return (total_inventory - occupied) > 0
+        
+        ledger = OccupancyLedger()
         for res in reservations_list:
             match_resource = (res.get('hotel') == resource_name and res.get('room_type') == resource_type) or \
                            (res.get('car_type') == resource_type)
             
             if match_resource:
-                res_start = self.parse_date(res['start'])
-                res_end = self.parse_date(res['end'])
-                
-                if start_req < res_end and res_start < end_req:
-                    occupied += 1
+                ledger.add(None, to_epoch(res['start']), to_epoch(res['end']))
+        occupied = ledger.max_units(None, to_epoch(start_req), to_epoch(end_req))
         
         return (total_inventory - occupied) > 0
     
+    # ===== Índices en memoria =====
+    
+    def _index_key(self, reservation_type: str, resource_name: str, resource_type: str) -> Tuple:
+        """Clave del índice para un recurso: `('vehicle', car_type, '')` o `('hotel', hotel, room_type)`.
+
+        `key[1:]` coincide con las columnas `(resource, subtype)` del backend SQLite.
+        Los nombres se llevan a los del catálogo (ver `_record_key`).
+        """
+        columns = (resource_type, '') if reservation_type == 'vehicle' else (resource_name, resource_type)
+        return (reservation_type,) + self.resource_mgr.get_catalog().canonical_columns(reservation_type, *columns)
+    
+    def _record_key(self, reservation_type: str, res: Dict, catalog: ResourceCatalog = None) -> Tuple:
+        """Clave del índice para una reserva almacenada.
+
+        Usa los nombres del catálogo (`ResourceCatalog.canonical_columns`), así
+        que 'Sedan' y 'sedan' ocupan el mismo recurso. `catalog` evita volver a
+        consultarlo en los recorridos completos.
+        """
+        catalog = catalog or self.resource_mgr.get_catalog()
+        return (reservation_type,) + catalog.canonical_columns(
+            reservation_type, *reservation_columns(reservation_type, res))
+    
+    def _ensure_indexes(self) -> None:
+        """Reconstruye los índices si no existen o si el almacenamiento cambió.
+
+        Los índices se construyen una vez a partir de `load_reservations` y luego
+        se actualizan incrementalmente en `rent_vehicle`, `reserve_hotel` y
+        `cancel_reservation`. Si otro proceso modifica `reservations.json` la
+        versión deja de coincidir y se reconstruyen.
+        """
+        if self._in_batch and self._ledger is not None:
+            return  # El lote trabaja sobre su propio conjunto en memoria
+        with self._index_lock:
+            version = self._storage_version()
+            if self._ledger is None or version != self._index_version:
+                self._rebuild_indexes(version)
+    
+    def _get_ledger(self) -> OccupancyLedger:
+        """Retorna el libro de ocupación diaria por (recurso, subtipo) actualizado."""
+        self._ensure_indexes()
+        return self._ledger
+    
+    def _get_user_index(self) -> UserReservationIndex:
+        """Retorna el índice de reservas por usuario actualizado."""
+        self._ensure_indexes()
+        return self._user_index
+    
+    def _get_driver_scheduler(self) -> DriverScheduler:
+        """Retorna el calendario de choferes actualizado."""
+        self._ensure_indexes()
+        return self._driver_scheduler
+    
+    def _get_id_index(self) -> ReservationIdIndex:
+        """Retorna el índice de reservas por id actualizado."""
+        self._ensure_indexes()
+        return self._id_index
+    
+    def _rebuild_indexes(self, version, recount: bool = False) -> None:
+        """Construye los índices desde el contenido actual del almacenamiento.
+
+        El libro de ocupación se toma de `occupancy.json` si está sellado con
+        `version` (y `recount` es False); si no, se recalcula desde las reservas.
+        """
+        reservations = self._pending_reservations()
+        if reservations is None:
+            reservations = self.load_reservations(readonly=True)
+        ledger = None if recount else self._load_ledger(version)
+        rebuild_ledger = ledger is None
+        if rebuild_ledger:
+            ledger = OccupancyLedger()
+        user_index = UserReservationIndex()
+        scheduler = DriverScheduler()
+        id_index = ReservationIdIndex()
+        catalog = self.resource_mgr.get_catalog()
+        for reservation_type, key in RESERVATION_KEYS.items():
+            for res in reservations.get(key, []):
+                record = ReservationRecord(reservation_type, res)
+                if rebuild_ledger:
+                    ledger.add(self._record_key(reservation_type, res, catalog), record.start, record.end)
+                user_index.add(record)
+                id_index.add(reservation_type, res)
+                if reservation_type == 'vehicle':
+                    scheduler.add(record.driver, record.start, record.end)
+        self._ledger = ledger
+        self._user_index = user_index
+        self._driver_scheduler = scheduler
+        self._id_index = id_index
+        self._index_version = version
+        if METRICS.enabled:
+            METRICS.incr("rows_scanned", "reservations",
+                         sum(len(reservations.get(key, [])) for key in RESERVATION_KEYS.values()))
+    
+    def _apply_to_indexes(self, changes: List[Tuple[str, str, Dict]], base_version) -> None:
+        """Aplica a los índices altas/bajas recién guardadas.
+
+        Args:
+            changes: Tuplas `(op, tipo, reserva)` con `op` 'add' o 'cancel'.
+            base_version: Versión del almacenamiento sobre la que se validó la
+                escritura. Si el índice no estaba construido sobre esa versión se
+                descarta y se reconstruirá en la próxima consulta.
+        """
+        if self._ledger is None or base_version != self._index_version:
+            self._ledger = None
+            return
+        for op, reservation_type, res in changes:
+            if op == 'add':
+                self._index_add(reservation_type, res)
+            else:
+                self._index_remove(reservation_type, res)
+        self._index_version = self._written_version()
+    
+    def _pending_reservations(self) -> Optional[Dict]:
+        """Reservas del lote de group commit abierto (guardadas o no), o None si no hay lote.
+
+        Los índices ya incluyen los cambios encolados (ver `_transact`), así que
+        si se reconstruyen a mitad de un lote deben partir de este estado y no
+        del archivo.
+        """
+        group_commit = self.db.group_commit
+        if group_commit is None or self.journal is not None:
+            return None
+        return group_commit.pending(self.reservations_file)
+    
+    def _on_group_commit(self, version) -> None:
+        """Oyente del group commit: el lote de `reservations.json` se escribió.
+
+        Sus cambios ya están en los índices, así que solo se adopta la versión
+        nueva; si la escritura falló se descartan y se reconstruirán. Toma
+        `_index_lock` para no cruzarse con una reconstrucción en curso.
+        """
+        with self._index_lock:
+            if version is None:
+                self._ledger = None
+            elif self._ledger is not None:
+                self._index_version = version
+    
+    def _written_version(self):
+        """Versión del almacenamiento que dejó la última escritura de este proceso.
+
+        Se registra con el bloqueo tomado, así que no incluye escrituras que
+        otro proceso haya hecho justo después de la nuestra.
+        """
+        if self.journal is not None:
+            return self.journal.last_write_seq
+        return self.db.last_write_version(self.reservations_file)
+    
+    def _index_add(self, reservation_type: str, res: Dict) -> None:
+        """Registra `res` en los índices en memoria."""
+        record = ReservationRecord(reservation_type, res)
+        self._ledger.add(self._record_key(reservation_type, res), record.start, record.end)
+        self._user_index.add(record)
+        self._id_index.add(reservation_type, res)
+        if reservation_type == 'vehicle':
+            self._driver_scheduler.add(record.driver, record.start, record.end)
+    
+    def _index_remove(self, reservation_type: str, res: Dict) -> None:
+        """Quita `res` de los índices en memoria."""
+        record = ReservationRecord(reservation_type, res)
+        self._ledger.remove(self._record_key(reservation_type, res), record.start, record.end)
+        self._user_index.remove(reservation_type, res)
+        self._id_index.remove(reservation_type, res)
+        if reservation_type == 'vehicle':
+            self._driver_scheduler.remove(record.driver, record.start, record.end)
+    
+    # ===== Persistencia de altas y bajas =====
+    
+    def _transact(self, build, indexed: bool = False) -> Tuple[bool, Any]:
+        """Valida y guarda cambios de reservas de forma atómica entre procesos.
+
+        `build()` valida contra el estado actual (índices o consultas SQLite) y
+        retorna `(cambios, resultado)`, donde `cambios` son tuplas
+        `(op, tipo, reserva)` con `op` 'add' o 'cancel'. Si otro proceso escribe
+        entre la validación y la escritura, `build` se vuelve a ejecutar sobre el
+        estado nuevo, así que dos procesos no pueden sobrevender un recurso:
+
+            - JSON: `DatabaseManager.update_json_file` (compare-and-swap).
+            - Journal: `ReservationJournal.update` (compare-and-swap sobre `seq`).
+            - SQLite: `build` se ejecuta dentro de la transacción de escritura
+              (solo altas; las bajas usan `delete_reservation`).
+            - Group commit: `build` se ejecuta una vez sobre el estado del lote y
+              sus cambios pasan a los índices en ese momento, para que el
+              siguiente cambio del lote los vea; `_on_group_commit` actualiza la
+              versión al escribirse el lote.
+
+        Args:
+            build: Función sin argumentos; puede ejecutarse varias veces.
+            indexed: True si `build` ya registra las altas en los índices (lotes).
+
+        Returns:
+            (ok, resultado): `ok` es False si falló la escritura.
+        """
+        base_version = [None]
+        
+        def validate():
+            if self.db.sql is None and not indexed:
+                self._ensure_indexes()
+            changes, result = build()
+            base_version[0] = self._index_version
+            return changes, result
+        
+        if self.db.sql is not None:
+            def build_items():
+                changes, result = validate()
+                return [(t, res) for _, t, res in changes], result
+            result = self.db.sql.insert_reservations_checked(build_items)
+            if indexed:
+                # SQLite no usa los índices en memoria fuera de un lote
+                self._ledger = None
+            return (True, result)
+        
+        if self.journal is not None:
+            def build_records():
+                changes, result = validate()
+                return self._journal_records(changes), (changes, result)
+            ok, (changes, result) = self.journal.update(build_records)
+        else:
+            grouped = self.db.group_commit is not None
+            
+            def operation(data):
+                # Atómica: todo lo que puede fallar ocurre antes de modificar `data`
+                changes, result = validate()
+                added: Dict[str, List[Dict]] = {}
+                cancelled: Dict[str, set] = {}
+                for op, reservation_type, res in changes:
+                    key = RESERVATION_KEYS[reservation_type]
+                    if op == 'add':
+                        added.setdefault(key, []).append(res)
+                    else:
+                        cancelled.setdefault(key, set()).add(res.get('id'))
+                # Las bajas se quitan en una sola pasada por lista
+                replaced = {}
+                for key, ids in cancelled.items():
+                    entries = data.get(key, []) + added.pop(key, [])
+                    replaced[key] = [r for r in entries if r.get('id') not in ids]
+                if grouped and not indexed and self._ledger is not None:
+                    try:
+                        for op, reservation_type, res in changes:
+                            if op == 'add':
+                                self._index_add(reservation_type, res)
+                            else:
+                                self._index_remove(reservation_type, res)
+                    except BaseException:
+                        self._ledger = None
+                        raise
+                data.update(replaced)
+                for key, entries in added.items():
+                    data.setdefault(key, []).extend(entries)
+                return bool(changes), (changes, result)
+            ok, (changes, result) = self.db.update_json_file(self.reservations_file, operation,
+                                                             atomic=True)
+            if grouped:
+                # Los índices ya tienen los cambios y `_on_group_commit` su versión;
+                # un lote rechazado (sin cambios) pudo dejar altas en los índices
+                if not ok or (indexed and not changes):
+                    self._ledger = None
+                return (ok, result)
+        
+        if indexed:
+            if ok and changes and base_version[0] == self._index_version:
+                # Las altas ya están en los índices: solo falta la versión nueva
+                self._index_version = self._written_version()
+            else:
+                self._ledger = None
+        elif ok and changes:
+            self._apply_to_indexes(changes, base_version[0])
+        return (ok, result)
+    
+    def _journal_records(self, changes: List[Tuple[str, str, Dict]]) -> List[Dict]:
+        """Convierte cambios `(op, tipo, reserva)` en registros del journal (una baja por id)."""
+        records = []
+        cancelled = set()
+        for op, reservation_type, res in changes:
+            if op == 'add':
+                records.append({"op": "add", "type": reservation_type, "entry": res})
+            elif (reservation_type, res.get('id')) not in cancelled:
+                cancelled.add((reservation_type, res.get('id')))
+                records.append({"op": "cancel", "type": reservation_type, "id": res.get('id')})
+        return records
+    
+    def _remove_reservations(self, res_id: str, reservation_type: str = None) -> Optional[List[Tuple[str, Dict]]]:
+        """Elimina las reservas con `id == res_id` (del tipo indicado, o de cualquiera).
+
+        Las reservas se localizan con el índice por id, sin recorrer las listas.
+        Con journal la baja es un registro `cancel` (una lápida) y la reserva
+        se quita físicamente del snapshot al compactar; con SQLite es un
+        DELETE por el índice de `id`.
+
+        Returns:
+            Lista de `(tipo, reserva)` eliminadas (vacía si no existía), o None
+            si falló el guardado.
+        """
+        if self.db.sql is not None:
+            return self.db.sql.delete_reservation(reservation_type, res_id)
+        
+        def build():
+            removed = self._id_index.get(res_id, reservation_type)
+            return [('cancel', kind, res) for kind, res in removed], removed
+        
+        ok, removed = self._transact(build)
+        return removed if ok else None
+    
     def has_overlapping_vehicle_reservation(self, user: str, start_req: datetime, end_req: datetime) -> Optional[Dict]:
         """Verifica si `user` ya tiene una reserva de vehículo que se solapa con las fechas.
 
@@ -114,20 +496,7 @@ class ReservationManager:
         Returns:
             La reserva existente (dict) que entra en conflicto, o None si no hay conflicto.
         """
-        reservations = self.load_reservations()
-        vehicle_reservations = reservations.get('vehicle_reservations', [])
-        
-        for res in vehicle_reservations:
-            # Solo revisar reservas del mismo usuario
-            if res.get('user') == user:
-                res_start = self.parse_date(res['start'])
-                res_end = self.parse_date(res['end'])
-                
-                # Verificar solapamiento: (InicioA < FinB) y (InicioB < FinA)
-                if start_req < res_end and res_start < end_req:
-                    return res  # Hay conflicto
-        
-        return None  # No hay conflicto
+        return self._find_user_overlap('vehicle', user, start_req, end_req)
     
     def has_overlapping_hotel_reservation(self, user: str, start_req: datetime, end_req: datetime) -> Optional[Dict]:
         """Verifica si `user` ya tiene una reserva de hotel que se solapa con las fechas.
@@ -137,23 +506,101 @@ class ReservationManager:
 
         Args y Returns: ver `has_overlapping_vehicle_reservation`.
         """
-        reservations = self.load_reservations()
-        hotel_reservations = reservations.get('hotel_reservations', [])
-        
-        for res in hotel_reservations:
-            # Solo revisar reservas del mismo usuario
-            if res.get('user') == user:
-                res_start = self.parse_date(res['start'])
-                res_end = self.parse_date(res['end'])
-                
-                # Verificar solapamiento: (InicioA < FinB) y (InicioB < FinA)
-                if start_req < res_end and res_start < end_req:
-                    return res  # Hay conflicto
+        return self._find_user_overlap('hotel', user, start_req, end_req)
+    
+    def _find_user_overlap(self, reservation_type: str, user: str,
+                           start_req: datetime, end_req: datetime) -> Optional[Dict]:
+        """Retorna la primera reserva de `user` del tipo dado que se solapa con el rango.
+
+        Solo se revisan las reservas del propio usuario: consulta indexada en
+        SQLite o búsqueda binaria en el índice por usuario con JSON.
+        """
+        if self._use_sql():
+            found = self.db.sql.find_reservations(reservation_type, user=user,
+                                                  start=start_req, end=end_req, limit=1)
+            return found[0] if found else None
         
-        return None  # No hay conflicto
+        # Verificar solapamiento: (InicioA < FinB) y (InicioB < FinA)
+        return self._get_user_index().find_overlap(reservation_type, user,
+                                                   to_epoch(start_req), to_epoch(end_req))
+
+    def find_available_driver(self, license_type: Optional[str], start: datetime,
+                              end: datetime) -> Optional[Dict]:
+        """Busca un chofer libre en `[start, end)` con la licencia indicada.
 
+        Entre los choferes libres se elige el de menor carga (menos reservas
+        asignadas) para repartir el trabajo; a igualdad, el primero del listado.
+
+        Args:
+            license_type: Licencia requerida; si es vacía sirve cualquier chofer.
+            start, end: Rango de la reserva.
+
+        Returns:
+            El chofer elegido o None si no hay ninguno libre.
+        """
+        if license_type:
+            candidates = self.resource_mgr.find_drivers_by_license(license_type)
+        else:
+            candidates = self.resource_mgr.get_all_drivers()
+        if not candidates:
+            return None
+        if self._use_sql():
+            names = list(dict.fromkeys(d.get('name') for d in candidates if d.get('name')))
+            return DriverScheduler.choose(candidates, self.db.sql.driver_schedule(names, start, end))
+        return self._get_driver_scheduler().pick(candidates, to_epoch(start), to_epoch(end))
+    
+    def _total_inventory(self, resource_name: str, resource_type: str, reservation_type: str) -> int:
+        """Retorna las unidades totales del recurso (`count` del coche o del tipo de habitación)."""
+        if reservation_type == 'vehicle':
+            car = self.resource_mgr.get_car(resource_name)
+            return car.get('count', 0) if car else 0
+        room = self.resource_mgr.get_room(resource_name, resource_type)
+        return room.get('count', 0) if room else 0
+    
+    def find_available_slots(self, resource_name: str, resource_type: str, duration_days: int,
+                             reservation_type: str = 'vehicle', horizon_days: int = None,
+                             limit: int = 1, start_date: str = None) -> List[Tuple[str, str]]:
+        """Busca las primeras `limit` ventanas de `duration_days` con disponibilidad.
+
+        Se leen una vez las unidades reservadas por día del horizonte (libro de
+        ocupación) y se recorren con un máximo deslizante (ver
+        `slot_search.find_free_windows_by_day`), en lugar de llamar a
+        `is_resource_available` una vez por día.
+
+        Args:
+            resource_name: Nombre del recurso (hotel name o car type).
+            resource_type: Tipo específico (room type o car type según `reservation_type`).
+            duration_days: Duración requerida en días.
+            reservation_type: 'vehicle' o 'hotel' para elegir la fuente de reservas.
+            horizon_days: Días candidatos a evaluar; por defecto `self.slot_search_horizon`.
+            limit: Número máximo de ventanas a devolver.
+            start_date: Primer día candidato ('YYYY-MM-DD'); por defecto hoy.
+
+        Returns:
+            Lista de tuplas (start_str, end_str) en 'YYYY-MM-DD', vacía si no hay huecos.
+        """
+        total_inventory = self._total_inventory(resource_name, resource_type, reservation_type)
+        if total_inventory <= 0:
+            return []
+        
+        if horizon_days is None:
+            horizon_days = self.slot_search_horizon
+        start_search = self.parse_date(start_date).date() if start_date else datetime.now().date()
+        key = self._index_key(reservation_type, resource_name, resource_type)
+        first_day = epoch_day(start_search)
+        days = horizon_days + max(duration_days, 1) - 1
+        if self._use_sql():
+            day_units = self.db.sql.occupancy_units(reservation_type, key[1:], first_day, days)
+        else:
+            day_units = self._get_ledger().units(key, first_day, days)
+        
+        windows = find_free_windows_by_day(day_units, total_inventory, start_search,
+                                           duration_days, horizon_days, limit)
+        return [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')) for s, e in windows]
+    
     def find_next_available_slot(self, resource_name: str, resource_type: str, 
-                                duration_days: int, reservation_type: str = 'vehicle') -> Optional[Tuple[str, str]]:
+                                duration_days: int, reservation_type: str = 'vehicle',
+                                horizon_days: int = None) -> Optional[Tuple[str, str]]:
         """Busca la primera ventana continua de `duration_days` donde exista
         disponibilidad para el recurso indicado dentro del horizonte de búsqueda.
 
@@ -162,45 +609,39 @@ class ReservationManager:
             resource_type: Tipo específico (room type o car type según `reservation_type`).
             duration_days: Duración requerida en días.
             reservation_type: 'vehicle' o 'hotel' para elegir la fuente de reservas.
+            horizon_days: Días a explorar; por defecto `self.slot_search_horizon` (365).
 
         Returns:
             Tupla (start_str, end_str) con fechas en 'YYYY-MM-DD' del primer slot
-            encontrado, o None si no hay hueco en el periodo de búsqueda (365 días).
+            encontrado, o None si no hay hueco en el periodo de búsqueda.
         """
-        reservations = self.load_reservations()
-        
-        total_inventory = 0
-        if reservation_type == 'vehicle':
-            car = self.resource_mgr.get_car(resource_name)
-            if car:
-                total_inventory = car.get('count', 0)
-            reservations_list = reservations.get('vehicle_reservations', [])
-        else:  # hotel
-            hotel = self.resource_mgr.get_hotel(resource_name)
-            if hotel:
-                for room in hotel.get('room', []):
-                    if room.get('type', '').lower() == resource_type.lower():
-                        total_inventory = room.get('count', 0)
-                        break
-            reservations_list = reservations.get('hotel_reservations', [])
-        
-        if total_inventory <= 0:
-            return None
-        
-        start_search = datetime.now().date()
-        max_search_days = 365
-        
-        for offset in range(max_search_days):
-            start_candidate = start_search + timedelta(days=offset)
-            end_candidate = start_candidate + timedelta(days=duration_days)
-            
-            if self.is_resource_available(resource_name, resource_type,
-                                        datetime.combine(start_candidate, datetime.min.time()),
-                                        datetime.combine(end_candidate, datetime.min.time()),
-                                        total_inventory, reservations_list):
-                return (start_candidate.strftime('%Y-%m-%d'), end_candidate.strftime('%Y-%m-%d'))
+        slots = self.find_available_slots(resource_name, resource_type, duration_days,
+                                          reservation_type, horizon_days, limit=1)
+        return slots[0] if slots else None
+    
+    def _validate_dates(self, start_date: str, end_date: str) -> Tuple[bool, Union[Tuple[datetime, datetime], str]]:
+        """Parsea y valida el rango de una reserva (o de una búsqueda).
+
+        Comprueba que `end >= start` y que la reserva se haga con al menos 72
+        horas de antelación.
+
+        Returns:
+            (True, (start, end)) si el rango es válido, (False, mensaje_de_error) si no.
+        """
+        try:
+            start = self.parse_date(start_date)
+            end = self.parse_date(end_date)
+        except Exception as e:
+            return (False, f"Invalid date format: {e}")
         
-        return None
+        if end < start:
+            return (False, "End date must be after start date")
+
+        # Validación: la reserva debe hacerse con al menos 72 horas de antelación
+        min_allowed_date = (datetime.now() + timedelta(hours=72)).date()
+        if start.date() < min_allowed_date:
+            return (False, f"Reservations must be made at least 72 hours in advance. Earliest start date: {min_allowed_date.strftime('%Y-%m-%d')}")
+        return (True, (start, end))
     
     def rent_vehicle(self, user: str, car_type: str, start_date: str,
                      end_date: str, need_driver: bool = None) -> Tuple[bool, str]:
@@ -215,31 +656,42 @@ class ReservationManager:
                             reservar dos vehículos solapados.
                         - Verifica disponibilidad por inventario y, si no hay, sugiere
                             el siguiente hueco disponible.
-                        - Si `need_driver` es True, busca un chofer con la licencia
-                            requerida por el coche; si no hay, retorna error.
+                        - Si `need_driver` es True, asigna un chofer con la licencia
+                            requerida por el coche que esté libre en esas fechas
+                            (el de menor carga); si no hay, retorna error.
 
                 Returns:
                         (True, entry_json) en caso de éxito (entry_json es JSON formateado de la reserva),
                         (False, mensaje_de_error) en caso de fallo.
                         """
-                
+        def build():
+            ok, entry = self._prepare_vehicle(user, car_type, start_date, end_date, need_driver)
+            return ([('add', 'vehicle', entry)] if ok else []), (ok, entry)
+        
+        saved, (ok, entry) = self._transact(build)
+        if not ok:
+            return (False, entry)
+        if not saved:
+            return (False, "Error saving reservation")
+        
+        return (True, json.dumps(entry, ensure_ascii=False, indent=2))
+    
+    def _prepare_vehicle(self, user: str, car_type: str, start_date: str,
+                         end_date: str, need_driver: bool = None) -> Tuple[bool, Union[Dict, str]]:
+        """Valida una reserva de vehículo y construye su entrada sin guardarla.
+
+        Returns:
+            (True, entrada) si la reserva es válida, (False, mensaje_de_error) si no.
+        """
         car = self.resource_mgr.get_car(car_type)
         if not car:
             return (False, f"Car type '{car_type}' not found")
+        car_type = car.get('type', car_type)  # Se guarda con el nombre del catálogo
         
-        try:
-            start = self.parse_date(start_date)
-            end = self.parse_date(end_date)
-        except Exception as e:
-            return (False, f"Invalid date format: {e}")
-        
-        if end < start:
-            return (False, "End date must be after start date")
-
-        # Validación: la reserva debe hacerse con al menos 72 horas de antelación
-        min_allowed_date = (datetime.now() + timedelta(hours=72)).date()
-        if start.date() < min_allowed_date:
-            return (False, f"Reservations must be made at least 72 hours in advance. Earliest start date: {min_allowed_date.strftime('%Y-%m-%d')}")
+        ok, dates = self._validate_dates(start_date, end_date)
+        if not ok:
+            return (False, dates)
+        start, end = dates
         
         # VALIDACIÓN DE EXCLUSIÓN MUTUA: Verificar si el usuario ya tiene otro vehículo
         existing_vehicle = self.has_overlapping_vehicle_reservation(user, start, end)
@@ -247,10 +699,8 @@ class ReservationManager:
             return (False, f"CONFLICT: You already have a vehicle reservation from {existing_vehicle.get('start')} to {existing_vehicle.get('end')}. "
                           f"You cannot reserve two vehicles at the same time (Mutual Exclusion Policy).")
         
-        reservations = self.load_reservations()
-        vehicle_reservations = reservations.get('vehicle_reservations', [])
-        
-        if not self.is_resource_available(car_type, car_type, start, end, car.get('count', 0), vehicle_reservations):
+        if not self.is_resource_available(car_type, car_type, start, end, car.get('count', 0),
+                                          reservation_type='vehicle'):
             duration_days = (end - start).days or 1
             next_slot = self.find_next_available_slot(car_type, car_type, duration_days, 'vehicle')
             if next_slot:
@@ -269,20 +719,19 @@ class ReservationManager:
                 return (False, f"No drivers available for '{car_type}' booking")
             
             required_license = car.get('licence_type')
-            if required_license:
-                driver = self.resource_mgr.find_driver_by_license(required_license)
-                if not driver:
-                    return (False, f"No available driver with licence type '{required_license}'")
-            else:
-                driver = drivers[0]
+            if required_license and not self.resource_mgr.find_driver_by_license(required_license):
+                return (False, f"No available driver with licence type '{required_license}'")
+            driver = self.find_available_driver(required_license, start, end)
+            if not driver:
+                return (False, f"No available driver for '{car_type}' on the requested dates")
         
         days = (end - start).days or 1
         price_per_day = car.get('price_per_day', 0)
         total_price = price_per_day * days
-        created_at = datetime.now().isoformat()
+        res_id, created_at = self.ids.next()
         
         entry = {
-            "id": created_at,
+            "id": res_id,
             "user": user,
             "car_type": car_type,
             "driver": driver.get('name') if isinstance(driver, dict) else None,
@@ -292,11 +741,7 @@ class ReservationManager:
             "total_price": total_price,
             "created_at": created_at
         }
-        
-        reservations.setdefault('vehicle_reservations', []).append(entry)
-        self.save_reservations(reservations)
-        
-        return (True, json.dumps(entry, ensure_ascii=False, indent=2))
+        return (True, entry)
     
     def reserve_hotel(self, user: str, hotel_name: str, room_type: str, 
                      start_date: str, end_date: str, pax: int = 1) -> Tuple[bool, str]:
@@ -312,32 +757,40 @@ class ReservationManager:
         Returns:
             (True, entry_json) en caso de éxito, (False, mensaje_de_error) en caso de fallo.
         """
+        def build():
+            ok, entry = self._prepare_hotel(user, hotel_name, room_type, start_date, end_date, pax)
+            return ([('add', 'hotel', entry)] if ok else []), (ok, entry)
+        
+        saved, (ok, entry) = self._transact(build)
+        if not ok:
+            return (False, entry)
+        if not saved:
+            return (False, "Error saving reservation")
+        
+        return (True, json.dumps(entry, ensure_ascii=False, indent=2))
+    
+    def _prepare_hotel(self, user: str, hotel_name: str, room_type: str,
+                       start_date: str, end_date: str, pax: int = 1) -> Tuple[bool, Union[Dict, str]]:
+        """Valida una reserva de hotel y construye su entrada sin guardarla.
+
+        Returns:
+            (True, entrada) si la reserva es válida, (False, mensaje_de_error) si no.
+        """
         hotel = self.resource_mgr.get_hotel(hotel_name)
         if not hotel:
             return (False, f"Hotel '{hotel_name}' not found")
         
-        room = None
-        for r in hotel.get('room', []):
-            if r.get('type', '').lower() == room_type.lower():
-                room = r
-                break
-        
+        room = self.resource_mgr.get_room(hotel_name, room_type)
+
         if not room:
             return (False, f"Room type '{room_type}' not found in hotel '{hotel_name}'")
+        # Se guardan con los nombres del catálogo
+        hotel_name, room_type = hotel.get('name', hotel_name), room.get('type', room_type)
         
-        try:
-            start = self.parse_date(start_date)
-            end = self.parse_date(end_date)
-        except Exception as e:
-            return (False, f"Invalid date format: {e}")
-        
-        if end < start:
-            return (False, "End date must be after start date")
-
-        # Validación: la reserva debe hacerse con al menos 72 horas de antelación
-        min_allowed_date = (datetime.now() + timedelta(hours=72)).date()
-        if start.date() < min_allowed_date:
-            return (False, f"Reservations must be made at least 72 hours in advance. Earliest start date: {min_allowed_date.strftime('%Y-%m-%d')}")
+        ok, dates = self._validate_dates(start_date, end_date)
+        if not ok:
+            return (False, dates)
+        start, end = dates
         
         # VALIDACIÓN DE EXCLUSIÓN MUTUA: Verificar si el usuario ya tiene otro hotel
         existing_hotel = self.has_overlapping_hotel_reservation(user, start, end)
@@ -345,10 +798,8 @@ class ReservationManager:
             return (False, f"CONFLICT: You already have a hotel reservation from {existing_hotel.get('start')} to {existing_hotel.get('end')}. "
                           f"You cannot reserve two hotels at the same time (Mutual Exclusion Policy).")
         
-        reservations = self.load_reservations()
-        hotel_reservations = reservations.get('hotel_reservations', [])
-        
-        if not self.is_resource_available(hotel_name, room_type, start, end, room.get('count', 0), hotel_reservations):
+        if not self.is_resource_available(hotel_name, room_type, start, end, room.get('count', 0),
+                                          reservation_type='hotel'):
             duration_days = (end - start).days or 1
             next_slot = self.find_next_available_slot(hotel_name, room_type, duration_days, 'hotel')
             if next_slot:
@@ -359,10 +810,10 @@ class ReservationManager:
         days = (end - start).days or 1
         pax_price = hotel.get('pax_price', 0)
         total_price = pax_price * pax * days
-        created_at = datetime.now().isoformat()
+        res_id, created_at = self.ids.next()
         
         entry = {
-            "id": created_at,
+            "id": res_id,
             "user": user,
             "hotel": hotel_name,
             "room_type": room_type,
@@ -373,54 +824,418 @@ class ReservationManager:
             "total_price": total_price,
             "created_at": created_at
         }
+        return (True, entry)
+    
+    # ===== Reservas por lotes =====
+    
+    def _prepare_request(self, request: Dict) -> Tuple[bool, Union[Dict, str]]:
+        """Valida una solicitud de `book_batch` (ver su formato allí)."""
+        if not isinstance(request, dict):
+            return (False, "Invalid request: expected an object")
+        reservation_type = request.get('type')
+        if reservation_type == 'vehicle':
+            required = ('user', 'car_type', 'start', 'end')
+        elif reservation_type == 'hotel':
+            required = ('user', 'hotel', 'room_type', 'start', 'end')
+        else:
+            return (False, f"Unknown reservation type '{reservation_type}'")
+        missing = [field for field in required if not request.get(field)]
+        if missing:
+            return (False, f"Invalid request: missing {', '.join(missing)}")
+        
+        if reservation_type == 'vehicle':
+            return self._prepare_vehicle(request['user'], request['car_type'], request['start'],
+                                         request['end'], request.get('need_driver'))
+        try:
+            pax = int(request.get('pax', 1))
+        except (TypeError, ValueError):
+            return (False, f"Invalid pax value: {request.get('pax')!r}")
+        return self._prepare_hotel(request['user'], request['hotel'], request['room_type'],
+                                   request['start'], request['end'], pax)
+    
+    def book_batch(self, requests: List[Dict],
+                   mode: str = "best-effort") -> Tuple[bool, List[Tuple[bool, Union[Dict, str]]]]:
+        """Procesa muchas reservas con una sola carga y una sola escritura.
+
+        Las reservas se cargan una vez en los índices en memoria y cada solicitud
+        se valida (mismas reglas que `rent_vehicle` / `reserve_hotel`) contra ese
+        conjunto, que incluye las reservas aceptadas antes en el mismo lote. Al
+        final todas las aceptadas se guardan juntas (ver `_transact`: si otro
+        proceso escribió mientras tanto, el lote completo se vuelve a validar).
+
+        Args:
+            requests: Lista de solicitudes:
+                `{"type": "vehicle", "user", "car_type", "start", "end", "need_driver"?}` o
+                `{"type": "hotel", "user", "hotel", "room_type", "start", "end", "pax"?}`.
+            mode: 'best-effort' guarda las válidas aunque otras fallen;
+                'all-or-nothing' no guarda nada si alguna falla.
+
+        Returns:
+            (guardado, resultados): `guardado` es False si no se persistió nada
+            por un fallo; `resultados` tiene una tupla por solicitud,
+            `(True, entrada)` o `(False, mensaje_de_error)`.
+        """
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown batch mode '{mode}' (expected one of {', '.join(BATCH_MODES)})")
         
-        reservations.setdefault('hotel_reservations', []).append(entry)
-        self.save_reservations(reservations)
+        def build():
+            results = []
+            changes = []
+            self._in_batch = True
+            try:
+                self._rebuild_indexes(self._storage_version())
+                for request in requests:
+                    ok, result = self._prepare_request(request)
+                    if ok:
+                        self._index_add(request['type'], result)
+                        changes.append(('add', request['type'], result))
+                    results.append((ok, result))
+            finally:
+                self._in_batch = False
+            if mode == "all-or-nothing" and len(changes) < len(results):
+                return [], (False, results)
+            return changes, (True, results)
         
-        return (True, json.dumps(entry, ensure_ascii=False, indent=2))
+        saved, (complete, results) = self._transact(build, indexed=True)
+        if not complete:
+            return (False, [(False, result if not ok else "Not saved: another request in the batch failed")
+                            for ok, result in results])
+        if not saved:
+            return (False, [(False, result if not ok else "Error saving reservation")
+                            for ok, result in results])
+        return (True, results)
     
-    def get_user_reservations(self, user: str) -> Tuple[List, List]:
+    def get_user_reservations(self, user: str, include_past: bool = False) -> Tuple[List, List]:
         """Retorna las reservas del usuario separadas en vehículos y hoteles.
 
         Args:
             user: Nombre/identificador del usuario.
+            include_past: Si es True se agregan delante las reservas ya
+                archivadas (ver `archive_past`), leyendo las particiones
+                comprimidas una a una y sin cargarlas enteras.
+
+        Returns:
+            Tuple (vehicle_list, hotel_list) filtradas por `user`. Los dicts
+            son vistas de solo lectura.
+        """
+        if self._use_sql():
+            current = (self.db.sql.find_reservations('vehicle', user=user),
+                       self.db.sql.find_reservations('hotel', user=user))
+        else:
+            user_index = self._get_user_index()
+            current = (user_index.user_reservations('vehicle', user),
+                       user_index.user_reservations('hotel', user))
+        if not include_past:
+            return current
+        
+        # Una reserva puede seguir en el almacenamiento si se cortó un archivado
+        hot = {('vehicle', r.get('id')) for r in current[0]} | {('hotel', r.get('id')) for r in current[1]}
+        past = {'vehicle': [], 'hotel': []}
+        for reservation_type, res in self.archive.iter_reservations(user=user):
+            if (reservation_type, res.get('id')) not in hot:
+                past[reservation_type].append(res)
+        return (past['vehicle'] + current[0], past['hotel'] + current[1])
+    
+    def get_top_users(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """Retorna los usuarios con más reservas.
+
+        Usa los conteos por usuario del índice (o un GROUP BY en SQLite), sin
+        recorrer las reservas.
+
+        Returns:
+            Lista de tuplas (user, vehicle_count, hotel_count) ordenada de mayor a menor total.
+        """
+        if self._use_sql():
+            return self.db.sql.top_users(limit)
+        
+        user_index = self._get_user_index()
+        result = []
+        for user, _ in user_index.top_users(limit):
+            counts = user_index.counts(user)
+            result.append((user, counts.get('vehicle', 0), counts.get('hotel', 0)))
+        return result
+    
+    # ===== Archivado =====
+    
+    def archive_past(self, before: date = None) -> Tuple[bool, Dict[str, int]]:
+        """Mueve a las particiones comprimidas las reservas de meses ya cerrados.
+
+        Se archivan las que terminan antes del primer día del mes de `before`
+        (por defecto, hoy), así que el almacenamiento de reservas (y todo lo
+        que lo recorre o reescribe: índices, journal, compactación) queda solo
+        con el mes en curso y los siguientes. Primero se escriben las
+        particiones y después se borran del almacenamiento: si el proceso se
+        corta entre ambos pasos, la próxima ejecución no duplica nada.
 
         Returns:
-            Tuple (vehicle_list, hotel_list) filtradas por `user`.
+            (ok, {mes: reservas archivadas}).
+        """
+        cutoff = datetime.combine(month_start(before or date.today()), datetime.min.time())
+        if self.db.sql is not None:
+            expired = self.db.sql.expired_reservations(cutoff)
+        else:
+            limit = to_epoch(cutoff)
+            current = self.load_reservations(readonly=True)
+            expired = [(reservation_type, res) for reservation_type, key in RESERVATION_KEYS.items()
+                       for res in current.get(key, []) if to_epoch(res['end']) < limit]
+        if not expired:
+            return (True, {})
+        
+        written = self.archive.write(expired)
+        if written is None:
+            return (False, {})
+        ids = {(reservation_type, res.get('id')) for reservation_type, res in expired}
+        if self.db.sql is not None:
+            self.db.sql.delete_reservations(sorted(ids))
+            return (True, written)
+        
+        def build():
+            current = self.load_reservations(readonly=True)
+            changes = [('cancel', reservation_type, res) for reservation_type, key in RESERVATION_KEYS.items()
+                       for res in current.get(key, []) if (reservation_type, res.get('id')) in ids]
+            return changes, None
+        
+        ok, _ = self._transact(build)
+        if ok and self.journal is not None:
+            # Las bajas se agregaron al journal: el snapshot nuevo ya no las incluye
+            ok = self.journal.compact()
+        return (ok, written)
+    
+    # ===== Libro de ocupación =====
+    
+    def _load_ledger(self, version) -> Optional[OccupancyLedger]:
+        """Lee `occupancy.json` si está sellado con `version`; None si falta o está desactualizado."""
+        if self.db.sql is not None:
+            return None
+        data = self.db.load_json_file(self.occupancy_file, readonly=True)
+        self.db.invalidate(self.occupancy_file)  # Solo se lee al reconstruir: no ocupa el caché
+        ledger = OccupancyLedger.from_json(data, version)
+        if ledger is not None:
+            self._ledger_saved_version = version
+        return ledger
+    
+    def save_ledger(self) -> bool:
+        """Guarda el libro de ocupación en `occupancy.json`, sellado con la versión de las reservas.
+
+        En el siguiente arranque se reutiliza si las reservas no cambiaron; si
+        cambiaron se recalcula. Con SQLite no hace nada: el libro es la tabla
+        `occupancy`, que se actualiza en la misma transacción que las reservas.
+
+        Returns:
+            True si está guardado (o no hacía falta), False si falló la escritura.
+        """
+        if self.db.sql is not None:
+            return True
+        with self._index_lock:
+            if self._ledger is None or self._index_version == self._ledger_saved_version:
+                return True
+            version, data = self._index_version, self._ledger.to_json(self._index_version)
+        if not self.db.save_json_file(self.occupancy_file, data):
+            return False
+        self.db.invalidate(self.occupancy_file)
+        self._ledger_saved_version = version
+        return True
+    
+    def check_ledger(self) -> List[Tuple[Tuple, str, int, int]]:
+        """Compara el libro de ocupación con un recuento completo de las reservas.
+
+        Returns:
+            Diferencias `(clave, día 'YYYY-MM-DD', unidades_en_el_libro, recuento)`;
+            vacía si el libro es consistente.
+        """
+        if self.db.sql is not None:
+            ledger = self.db.sql.occupancy_ledger()
+        else:
+            ledger = self._get_ledger()
+        reservations = self.load_reservations(readonly=True)
+        recount = OccupancyLedger()
+        catalog = self.resource_mgr.get_catalog()
+        for reservation_type, key in RESERVATION_KEYS.items():
+            for res in reservations.get(key, []):
+                recount.add(self._record_key(reservation_type, res, catalog),
+                            to_epoch(res['start']), to_epoch(res['end']))
+        return [(key, day_date(day).isoformat(), units, expected)
+                for key, day, units, expected in ledger.diff(recount)]
+    
+    def rebuild_ledger(self) -> bool:
+        """Recalcula el libro de ocupación desde cero (y lo guarda).
+
+        Returns:
+            True si se guardó.
+        """
+        if self.db.sql is not None:
+            self.db.sql.rebuild_occupancy()
+            return True
+        with self._index_lock:
+            self._rebuild_indexes(self._storage_version(), recount=True)
+            self._ledger_saved_version = None
+        return self.save_ledger()
+    
+    def get_columnar(self) -> ColumnarStore:
+        """Retorna las reservas en columnas (`columnar.ColumnarStore`) para informes.
+
+        Se construye desde `load_reservations` y se reutiliza mientras el
+        almacenamiento no cambie (misma versión que los índices).
         """
-        reservations = self.load_reservations()
-        vehicle = [r for r in reservations.get('vehicle_reservations', []) if r.get('user') == user]
-        hotel = [r for r in reservations.get('hotel_reservations', []) if r.get('user') == user]
-        return (vehicle, hotel)
+        with self._index_lock:
+            version = self._storage_version()
+            if self._columnar is None or self._columnar[0] != version:
+                self._columnar = (version, ColumnarStore(self.load_reservations(readonly=True)))
+            return self._columnar[1]
     
-    def cancel_reservation(self, res_id: str, res_type: str = 'vehicle') -> bool:
+    def _occupancy_maxima(self, start_req: datetime, end_req: datetime) -> Dict[Tuple, int]:
+        """Máximo de unidades reservadas por día en `[start_req, end_req)` para todos los recursos.
+
+        Una sola pasada sobre el libro de ocupación (una consulta agrupada en
+        SQLite). Retorna `{clave_del_índice: unidades}` solo con los recursos ocupados.
+        """
+        if self._use_sql():
+            return self.db.sql.occupancy_maxima(start_req, end_req)
+        return self._get_ledger().maxima(to_epoch(start_req), to_epoch(end_req))
+    
+    def bulk_availability(self, start_req: datetime, end_req: datetime,
+                          reservation_type: str = 'vehicle') -> List[Tuple[str, str, int, int]]:
+        """Disponibilidad de todos los recursos de un tipo en `[start_req, end_req)`.
+
+        Lee la ocupación de todos los recursos en una sola pasada (ver
+        `_occupancy_maxima`), con el mismo criterio que `is_resource_available`.
+
+        Returns:
+            Lista de tuplas `(recurso, subtipo, total, libres)` en el orden del
+            listado de recursos (`subtipo` es el tipo de habitación, '' en vehículos).
+        """
+        occupied = self._occupancy_maxima(start_req, end_req)
+        if reservation_type == 'vehicle':
+            resources = [(car.get('type'), '', car.get('count', 0))
+                         for car in self.resource_mgr.get_all_cars()]
+        else:
+            resources = [(hotel.get('name'), room.get('type'), room.get('count', 0))
+                         for hotel in self.resource_mgr.get_all_hotels() for room in hotel.get('room', [])]
+        return [(name, subtype, total, max(total - occupied.get((reservation_type, name, subtype), 0), 0))
+                for name, subtype, total in resources]
+    
+    def search_availability(self, start_date: str, end_date: str, pax: int = 1,
+                            filters: Dict = None) -> Tuple[bool, Union[List[Dict], str]]:
+        """Busca en todo el catálogo las opciones reservables para `[start_date, end_date)`.
+
+        En lugar de probar cada hotel/habitación y tipo de coche por separado (y
+        buscar el siguiente hueco tras cada rechazo), lee una sola vez la
+        ocupación de todos los recursos del rango y la cruza con el catálogo.
+
+        Args:
+            start_date, end_date: Rango pedido ('YYYY-MM-DD'); se valida igual
+                que en `rent_vehicle`/`reserve_hotel`.
+            pax: Personas; descarta habitaciones con `pax` menor y coches con
+                menos `seats`. El precio de hotel se cotiza por persona.
+            filters: Opcional, claves de `SEARCH_FILTERS`:
+                - 'type': 'vehicle' o 'hotel' (por defecto ambos).
+                - 'location', 'hotel', 'room_type', 'car_type': coincidencia
+                  exacta sin distinguir mayúsculas.
+                - 'max_price': precio total máximo.
+
+        Returns:
+            (True, opciones) o (False, mensaje_de_error). Cada opción es un dict
+            con 'type', 'available' (unidades libres), 'total', 'days' y
+            'total_price', más 'hotel', 'location', 'room_type' y 'pax_price'
+            (hoteles) o 'car_type', 'seats', 'licence_type' y 'price_per_day'
+            (vehículos). Hoteles primero y luego coches, en el orden del catálogo.
+        """
+        filters = dict(filters or {})
+        unknown = sorted(set(filters) - set(SEARCH_FILTERS))
+        if unknown:
+            return (False, f"Unknown search filter(s): {', '.join(unknown)}")
+        reservation_type = filters.get('type')
+        if reservation_type not in (None, 'vehicle', 'hotel'):
+            return (False, f"Unknown reservation type '{reservation_type}'")
+        if not isinstance(pax, int) or pax < 1:
+            return (False, "Pax count must be a positive integer")
+        ok, dates = self._validate_dates(start_date, end_date)
+        if not ok:
+            return (False, dates)
+        start, end = dates
+        
+        max_price = filters.get('max_price')
+        if max_price is not None and (isinstance(max_price, bool) or not isinstance(max_price, (int, float))):
+            return (False, "max_price must be a number")
+        
+        days = (end - start).days or 1
+        wanted = {name: str(filters[name]).casefold()
+                  for name in ('location', 'hotel', 'room_type', 'car_type') if filters.get(name)}
+        
+        def matches(field: str, value: Any) -> bool:
+            return field not in wanted or str(value or '').casefold() == wanted[field]
+        
+        # Un filtro propio de un tipo (p. ej. 'car_type') excluye al otro
+        want_hotels = reservation_type in (None, 'hotel') and 'car_type' not in wanted
+        want_cars = (reservation_type in (None, 'vehicle')
+                     and not any(name in wanted for name in ('location', 'hotel', 'room_type')))
+        
+        occupied = self._occupancy_maxima(start, end)
+        options = []
+        if want_hotels:
+            for hotel in self.resource_mgr.get_all_hotels():
+                if not (matches('hotel', hotel.get('name')) and matches('location', hotel.get('location'))):
+                    continue
+                total_price = hotel.get('pax_price', 0) * pax * days
+                if max_price is not None and total_price > max_price:
+                    continue
+                for room in hotel.get('room', []):
+                    if not matches('room_type', room.get('type')) or room.get('pax', pax) < pax:
+                        continue
+                    total = room.get('count', 0)
+                    free = total - occupied.get(('hotel', hotel.get('name'), room.get('type')), 0)
+                    if free > 0:
+                        options.append({"type": "hotel", "hotel": hotel.get('name'),
+                                        "location": hotel.get('location'), "room_type": room.get('type'),
+                                        "pax_price": hotel.get('pax_price', 0), "available": free,
+                                        "total": total, "days": days, "total_price": total_price})
+        
+        if want_cars:
+            for car in self.resource_mgr.get_all_cars():
+                if not matches('car_type', car.get('type')) or car.get('seats', pax) < pax:
+                    continue
+                total_price = car.get('price_per_day', 0) * days
+                if max_price is not None and total_price > max_price:
+                    continue
+                total = car.get('count', 0)
+                free = total - occupied.get(('vehicle', car.get('type'), ''), 0)
+                if free > 0:
+                    options.append({"type": "vehicle", "car_type": car.get('type'),
+                                    "seats": car.get('seats'), "licence_type": car.get('licence_type'),
+                                    "price_per_day": car.get('price_per_day', 0), "available": free,
+                                    "total": total, "days": days, "total_price": total_price})
+        return (True, options)
+    
+    def cancel_reservation(self, res_id: str, res_type: str = None) -> bool:
         """Cancela una reserva por su `id`.
 
         Args:
             res_id: Identificador de la reserva (se usa campo 'id').
-            res_type: 'vehicle' o 'hotel' para elegir la lista a inspeccionar.
+            res_type: 'vehicle' o 'hotel' para limitar la búsqueda a ese tipo;
+                por defecto el tipo se toma del índice por id.
 
         Comportamiento:
-            - Filtra la lista correspondiente para eliminar la reserva con `id` igual a `res_id`.
-            - Si hubo un cambio, guarda el archivo y retorna True; en otro caso retorna False.
+            - Elimina la reserva con `id` igual a `res_id` (ver `_remove_reservations`).
+            - Si hubo un cambio, guarda y retorna True; en otro caso retorna False.
         """
-        reservations = self.load_reservations()
-        key = 'vehicle_reservations' if res_type == 'vehicle' else 'hotel_reservations'
+        removed = self.remove_reservation(res_id, res_type)
         
-        if key not in reservations:
-            print(f"Error: Reservation type '{res_type}' not found")
+        if removed is None:
+            print("Error saving changes.")
             return False
-        
-        original_count = len(reservations[key])
-        reservations[key] = [r for r in reservations[key] if r.get('id') != res_id]
-        
-        if len(reservations[key]) < original_count:
-            if self.save_reservations(reservations):
-                print(f"✓ Reservation cancelled successfully. ID: {res_id}")
-                return True
-            else:
-                print("Error saving changes.")
-                return False
+        if removed:
+            print(f"✓ Reservation cancelled successfully. ID: {res_id}")
+            return True
         
         print(f"✗ No reservation found with ID: {res_id}")
         return False
+    
+    def remove_reservation(self, res_id: str, res_type: str = None) -> Optional[bool]:
+        """Como `cancel_reservation`, pero sin imprimir (para la API HTTP).
+
+        Returns:
+            True si se canceló, False si no existe y None si falló el guardado.
+        """
+        reservation_type = res_type if res_type in RESERVATION_KEYS else None
+        removed = self._remove_reservations(res_id, reservation_type)
+        return None if removed is None else bool(removed)
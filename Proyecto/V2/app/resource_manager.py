@@ -2,6 +2,8 @@
 Resource Manager - Gestiona recursos (hoteles, autos, choferes)
 """
 from database import DatabaseManager
+from catalog import ResourceCatalog
+from metrics import METRICS
 from typing import List, Dict, Optional
 
 
@@ -23,10 +25,16 @@ class ResourceManager:
         """
         self.db = db
         self.res_file = "res_data.json"
+        self._catalog: Optional[ResourceCatalog] = None
     
-    def load_resources(self) -> Dict:
+    def load_resources(self, readonly: bool = False) -> Dict:
         """Carga y retorna el contenido del archivo de recursos.
 
+        Args:
+            readonly: Si es True devuelve la vista compartida del caché de
+                `DatabaseManager` (no debe modificarse). Los métodos que editan
+                recursos usan la copia mutable por defecto.
+
         Returns:
             Dict con la estructura completa de recursos (hotels, cars, chofer, ...).
 
@@ -35,7 +43,7 @@ class ResourceManager:
               `DatabaseManager.load_json_file`.
             - Si el archivo no existe devuelve un diccionario vacío.
         """
-        return self.db.load_json_file(self.res_file)
+        return self.db.load_json_file(self.res_file, readonly)
     
     def save_resources(self, data: Dict) -> bool:
         """Guarda la estructura de recursos pasada en el archivo definido.
@@ -49,6 +57,37 @@ class ResourceManager:
         """
         return self.db.save_json_file(self.res_file, data)
     
+    def update_resources(self, operation) -> bool:
+        """Modifica los recursos sin perder cambios concurrentes de otros procesos.
+
+        Args:
+            operation: Función `data -> (guardar, resultado)` que modifica `data`
+                en sitio; puede ejecutarse más de una vez (ver
+                `DatabaseManager.update_json_file`), así que no debe pedir datos
+                por consola ni tener otros efectos.
+
+        Returns:
+            True si se guardó, False si `operation` no pidió guardar o hubo error de IO.
+        """
+        ok, saved = self.db.update_json_file(self.res_file, operation)
+        return ok and saved
+    
+    def get_catalog(self) -> ResourceCatalog:
+        """Retorna el catálogo indexado de recursos.
+
+        El catálogo se reconstruye solo cuando cambia la versión del archivo de
+        recursos (ver `DatabaseManager.file_version`); mientras tanto todas las
+        búsquedas por nombre/tipo son accesos a diccionario.
+        """
+        version = self.db.file_version(self.res_file)
+        if self._catalog is None or self._catalog.version != version:
+            data = self.load_resources(readonly=True)
+            self._catalog = ResourceCatalog(data, version)
+            if METRICS.enabled:
+                METRICS.incr("rows_scanned", "resources",
+                             sum(len(data.get(key, [])) for key in ('cars', 'hotels', 'chofer')))
+        return self._catalog
+    
     def load_resource_type(self, res_type: str) -> List:
         """Devuelve la lista para un tipo de recurso concreto.
 
@@ -56,9 +95,10 @@ class ResourceManager:
             res_type: Nombre de la clave en el JSON (por ejemplo 'cars', 'hotels', 'chofer').
 
         Returns:
-            Lista asociada a `res_type` o lista vacía si no existe.
+            Lista asociada a `res_type` o lista vacía si no existe. Es una vista
+            de solo lectura compartida con el caché: no debe modificarse.
         """
-        data = self.load_resources()
+        data = self.load_resources(readonly=True)
         return data.get(res_type, [])
     
     # ============== HOTELES ==============
@@ -97,10 +137,11 @@ class ResourceManager:
             "pax_price": price
         }
         
-        data = self.load_resources()
-        data.setdefault("hotels", []).append(hotel)
+        def operation(data):
+            data.setdefault("hotels", []).append(hotel)
+            return (True, True)
         
-        if self.save_resources(data):
+        if self.update_resources(operation):
             print("Hotel added successfully.")
             return True
         return False
@@ -114,8 +155,15 @@ class ResourceManager:
         Returns:
             Diccionario del hotel si existe, None en caso contrario.
         """
-        hotels = self.load_resource_type("hotels")
-        return next((h for h in hotels if h.get('name', '').lower() == hotel_name.lower()), None)
+        return self.get_catalog().get_hotel(hotel_name)
+    
+    def get_room(self, hotel_name: str, room_type: str) -> Optional[Dict]:
+        """Busca el tipo de habitación `room_type` del hotel `hotel_name` (case-insensitive).
+
+        Returns:
+            Diccionario de la habitación (`type`, `count`, `pax`) o None si no existe.
+        """
+        return self.get_catalog().get_room(hotel_name, room_type)
     
     def get_all_hotels(self) -> List[Dict]:
         """Retorna la lista completa de hoteles.
@@ -146,21 +194,15 @@ class ResourceManager:
             print("Error: Invalid number entered.")
             return False
         
-        data = self.load_resources()
-        cars = data.get("cars", [])
+        exists = any(car.get("type", "").lower() == car_type
+                     for car in self.load_resource_type("cars"))
         
-        # Buscar si el tipo de coche ya existe
-        for car in cars:
-            if car.get("type", "").lower() == car_type:
-                old = car.get("count", 0)
-                car["count"] = max(0, old + qty)
-                self.save_resources(data)
-                print(f"Updated '{car_type}' count: {old} -> {car['count']}")
-                return True
-        
-        # Si no existe, ofrecer crearlo
-        create = input(f"Car type '{car_type}' not found. Create new entry? (y/n): ").strip().lower()
-        if create == 'y':
+        # Si no existe, ofrecer crearlo (los datos se piden antes de escribir)
+        new_car = None
+        if not exists:
+            create = input(f"Car type '{car_type}' not found. Create new entry? (y/n): ").strip().lower()
+            if create != 'y':
+                return False
             try:
                 price_per_day = int(input("Price per day: "))
                 seats = int(input("Number of seats: "))
@@ -176,11 +218,27 @@ class ResourceManager:
                 "count": max(0, qty),
                 "licence_type": license_type
             }
-            data.setdefault("cars", []).append(new_car)
-            self.save_resources(data)
-            print(f"Created new car type '{car_type}' with count {new_car['count']}")
-            return True
         
+        messages = []
+        
+        def operation(data):
+            messages.clear()
+            # Buscar si el tipo de coche ya existe (otro proceso pudo crearlo mientras tanto)
+            for car in data.get("cars", []):
+                if car.get("type", "").lower() == car_type:
+                    old = car.get("count", 0)
+                    car["count"] = max(0, old + qty)
+                    messages.append(f"Updated '{car_type}' count: {old} -> {car['count']}")
+                    return (True, True)
+            if new_car is None:
+                return (False, False)
+            data.setdefault("cars", []).append(dict(new_car))
+            messages.append(f"Created new car type '{car_type}' with count {new_car['count']}")
+            return (True, True)
+        
+        if self.update_resources(operation):
+            print(messages[0])
+            return True
         return False
     
     def get_car(self, car_type: str) -> Optional[Dict]:
@@ -192,8 +250,7 @@ class ResourceManager:
         Returns:
             Diccionario del coche si existe, None en caso contrario.
         """
-        cars = self.load_resource_type("cars")
-        return next((c for c in cars if c.get('type', '').lower() == car_type.lower()), None)
+        return self.get_catalog().get_car(car_type)
     
     def get_available_cars(self) -> List[Dict]:
         """Retorna la lista de coches cuyo `count` es mayor que 0.
@@ -236,10 +293,11 @@ class ResourceManager:
         
         driver = {"name": name, "license_type": license_type, "CI": ci}
         
-        data = self.load_resources()
-        data.setdefault("chofer", []).append(driver)
+        def operation(data):
+            data.setdefault("chofer", []).append(driver)
+            return (True, True)
         
-        if self.save_resources(data):
+        if self.update_resources(operation):
             print("Driver added successfully.")
             return True
         return False
@@ -260,8 +318,11 @@ class ResourceManager:
         Returns:
             Diccionario del chofer disponible que coincida, o None si ninguno cumple.
         """
-        drivers = self.get_all_drivers()
-        return next((d for d in drivers if d.get('license_type', '').upper() == str(license_type).upper()), None)
+        return next(iter(self.get_catalog().drivers_with_license(license_type)), None)
+    
+    def find_drivers_by_license(self, license_type: str) -> List[Dict]:
+        """Retorna todos los choferes con `license_type` (case-insensitive) en orden de alta."""
+        return self.get_catalog().drivers_with_license(license_type)
     
     # ============== VISUALIZACIÓN ==============
     
@@ -271,7 +332,7 @@ class ResourceManager:
         Formato: para cada clave del JSON se imprime el número de items (o 'N/A' si no aplica).
         Uso: utilidad administrativa/diagnóstica.
         """
-        data = self.load_resources()
+        data = self.load_resources(readonly=True)
         print("\n--- Resources Summary ---")
         for key, value in data.items():
             try:
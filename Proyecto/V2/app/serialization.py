@@ -0,0 +1,138 @@
+"""
+Serialization - Codecs de los documentos: JSON legible, JSON compacto, pickle y marshal
+"""
+import io
+import json
+import marshal
+import pickle
+from typing import Any, Callable, Dict
+
+# Cabeceras de los formatos binarios (los JSON no llevan: se detectan por descarte)
+PICKLE_MAGIC = b"RSVP\x01"
+MARSHAL_MAGIC = b"RSVM"
+
+# Codec por defecto: el formato de siempre (JSON con sangría de 4)
+DEFAULT_CODEC = "json-pretty"
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """Unpickler que solo reconstruye tipos básicos (dict, list, str, números...).
+
+    Los documentos tienen forma JSON, así que su pickle no referencia ninguna
+    clase; rechazar `find_class` evita ejecutar código de un archivo manipulado.
+    """
+
+    def find_class(self, module: str, name: str):
+        raise pickle.UnpicklingError(f"global '{module}.{name}' is not allowed in a data file")
+
+
+def _decode_pickle(raw: bytes) -> Any:
+    return _DataUnpickler(io.BytesIO(raw)).load()
+
+
+def _encode_marshal(data: Any) -> bytes:
+    return MARSHAL_MAGIC + bytes([marshal.version]) + marshal.dumps(data)
+
+
+def _decode_marshal(raw: bytes) -> Any:
+    if not raw or raw[0] > marshal.version:
+        raise ValueError(f"marshal format {raw[:1].hex() or '?'} is newer than this Python's")
+    return marshal.loads(raw[1:])
+
+
+class Codec:
+    """Forma de guardar un documento: `encode(data) -> bytes` y `decode(bytes) -> data`.
+
+    `magic` es la cabecera que escribe `encode` y que `decode_document` usa para
+    reconocer el formato al leer (vacía en los JSON).
+    """
+
+    __slots__ = ("name", "magic", "_encode", "_decode")
+
+    def __init__(self, name: str, magic: bytes, encode: Callable[[Any], bytes],
+                 decode: Callable[[bytes], Any]):
+        self.name = name
+        self.magic = magic
+        self._encode = encode
+        self._decode = decode
+
+    def encode(self, data: Any) -> bytes:
+        """Serializa `data` con la cabecera del formato."""
+        return self._encode(data)
+
+    def decode(self, raw: bytes) -> Any:
+        """Decodifica `raw` (con su cabecera).
+
+        Raises:
+            ValueError si el contenido no es válido para este codec.
+        """
+        if not self.magic:
+            return self._decode(raw)  # JSON: solo lanza ValueError
+        try:
+            return self._decode(raw[len(self.magic):])
+        except ValueError:
+            raise
+        except Exception as e:
+            # Bytes corruptos de pickle/marshal pueden lanzar casi cualquier cosa
+            # (EOFError, MemoryError, OverflowError, AttributeError...)
+            raise ValueError(f"Invalid {self.name} document: {e!r}") from e
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+# Codecs disponibles, por nombre (`DatabaseManager(codecs=...)`, `--codec`)
+CODECS: Dict[str, Codec] = {
+    "json-pretty": Codec("json-pretty", b"",
+                         lambda data: json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'),
+                         json.loads),
+    "json": Codec("json", b"",
+                  lambda data: json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'),
+                  json.loads),
+    "pickle": Codec("pickle", PICKLE_MAGIC,
+                    lambda data: PICKLE_MAGIC + pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL),
+                    _decode_pickle),
+    "marshal": Codec("marshal", MARSHAL_MAGIC, _encode_marshal, _decode_marshal),
+}
+
+
+def get_codec(name: str) -> Codec:
+    """Retorna el codec `name`.
+
+    Raises:
+        ValueError si no existe.
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec '{name}' (choose from {', '.join(CODECS)})") from None
+
+
+def detect_codec(raw: bytes) -> Codec:
+    """Codec con el que se escribió `raw`: el de su cabecera o, si no tiene, JSON.
+
+    Los dos JSON se leen igual, así que para ellos se retorna el compacto.
+    """
+    for codec in CODECS.values():
+        if codec.magic and raw.startswith(codec.magic):
+            return codec
+    return CODECS["json"]
+
+
+def decode_document(raw: bytes) -> Any:
+    """Decodifica un documento en cualquiera de los formatos (ver `detect_codec`).
+
+    Raises:
+        ValueError si el contenido no es válido.
+    """
+    return detect_codec(raw).decode(raw)
+
+
+def read_document(path: str) -> Any:
+    """Lee y decodifica el documento de `path` (cualquier codec).
+
+    Raises:
+        OSError si no se puede leer, ValueError si el contenido no es válido.
+    """
+    with open(path, 'rb') as file:
+        return decode_document(file.read())
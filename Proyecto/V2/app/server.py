@@ -0,0 +1,595 @@
+"""
+Reservation Server - API HTTP/JSON con asyncio sobre una ReservationApp compartida
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from auth import DEFAULT_SESSION_TTL, PasswordPool, PoolBusy, SessionTokens
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Límites de una petición HTTP
+MAX_LINE_BYTES = 8 * 1024
+MAX_HEADERS = 100
+MAX_BODY_BYTES = 1024 * 1024
+
+# Campos de un chofer visibles para quien no es admin (sin `CI`)
+PUBLIC_DRIVER_FIELDS = ("name", "license_type")
+
+
+class HttpError(Exception):
+    """Error que se responde al cliente como `{"error": mensaje}` con `status`."""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: Dict[str, str] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class ReadWriteGate:
+    """Coordina (en el event loop) lecturas concurrentes y escrituras exclusivas.
+
+    Los Managers no están pensados para que un hilo escriba mientras otros leen
+    (índices y journal en memoria), así que una escritura espera a que terminen
+    las lecturas en curso y las nuevas esperan a que termine la escritura. Las
+    escrituras tienen prioridad para que no se queden esperando indefinidamente.
+    """
+
+    def __init__(self):
+        """Crea la compuerta sin lectores ni escritor."""
+        self._readers = 0
+        self._writer = False
+        self._condition = asyncio.Condition()
+
+    async def acquire_read(self) -> None:
+        """Espera a que no haya escritura activa ni pendiente y registra un lector."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer)
+            self._readers += 1
+
+    async def release_read(self) -> None:
+        """Libera un lector."""
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self) -> None:
+        """Bloquea lecturas nuevas y espera a que terminen las que están en curso."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer)
+            self._writer = True
+            await self._condition.wait_for(lambda: self._readers == 0)
+
+    async def release_write(self) -> None:
+        """Termina la escritura y despierta a los lectores en espera."""
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class ReservationServer:
+    """Servidor HTTP/JSON (solo biblioteca estándar) para una `ReservationApp`.
+
+    - Una única `ReservationApp` caliente: los cachés e índices se comparten
+      entre todas las peticiones en lugar de reconstruirse por cliente.
+    - Las lecturas corren en un pool de hilos (`workers`) y las escrituras se
+      encolan y las ejecuta una sola tarea escritora, de una en una. Con group
+      commit (`DatabaseManager.group_commit`) la tarea escritora no espera al
+      disco: pasa a la siguiente escritura y cada respuesta se envía cuando su
+      lote ya se guardó, así que una ráfaga de reservas comparte una escritura.
+    - PBKDF2 (login) corre en un `PasswordPool` acotado: con la cola llena se
+      responde 503 con `Retry-After`. Después del login las peticiones se
+      autentican con un token firmado (`SessionTokens`), sin volver al KDF.
+
+    Endpoints (las rutas marcadas con * requieren `Authorization: Bearer <token>`,
+    y con ** además rol admin):
+
+        POST   /login                      {"username", "password"} -> token
+        POST   /logout *
+        GET    /metrics[?format=prometheus] ** KDF e instrumentación (ver `metrics`);
+                                           sin sesión si `public_metrics`
+        GET    /resources[?type=cars|hotels|chofer] *  los choferes sin `CI` salvo para admin
+        GET    /availability?type=vehicle&car_type=..&start=..&end=..
+        GET    /availability?type=hotel&hotel=..&room_type=..&start=..&end=..
+        GET    /search?start=..&end=..&pax=..  todo lo reservable (filtros: ver `SEARCH_FILTERS`)
+        GET    /reservations *             reservas del usuario
+        POST   /reservations *             {"type": "vehicle"|"hotel", ...} (ver `book_batch`)
+        DELETE /reservations/<id>[?type=vehicle|hotel] *
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 8080, workers: int = 8,
+                 kdf_workers: int = None, kdf_queue: int = 64,
+                 session_secret: Optional[bytes] = None, session_ttl: float = DEFAULT_SESSION_TTL,
+                 public_metrics: bool = False):
+        """Prepara el servidor (no abre el socket hasta `start`).
+
+        Args:
+            app: Instancia de `ReservationApp` compartida por todas las peticiones.
+            host, port: Dirección de escucha.
+            workers: Hilos para lecturas.
+            kdf_workers, kdf_queue: Hilos y cola máxima del pool de PBKDF2.
+            session_secret: Clave HMAC de los tokens (compartirla entre procesos
+                permite que acepten los tokens de los demás; los logout se
+                comparten a través de `app.db`).
+            session_ttl: Segundos de validez de un token.
+            public_metrics: Si es True, `GET /metrics` no pide sesión (p. ej.
+                para un scraper de Prometheus en una red de confianza).
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.kdf = PasswordPool(kdf_workers, kdf_queue)
+        self.sessions = SessionTokens(session_secret, session_ttl, app.db)
+        self.public_metrics = public_metrics
+        self._read_pool = ThreadPoolExecutor(workers, thread_name_prefix="read")
+        self._write_pool = ThreadPoolExecutor(1, thread_name_prefix="write")
+        self._gate: Optional[ReadWriteGate] = None
+        self._writes: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Respuestas de escrituras que esperan a que su lote de group commit se guarde
+        self._commit_waits = set()
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._routes = {
+            ("POST", "login"): self._login,
+            ("POST", "logout"): self._logout,
+            ("GET", "metrics"): self._metrics,
+            ("GET", "resources"): self._resources,
+            ("GET", "availability"): self._availability,
+            ("GET", "search"): self._search,
+            ("GET", "reservations"): self._list_reservations,
+            ("POST", "reservations"): self._book,
+            ("DELETE", "reservations"): self._cancel,
+        }
+
+    # ===== Ciclo de vida =====
+
+    async def start(self) -> None:
+        """Abre el socket y arranca la tarea escritora."""
+        self._gate = ReadWriteGate()
+        self._writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_LINE_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Atiende peticiones hasta que se cancela la tarea."""
+        if self._server is None:
+            await self.start()
+        print(f"Serving on http://{self.host}:{self.port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Cierra el socket, detiene la tarea escritora y los pools."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        for pool in (self._read_pool, self._write_pool):
+            pool.shutdown(wait=False)
+        self.kdf.shutdown()
+
+    # ===== Ejecución =====
+
+    async def _read(self, fn: Callable, *args) -> Any:
+        """Ejecuta una lectura de los Managers en el pool de lectura."""
+        await self._gate.acquire_read()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._read_pool, fn, *args)
+        finally:
+            await self._gate.release_read()
+
+    async def _write(self, fn: Callable, *args) -> Any:
+        """Encola una escritura para la tarea escritora y espera su resultado."""
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((fn, args, future))
+        return await future
+
+    async def _kdf(self, fn: Callable, *args) -> Any:
+        """Ejecuta una verificación de contraseña en el pool acotado de PBKDF2."""
+        try:
+            future = self.kdf.submit(fn, *args)
+        except PoolBusy as e:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": "1"})
+        return await asyncio.wrap_future(future)
+
+    async def _writer_loop(self) -> None:
+        """Única tarea que modifica datos: toma escrituras de la cola de a una."""
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, future = await self._writes.get()
+            await self._gate.acquire_write()
+            try:
+                result, commits = await loop.run_in_executor(self._write_pool, self._run_write, fn, args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if commits:
+                    task = loop.create_task(self._await_commits(future, result, commits))
+                    self._commit_waits.add(task)
+                    task.add_done_callback(self._commit_waits.discard)
+                elif not future.done():
+                    future.set_result(result)
+            finally:
+                await self._gate.release_write()
+
+    def _run_write(self, fn: Callable, args: Tuple) -> Tuple[Any, list]:
+        """Ejecuta la escritura sin esperar al group commit; retorna `(resultado, futures)`."""
+        with self.app.db.deferred_commits() as commits:
+            result = fn(*args)
+        return result, commits
+
+    async def _await_commits(self, future: asyncio.Future, result: Any, commits: list) -> None:
+        """Entrega `result` cuando todos los cambios de la escritura están en disco."""
+        saved = await asyncio.gather(*(asyncio.wrap_future(commit) for commit in commits))
+        if future.done():
+            return
+        if all(ok for ok, _ in saved):
+            future.set_result(result)
+        else:
+            future.set_exception(HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, "Error saving changes"))
+
+    # ===== HTTP =====
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """Atiende las peticiones de una conexión (con keep-alive)."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._send(writer, e.status, {"error": e.message}, False, e.headers)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                status, payload, extra = await self._dispatch(method, target, headers, body)
+                await self._send(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Lee una petición HTTP/1.x.
+
+        Returns:
+            `(método, destino, cabeceras, cuerpo, keep_alive)` o None si el cliente cerró.
+        """
+        try:
+            line = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise HttpError(HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0 or length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target, headers, body, keep_alive
+
+    async def _send(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                    payload: Any, keep_alive: bool, headers: Dict[str, str] = None) -> None:
+        """Escribe una respuesta JSON, o de texto si `payload` es str (con `headers` adicionales)."""
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"{extra}"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str],
+                        body: bytes) -> Tuple[HTTPStatus, Any, Dict[str, str]]:
+        """Resuelve la ruta y ejecuta el endpoint correspondiente.
+
+        Returns:
+            (estado, cuerpo JSON, cabeceras adicionales)
+        """
+        url = urlsplit(target)
+        segments = [unquote(s) for s in url.path.split("/") if s]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if not segments:
+                raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+            handler = self._routes.get((method, segments[0]))
+            if handler is None:
+                if any(route == segments[0] for _, route in self._routes):
+                    raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed")
+                raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+            request = {
+                "args": segments[1:],
+                "query": query,
+                "headers": headers,
+                "body": self._parse_body(body) if method in ("POST", "PUT") else {},
+            }
+            status, payload = await handler(request)
+            return status, payload, {}
+        except HttpError as e:
+            return e.status, {"error": e.message}, e.headers
+        except Exception:
+            # El detalle queda en el log del servidor; el cliente no ve rutas ni datos internos
+            logger.exception("Unhandled error in %s %s", method, url.path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}, {}
+
+    @staticmethod
+    def _parse_body(body: bytes) -> Dict:
+        """Decodifica un cuerpo JSON (objeto); vacío equivale a `{}`."""
+        if not body:
+            return {}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return data
+
+    @staticmethod
+    def _bearer(request: Dict) -> str:
+        """Retorna el token de `Authorization: Bearer <token>` (o cadena vacía)."""
+        scheme, _, token = request["headers"].get("authorization", "").partition(" ")
+        return token.strip() if scheme.lower() == "bearer" else ""
+
+    def _session(self, request: Dict) -> Tuple[str, str]:
+        """Retorna `(username, role)` del token Bearer o responde 401 (sin tocar el KDF)."""
+        session = self.sessions.verify(self._bearer(request))
+        if session is None:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Missing, invalid or expired session token")
+        return session
+
+    def _admin_session(self, request: Dict) -> Tuple[str, str]:
+        """Como `_session`, pero responde 403 si el usuario no es admin."""
+        session = self._session(request)
+        if session[1] != "admin":
+            raise HttpError(HTTPStatus.FORBIDDEN, "Admin role required")
+        return session
+
+    # ===== Endpoints =====
+
+    async def _login(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """POST /login: verifica la contraseña (PBKDF2 en el pool acotado) y emite un token."""
+        body = request["body"]
+        username = str(body.get("username", "")).lower().strip()
+        password = str(body.get("password", "")).strip()
+        if not username or not password:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Username and password cannot be empty")
+
+        user_mgr = self.app.user_mgr
+        user = await self._read(user_mgr.get_user, username)
+        if user is None:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Invalid username or password")
+        valid, rehashed = await self._kdf(user_mgr.check_password, user, password)
+        if not valid:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Invalid username or password")
+        if rehashed is not None:
+            await self._write(user_mgr.update_user, dict(user, password=rehashed))
+
+        token, expires = self.sessions.issue(user.get("username"), user.get("role"))
+        return HTTPStatus.OK, {"token": token, "expires": expires,
+                               "username": user.get("username"), "role": user.get("role")}
+
+    async def _logout(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """POST /logout: revoca el token de la sesión (se guarda: ver `SessionTokens`)."""
+        self._session(request)
+        if not await self._write(self.sessions.revoke, self._bearer(request)):
+            raise HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, "Error saving the session revocation")
+        return HTTPStatus.OK, {"ok": True}
+
+    async def _metrics(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """GET /metrics: pool de PBKDF2 e instrumentación por método (si está activa).
+
+        Con `?format=prometheus` responde la instrumentación en texto Prometheus.
+        Requiere una sesión de admin salvo con `public_metrics`.
+        """
+        if not self.public_metrics:
+            self._admin_session(request)
+        if request["query"].get("format") == "prometheus":
+            return HTTPStatus.OK, METRICS.to_prometheus()
+        return HTTPStatus.OK, {"kdf": self.kdf.stats(), "instrumentation": METRICS.to_json()}
+
+    async def _resources(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """GET /resources: recursos completos o de un tipo (`?type=`).
+
+        Solo un admin ve los choferes completos; al resto se le muestran
+        `PUBLIC_DRIVER_FIELDS` (el `CI` es un dato personal).
+        """
+        _, role = self._session(request)
+        res_type = request["query"].get("type")
+        resource_mgr = self.app.resource_mgr
+        if res_type:
+            data = {res_type: await self._read(resource_mgr.load_resource_type, res_type)}
+        else:
+            data = await self._read(resource_mgr.load_resources, True)
+        if role != "admin" and "chofer" in data:
+            drivers = [{field: d.get(field) for field in PUBLIC_DRIVER_FIELDS}
+                       for d in data["chofer"] if isinstance(d, dict)]
+            data = dict(data, chofer=drivers)  # `data` puede ser el caché compartido
+        return HTTPStatus.OK, data
+
+    async def _availability(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """GET /availability: disponibilidad de un recurso y siguiente hueco si no la hay."""
+        query = request["query"]
+        reservation_type = query.get("type", "vehicle")
+        if reservation_type == "vehicle":
+            required = ("car_type", "start", "end")
+        elif reservation_type == "hotel":
+            required = ("hotel", "room_type", "start", "end")
+        else:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Unknown reservation type '{reservation_type}'")
+        missing = [name for name in required if not query.get(name)]
+        if missing:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Missing query parameter(s): {', '.join(missing)}")
+        return HTTPStatus.OK, await self._read(self._check_availability, reservation_type, query)
+
+    def _check_availability(self, reservation_type: str, query: Dict) -> Dict:
+        """Consulta de disponibilidad (se ejecuta en el pool de lectura)."""
+        reservation_mgr = self.app.reservation_mgr
+        resource_mgr = self.app.resource_mgr
+        if reservation_type == "vehicle":
+            name = resource_type = query["car_type"]
+            resource = resource_mgr.get_car(name)
+        else:
+            name, resource_type = query["hotel"], query["room_type"]
+            resource = resource_mgr.get_room(name, resource_type)
+        if resource is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Resource not found")
+        try:
+            start = reservation_mgr.parse_date(query["start"])
+            end = reservation_mgr.parse_date(query["end"])
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid date format: {e}")
+
+        available = reservation_mgr.is_resource_available(name, resource_type, start, end,
+                                                          resource.get("count", 0),
+                                                          reservation_type=reservation_type)
+        result = {"available": available}
+        if not available:
+            next_slot = reservation_mgr.find_next_available_slot(
+                name, resource_type, (end - start).days or 1, reservation_type)
+            result["next_available"] = list(next_slot) if next_slot else None
+        return result
+
+    async def _search(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """GET /search: opciones reservables de todo el catálogo (`?start=&end=&pax=` y filtros)."""
+        query = dict(request["query"])
+        missing = [name for name in ("start", "end") if not query.get(name)]
+        if missing:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Missing query parameter(s): {', '.join(missing)}")
+        start, end = query.pop("start"), query.pop("end")
+        try:
+            pax = int(query.pop("pax", 1))
+            if "max_price" in query:
+                query["max_price"] = float(query["max_price"])
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "pax and max_price must be numbers")
+        ok, result = await self._read(self.app.reservation_mgr.search_availability, start, end, pax, query)
+        if not ok:
+            raise HttpError(HTTPStatus.BAD_REQUEST, result)
+        return HTTPStatus.OK, {"options": result}
+
+    async def _list_reservations(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """GET /reservations: reservas del usuario de la sesión."""
+        username, _ = self._session(request)
+        vehicles, hotels = await self._read(self.app.reservation_mgr.get_user_reservations, username)
+        return HTTPStatus.OK, {"vehicle": vehicles, "hotel": hotels}
+
+    async def _book(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """POST /reservations: crea una reserva para el usuario de la sesión."""
+        username, _ = self._session(request)
+        body = request["body"]
+        ok, result = await self._write(self._book_request, username, body)
+        if not ok:
+            raise HttpError(HTTPStatus.CONFLICT, result)
+        return HTTPStatus.CREATED, json.loads(result)
+
+    def _book_request(self, username: str, body: Dict) -> Tuple[bool, str]:
+        """Ejecuta la reserva en la tarea escritora."""
+        reservation_mgr = self.app.reservation_mgr
+        reservation_type = body.get("type")
+        if reservation_type == "vehicle":
+            return reservation_mgr.rent_vehicle(username, str(body.get("car_type", "")),
+                                                str(body.get("start", "")), str(body.get("end", "")),
+                                                body.get("need_driver"))
+        if reservation_type == "hotel":
+            try:
+                pax = int(body.get("pax", 1))
+            except (TypeError, ValueError):
+                return (False, f"Invalid pax value: {body.get('pax')!r}")
+            return reservation_mgr.reserve_hotel(username, str(body.get("hotel", "")),
+                                                 str(body.get("room_type", "")),
+                                                 str(body.get("start", "")), str(body.get("end", "")), pax)
+        return (False, f"Unknown reservation type '{reservation_type}'")
+
+    async def _cancel(self, request: Dict) -> Tuple[HTTPStatus, Any]:
+        """DELETE /reservations/<id>[?type=vehicle|hotel]: cancela una reserva propia."""
+        username, role = self._session(request)
+        if len(request["args"]) != 1:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+        res_id = request["args"][0]
+        res_type = request["query"].get("type")
+        if res_type is not None and res_type not in ("vehicle", "hotel"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Unknown reservation type '{res_type}'")
+        status = await self._write(self._cancel_request, username, role, res_id, res_type)
+        if status == "not_found":
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No reservation found with ID: {res_id}")
+        if status == "error":
+            raise HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, "Error saving changes")
+        return HTTPStatus.OK, {"cancelled": res_id}
+
+    def _cancel_request(self, username: str, role: str, res_id: str, res_type: Optional[str]) -> str:
+        """Comprueba que la reserva sea del usuario (o que sea admin) y la cancela."""
+        if role != "admin" and not self._owns(username, res_id, res_type):
+            return "not_found"
+        removed = self.app.reservation_mgr.remove_reservation(res_id, res_type)
+        if removed is None:
+            return "error"
+        return "cancelled" if removed else "not_found"
+
+    def _owns(self, username: str, res_id: str, res_type: Optional[str]) -> bool:
+        """True si `username` tiene una reserva con `id == res_id` (de `res_type`, si se indica)."""
+        vehicles, hotels = self.app.reservation_mgr.get_user_reservations(username)
+        own = {"vehicle": vehicles, "hotel": hotels}.get(res_type, vehicles + hotels)
+        return any(r.get("id") == res_id for r in own)
+
+
+def serve(app, host: str = "127.0.0.1", port: int = 8080, workers: int = 8, **options) -> None:
+    """Arranca `ReservationServer` (ver sus opciones) y bloquea hasta Ctrl+C."""
+    server = ReservationServer(app, host, port, workers, **options)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
@@ -0,0 +1,54 @@
+"""
+Slot Search - Búsqueda de ventanas libres sobre la ocupación diaria
+"""
+from collections import deque
+from datetime import date, timedelta
+from typing import List, Sequence, Tuple
+
+
+def find_free_windows_by_day(day_units: Sequence[int], total_inventory: int, start_day: date,
+                             duration_days: int, horizon_days: int = 365,
+                             limit: int = 1) -> List[Tuple[date, date]]:
+    """Busca ventanas `[d, d + duration_days)` con al menos una unidad libre.
+
+    Los candidatos son los días `start_day + offset` con `0 <= offset < horizon_days`,
+    igual que el recorrido día por día de `find_next_available_slot`. La
+    ventana del offset `d` cubre los días `[d, d + duración)` y tiene una
+    unidad libre si en ninguno de ellos se llega al inventario (ver
+    `occupancy.OccupancyLedger`). El máximo de cada ventana se mantiene con una
+    cola monótona, así que el coste es O(horizonte + duración) sin importar
+    cuántas reservas haya.
+
+    Args:
+        day_units: Unidades reservadas en `start_day + i`; debe cubrir al menos
+            `horizon_days + duration_days - 1` días.
+        total_inventory: Unidades totales del recurso.
+        start_day: Primer día candidato.
+        duration_days: Longitud de la ventana en días.
+        horizon_days: Número de días candidatos a evaluar.
+        limit: Número máximo de ventanas a devolver.
+
+    Returns:
+        Lista (ordenada por fecha) de hasta `limit` tuplas `(inicio, fin)` como `date`.
+    """
+    if horizon_days <= 0 or limit <= 0 or total_inventory <= 0:
+        return []
+
+    width = max(duration_days, 1)
+    window: deque = deque()  # Índices de día con unidades decrecientes
+    windows = []
+    for day in range(horizon_days + width - 1):
+        while window and day_units[window[-1]] <= day_units[day]:
+            window.pop()
+        window.append(day)
+        offset = day - width + 1
+        if offset < 0:
+            continue
+        if window[0] < offset:
+            window.popleft()
+        if day_units[window[0]] < total_inventory:
+            start_candidate = start_day + timedelta(days=offset)
+            windows.append((start_candidate, start_candidate + timedelta(days=duration_days)))
+            if len(windows) >= limit:
+                break
+    return windows
@@ -0,0 +1,590 @@
+"""
+SQLite Store - Motor de almacenamiento SQLite para DatabaseManager
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from catalog import ResourceCatalog
+from metrics import METRICS
+from occupancy import OccupancyLedger, day_range
+from records import DAY_SECONDS, parse_timestamp, to_epoch
+
+
+# Documentos "lógicos" que se mapean a tablas; cualquier otro nombre de archivo
+# se guarda completo en la tabla `documents`.
+USERS_DOC = "login.json"
+RESOURCES_DOC = "res_data.json"
+RESERVATIONS_DOC = "reservations.json"
+OCCUPANCY_DOC = "occupancy.json"
+
+# Tipo de reserva -> clave de la lista en reservations.json
+RESERVATION_KEYS = {
+    "vehicle": "vehicle_reservations",
+    "hotel": "hotel_reservations",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    role TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cars (
+    seq INTEGER PRIMARY KEY,
+    type TEXT COLLATE NOCASE,
+    licence_type TEXT,
+    count INTEGER,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cars_type ON cars(type);
+CREATE TABLE IF NOT EXISTS hotels (
+    seq INTEGER PRIMARY KEY,
+    name TEXT COLLATE NOCASE,
+    location TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hotels_name ON hotels(name);
+CREATE TABLE IF NOT EXISTS rooms (
+    hotel_seq INTEGER NOT NULL REFERENCES hotels(seq),
+    type TEXT COLLATE NOCASE,
+    count INTEGER,
+    pax INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_hotel ON rooms(hotel_seq, type);
+CREATE TABLE IF NOT EXISTS drivers (
+    seq INTEGER PRIMARY KEY,
+    name TEXT,
+    license_type TEXT COLLATE NOCASE,
+    ci TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_drivers_license ON drivers(license_type);
+CREATE TABLE IF NOT EXISTS reservations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    kind TEXT NOT NULL,
+    user TEXT,
+    resource TEXT,
+    subtype TEXT,
+    driver TEXT,
+    start TEXT,
+    end TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_user ON reservations(kind, user, start);
+CREATE INDEX IF NOT EXISTS idx_reservations_resource ON reservations(kind, resource, subtype, start);
+CREATE INDEX IF NOT EXISTS idx_reservations_id ON reservations(id);
+CREATE INDEX IF NOT EXISTS idx_reservations_driver ON reservations(driver, start);
+CREATE TABLE IF NOT EXISTS occupancy (
+    kind TEXT NOT NULL,
+    resource TEXT,
+    subtype TEXT,
+    day INTEGER NOT NULL,
+    units INTEGER NOT NULL,
+    PRIMARY KEY (kind, resource, subtype, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_occupancy_day ON occupancy(day);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+def normalize_date(value: str) -> str:
+    """Normaliza una fecha ('YYYY-MM-DD' o ISO) a `datetime.isoformat()`.
+
+    Con un único formato las comparaciones de texto en SQL respetan el orden
+    cronológico, igual que `ReservationManager.parse_date`.
+    """
+    return parse_timestamp(value).isoformat()
+
+
+def reservation_columns(kind: str, res: Dict) -> Tuple[str, str]:
+    """Retorna `(resource, subtype)` de una reserva según su tipo.
+
+    Mismo criterio que el índice de disponibilidad: los vehículos se agrupan por
+    `car_type` y los hoteles por `(hotel, room_type)`, comparando exacto.
+    """
+    if kind == "vehicle":
+        return res.get("car_type"), ""
+    return res.get("hotel"), res.get("room_type")
+
+
+class SQLiteStore:
+    """Almacena usuarios, recursos y reservas en una base SQLite (modo WAL).
+
+    Expone dos interfaces:
+        - Documentos completos (`load_document` / `save_document`) con la misma
+          forma que los archivos JSON, para que `DatabaseManager` siga siendo
+          intercambiable.
+        - Consultas indexadas (por usuario, recurso, rango de fechas, id...) que
+          los Managers usan para no cargar todo el conjunto de datos.
+    """
+
+    def __init__(self, db_path: str):
+        """Abre (o crea) la base de datos y asegura el esquema.
+
+        Args:
+            db_path: Ruta absoluta del archivo `.db`.
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Bases creadas antes del libro de ocupación: se llena a partir de las reservas
+        has_ledger = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'occupancy'").fetchone()
+        self.conn.executescript(_SCHEMA)
+        if not has_ledger:
+            self.rebuild_occupancy()
+
+    def close(self) -> None:
+        """Cierra la conexión."""
+        with self._lock:
+            self.conn.close()
+
+    # ===== Transacciones y versiones =====
+
+    def _write(self, doc_name: str, operation) -> Any:
+        """Ejecuta `operation(conn)` en una transacción y aumenta la versión de `doc_name`."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = operation(self.conn)
+                self.conn.execute(
+                    "INSERT INTO doc_versions(name, version) VALUES (?, 1) "
+                    "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                    (doc_name,))
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        """Ejecuta una consulta de lectura y retorna todas las filas."""
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        if METRICS.enabled:
+            METRICS.incr("rows_scanned", "sqlite", len(rows))
+        return rows
+
+    def version(self, doc_name: str) -> int:
+        """Retorna la versión de `doc_name`; aumenta con cada escritura confirmada."""
+        rows = self._query("SELECT version FROM doc_versions WHERE name = ?", (doc_name,))
+        return rows[0]["version"] if rows else 0
+
+    # ===== Documentos completos =====
+
+    def load_document(self, doc_name: str) -> Union[Dict, List]:
+        """Reconstruye el documento `doc_name` con la misma forma que el JSON original."""
+        if doc_name == USERS_DOC:
+            rows = self._query("SELECT doc FROM users ORDER BY rowid")
+            return {"users": [json.loads(r["doc"]) for r in rows]}
+        if doc_name == RESOURCES_DOC:
+            data = {
+                "cars": [json.loads(r["doc"]) for r in self._query("SELECT doc FROM cars ORDER BY seq")],
+                "hotels": [json.loads(r["doc"]) for r in self._query("SELECT doc FROM hotels ORDER BY seq")],
+                "chofer": [json.loads(r["doc"]) for r in self._query("SELECT doc FROM drivers ORDER BY seq")],
+            }
+            data.update(self._load_raw_document(doc_name) or {})
+            return data
+        if doc_name == RESERVATIONS_DOC:
+            data = {}
+            for kind, key in RESERVATION_KEYS.items():
+                data[key] = self.find_reservations(kind)
+            return data
+        return self._load_raw_document(doc_name) or {}
+
+    def _load_raw_document(self, doc_name: str) -> Any:
+        """Lee un documento guardado tal cual en la tabla `documents`."""
+        rows = self._query("SELECT doc FROM documents WHERE name = ?", (doc_name,))
+        return json.loads(rows[0]["doc"]) if rows else None
+
+    def save_document(self, doc_name: str, data: Union[Dict, List]) -> bool:
+        """Reemplaza por completo el documento `doc_name` en una sola transacción."""
+        self._write(doc_name, lambda conn: self._replace_document(conn, doc_name, data))
+        return True
+
+    def update_document(self, doc_name: str, operation) -> Any:
+        """Lectura-modificación-escritura de `doc_name` en una sola transacción.
+
+        `operation(data)` recibe el documento actual y retorna `(guardar, resultado)`.
+        Como la transacción es `BEGIN IMMEDIATE`, ningún otro proceso escribe
+        entre la lectura y la escritura.
+
+        Returns:
+            El `resultado` de `operation`.
+        """
+        def run(conn):
+            data = self.load_document(doc_name)
+            commit, result = operation(data)
+            if commit:
+                self._replace_document(conn, doc_name, data)
+            return result
+        return self._write(doc_name, run)
+
+    def _replace_document(self, conn, doc_name: str, data: Union[Dict, List]) -> None:
+        """Reemplaza el contenido de las tablas de `doc_name` con `data`."""
+        if doc_name == USERS_DOC:
+            users = data.get("users", []) if isinstance(data, dict) else data
+            conn.execute("DELETE FROM users")
+            self._insert_users(conn, users)
+        elif doc_name == RESOURCES_DOC:
+            self._replace_resources(conn, data)
+        elif doc_name == RESERVATIONS_DOC:
+            conn.execute("DELETE FROM reservations")
+            conn.execute("DELETE FROM occupancy")
+            for kind, key in RESERVATION_KEYS.items():
+                for res in data.get(key, []):
+                    self._insert_reservation(conn, kind, res)
+        else:
+            conn.execute("INSERT OR REPLACE INTO documents(name, doc) VALUES (?, ?)",
+                         (doc_name, json.dumps(data, ensure_ascii=False)))
+
+    def _insert_users(self, conn, users: List[Dict]) -> None:
+        """Inserta usuarios; si un nombre se repite se conserva el primero (como en `login`)."""
+        conn.executemany(
+            "INSERT OR IGNORE INTO users(username, role, doc) VALUES (?, ?, ?)",
+            [(u.get("username", ""), u.get("role"), json.dumps(u, ensure_ascii=False)) for u in users])
+
+    def _replace_resources(self, conn, data: Dict) -> None:
+        """Reemplaza coches, hoteles/habitaciones y choferes; el resto de claves va a `documents`."""
+        conn.execute("DELETE FROM rooms")
+        for table in ("cars", "hotels", "drivers"):
+            conn.execute(f"DELETE FROM {table}")
+        for car in data.get("cars", []):
+            conn.execute("INSERT INTO cars(type, licence_type, count, doc) VALUES (?, ?, ?, ?)",
+                         (car.get("type"), car.get("licence_type"), car.get("count", 0),
+                          json.dumps(car, ensure_ascii=False)))
+        for hotel in data.get("hotels", []):
+            cur = conn.execute("INSERT INTO hotels(name, location, doc) VALUES (?, ?, ?)",
+                               (hotel.get("name"), hotel.get("location"),
+                                json.dumps(hotel, ensure_ascii=False)))
+            for room in hotel.get("room", []):
+                conn.execute("INSERT INTO rooms(hotel_seq, type, count, pax) VALUES (?, ?, ?, ?)",
+                             (cur.lastrowid, room.get("type"), room.get("count", 0), room.get("pax")))
+        for driver in data.get("chofer", []):
+            conn.execute("INSERT INTO drivers(name, license_type, ci, doc) VALUES (?, ?, ?, ?)",
+                         (driver.get("name"), driver.get("license_type"), driver.get("CI"),
+                          json.dumps(driver, ensure_ascii=False)))
+        extras = {k: v for k, v in data.items() if k not in ("cars", "hotels", "chofer")}
+        conn.execute("DELETE FROM documents WHERE name = ?", (RESOURCES_DOC,))
+        if extras:
+            conn.execute("INSERT INTO documents(name, doc) VALUES (?, ?)",
+                         (RESOURCES_DOC, json.dumps(extras, ensure_ascii=False)))
+
+    def _insert_reservation(self, conn, kind: str, res: Dict) -> None:
+        """Inserta una reserva con sus columnas indexadas y la suma al libro de ocupación."""
+        resource, subtype = reservation_columns(kind, res)
+        conn.execute(
+            "INSERT INTO reservations(id, kind, user, resource, subtype, driver, start, end, doc) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (res.get("id"), kind, res.get("user"), resource, subtype, res.get("driver"),
+             normalize_date(res["start"]), normalize_date(res["end"]),
+             json.dumps(res, ensure_ascii=False)))
+        self._change_occupancy(conn, kind, res, 1)
+
+    def _change_occupancy(self, conn, kind: str, res: Dict, units: int) -> None:
+        """Suma `units` a los días de `res` en la tabla `occupancy` (ver `occupancy.day_range`)."""
+        resource, subtype = reservation_columns(kind, res)
+        days = day_range(to_epoch(res["start"]), to_epoch(res["end"]))
+        conn.executemany(
+            "INSERT INTO occupancy(kind, resource, subtype, day, units) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(kind, resource, subtype, day) DO UPDATE SET units = units + excluded.units",
+            [(kind, resource, subtype, day, units) for day in days])
+        if units < 0 and days:
+            conn.execute("DELETE FROM occupancy WHERE kind = ? AND resource IS ? AND subtype IS ? "
+                         "AND day >= ? AND day < ? AND units = 0",
+                         (kind, resource, subtype, days.start, days.stop))
+
+    # ===== Usuarios =====
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        """Retorna el usuario `username` o None."""
+        rows = self._query("SELECT doc FROM users WHERE username = ?", (username,))
+        return json.loads(rows[0]["doc"]) if rows else None
+
+    def insert_user(self, user: Dict) -> bool:
+        """Inserta un usuario nuevo.
+
+        Returns:
+            False si el nombre ya existe (la restricción PRIMARY KEY lo hace exacto
+            incluso con varios procesos registrando a la vez).
+        """
+        try:
+            self._write(USERS_DOC, lambda conn: conn.execute(
+                "INSERT INTO users(username, role, doc) VALUES (?, ?, ?)",
+                (user["username"], user.get("role"), json.dumps(user, ensure_ascii=False))))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def update_user(self, user: Dict) -> bool:
+        """Actualiza el registro de `user['username']`; False si no existe."""
+        cur = self._write(USERS_DOC, lambda conn: conn.execute(
+            "UPDATE users SET role = ?, doc = ? WHERE username = ?",
+            (user.get("role"), json.dumps(user, ensure_ascii=False), user["username"])))
+        return cur.rowcount > 0
+
+    # ===== Reservas =====
+
+    def find_reservations(self, kind: str, user: str = None, resource: Tuple[str, str] = None,
+                          start: datetime = None, end: datetime = None,
+                          limit: int = None) -> List[Dict]:
+        """Retorna reservas de `kind` filtradas en SQL.
+
+        Args:
+            kind: 'vehicle' o 'hotel'.
+            user: Si se indica, solo reservas de ese usuario.
+            resource: Tupla `(resource, subtype)` (ver `reservation_columns`).
+            start, end: Si se indican, solo reservas que se solapan con `[start, end)`.
+            limit: Número máximo de filas.
+
+        Returns:
+            Lista de reservas (dicts) en orden de inserción.
+        """
+        sql, params = self._reservation_filter(kind, user, resource, start, end)
+        sql = f"SELECT doc FROM reservations WHERE {sql} ORDER BY seq"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(r["doc"]) for r in self._query(sql, params)]
+
+    def _reservation_filter(self, kind, user, resource, start, end) -> Tuple[str, Tuple]:
+        """Construye la cláusula WHERE (y sus parámetros) para los filtros dados."""
+        clauses, params = ["kind = ?"], [kind]
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if resource is not None:
+            clauses.append("resource = ? AND subtype = ?")
+            params.extend(resource)
+        if start is not None and end is not None:
+            # Solapamiento: (start_req < res_end) and (res_start < end_req)
+            clauses.append("end > ? AND start < ?")
+            params.extend([start.isoformat(), end.isoformat()])
+        return " AND ".join(clauses), tuple(params)
+
+    def top_users(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """Retorna `(user, vehicle_count, hotel_count)` de los usuarios con más reservas."""
+        rows = self._query(
+            "SELECT user, SUM(kind = 'vehicle') AS vehicles, SUM(kind = 'hotel') AS hotels "
+            "FROM reservations GROUP BY user ORDER BY COUNT(*) DESC, user DESC LIMIT ?", (int(limit),))
+        return [(r["user"], r["vehicles"], r["hotels"]) for r in rows]
+
+    def driver_schedule(self, drivers: List[str], start: datetime,
+                        end: datetime) -> Dict[str, Tuple[bool, int]]:
+        """Retorna `{chofer: (ocupado_en_[start, end), reservas_asignadas)}`.
+
+        Solo incluye los choferes de `drivers` con al menos una reserva.
+        """
+        if not drivers:
+            return {}
+        marks = ", ".join("?" for _ in drivers)
+        rows = self._query(
+            "SELECT driver, COUNT(*) AS total, SUM(end > ? AND start < ?) AS busy "
+            f"FROM reservations WHERE kind = 'vehicle' AND driver IN ({marks}) GROUP BY driver",
+            (start.isoformat(), end.isoformat(), *drivers))
+        return {r["driver"]: (bool(r["busy"]), r["total"]) for r in rows}
+
+    def insert_reservation(self, kind: str, res: Dict) -> bool:
+        """Agrega una reserva sin reescribir las demás."""
+        return self.insert_reservations([(kind, res)])
+
+    def insert_reservations(self, items: List[Tuple[str, Dict]]) -> bool:
+        """Agrega varias reservas `(kind, res)` en una sola transacción."""
+        return self.insert_reservations_checked(lambda: (items, True))
+
+    def insert_reservations_checked(self, build) -> Any:
+        """Valida y agrega reservas de forma atómica frente a otros procesos.
+
+        `build()` se ejecuta dentro de la transacción de escritura y retorna
+        `(items, resultado)`; las consultas que haga desde este hilo ven el estado
+        de la transacción y ningún otro proceso puede insertar hasta el COMMIT,
+        así que lo validado es exactamente lo que se guarda.
+
+        Returns:
+            El `resultado` de `build`.
+        """
+        def operation(conn):
+            items, result = build()
+            for kind, res in items:
+                self._insert_reservation(conn, kind, res)
+            return result
+        return self._write(RESERVATIONS_DOC, operation)
+
+    def delete_reservation(self, kind: Optional[str], res_id: str) -> List[Tuple[str, Dict]]:
+        """Elimina las reservas con `id == res_id` (de `kind`, o de cualquier tipo si es None).
+
+        Returns:
+            Lista de `(kind, reserva)` eliminadas (vacía si no existía).
+        """
+        return self._write(RESERVATIONS_DOC, lambda conn: self._delete_reservation(conn, kind, res_id))
+
+    def delete_reservations(self, items: List[Tuple[str, str]]) -> List[Tuple[str, Dict]]:
+        """Elimina en una sola transacción las reservas `(kind, id)` de `items`.
+
+        Returns:
+            Lista de `(kind, reserva)` eliminadas.
+        """
+        def operation(conn):
+            removed = []
+            for kind, res_id in items:
+                removed.extend(self._delete_reservation(conn, kind, res_id))
+            return removed
+        return self._write(RESERVATIONS_DOC, operation)
+
+    def _delete_reservation(self, conn, kind: Optional[str], res_id: str) -> List[Tuple[str, Dict]]:
+        """Borra las filas de `res_id` (y `kind`, si se indica) y las descuenta del libro de ocupación."""
+        if kind is None:
+            rows = conn.execute("SELECT seq, kind, doc FROM reservations WHERE id = ?", (res_id,)).fetchall()
+        else:
+            rows = conn.execute("SELECT seq, kind, doc FROM reservations WHERE kind = ? AND id = ?",
+                                (kind, res_id)).fetchall()
+        removed = [(r["kind"], json.loads(r["doc"])) for r in rows]
+        if rows:
+            conn.executemany("DELETE FROM reservations WHERE seq = ?", [(r["seq"],) for r in rows])
+        for row_kind, res in removed:
+            self._change_occupancy(conn, row_kind, res, -1)
+        return removed
+
+    def expired_reservations(self, before: datetime) -> List[Tuple[str, Dict]]:
+        """Reservas `(kind, reserva)` que terminan antes de `before`, en orden de inserción."""
+        rows = self._query("SELECT kind, doc FROM reservations WHERE end < ? ORDER BY seq",
+                           (before.isoformat(),))
+        return [(r["kind"], json.loads(r["doc"])) for r in rows]
+
+    # ===== Libro de ocupación =====
+
+    def max_occupancy(self, kind: str, resource: Tuple[str, str], start: datetime,
+                      end: datetime) -> int:
+        """Máximo de unidades reservadas en un día de `[start, end)` para el recurso."""
+        days = day_range(to_epoch(start), to_epoch(end))
+        if not days:
+            return 0
+        rows = self._query(
+            "SELECT MAX(units) AS n FROM occupancy "
+            "WHERE kind = ? AND resource = ? AND subtype = ? AND day >= ? AND day < ?",
+            (kind, *resource, days.start, days.stop))
+        return rows[0]["n"] or 0
+
+    def occupancy_maxima(self, start: datetime, end: datetime) -> Dict[Tuple[str, str, str], int]:
+        """`max_occupancy` de todos los recursos en una sola consulta.
+
+        Returns:
+            `{(kind, resource, subtype): unidades}` solo con los recursos ocupados.
+        """
+        days = day_range(to_epoch(start), to_epoch(end))
+        if not days:
+            return {}
+        rows = self._query(
+            "SELECT kind, resource, subtype, MAX(units) AS n FROM occupancy "
+            "WHERE day >= ? AND day < ? GROUP BY kind, resource, subtype HAVING n > 0",
+            (days.start, days.stop))
+        return {(r["kind"], r["resource"], r["subtype"]): r["n"] for r in rows}
+
+    def occupancy_units(self, kind: str, resource: Tuple[str, str], first_day: int,
+                        days: int) -> List[int]:
+        """Unidades reservadas en cada uno de los `days` días desde `first_day`."""
+        result = [0] * max(days, 0)
+        rows = self._query(
+            "SELECT day, units FROM occupancy "
+            "WHERE kind = ? AND resource = ? AND subtype = ? AND day >= ? AND day < ?",
+            (kind, *resource, first_day, first_day + days))
+        for r in rows:
+            result[r["day"] - first_day] = r["units"]
+        return result
+
+    def occupancy_ledger(self) -> OccupancyLedger:
+        """Lee la tabla `occupancy` completa como un `OccupancyLedger` (para comprobarla)."""
+        ledger = OccupancyLedger()
+        for r in self._query("SELECT kind, resource, subtype, day, units FROM occupancy"):
+            start = r["day"] * DAY_SECONDS
+            ledger.add((r["kind"], r["resource"], r["subtype"]), start, start + DAY_SECONDS, r["units"])
+        return ledger
+
+    def rebuild_occupancy(self) -> None:
+        """Recalcula la tabla `occupancy` desde cero a partir de las reservas."""
+        def operation(conn):
+            ledger = OccupancyLedger()
+            for r in conn.execute("SELECT kind, resource, subtype, start, end FROM reservations"):
+                ledger.add((r["kind"], r["resource"], r["subtype"]), to_epoch(r["start"]), to_epoch(r["end"]))
+            conn.execute("DELETE FROM occupancy")
+            conn.executemany(
+                "INSERT INTO occupancy(kind, resource, subtype, day, units) VALUES (?, ?, ?, ?, ?)",
+                [(*key, day, units) for key, days in ledger.entries().items() for day, units in days.items()])
+        self._write(OCCUPANCY_DOC, operation)
+
+
+def _canonicalize_reservations(data: Dict, catalog: ResourceCatalog) -> None:
+    """Reescribe en `data` los nombres de recurso de cada reserva con los del catálogo."""
+    for kind, key in RESERVATION_KEYS.items():
+        for res in data.get(key, []):
+            columns = reservation_columns(kind, res)
+            resource, subtype = catalog.canonical_columns(kind, *columns)
+            if (resource, subtype) == columns:
+                continue
+            if kind == "vehicle":
+                res["car_type"] = resource
+            else:
+                res["hotel"], res["room_type"] = resource, subtype
+
+
+def migrate_json_to_sqlite(base_dir: str, sqlite_file: str = "reservations.db") -> Dict[str, int]:
+    """Importa `login.json`, `res_data.json` y `reservations.json` a SQLite.
+
+    Cada documento reemplaza por completo el contenido de sus tablas, así que el
+    comando puede repetirse sin duplicar datos. Usuarios y reservas se leen con
+    su journal (`login.journal`, `reservations.journal`) aplicado, igual que
+    los ve la aplicación con `--journal`; los archivos de origen no se
+    modifican. Las claves internas del backend JSON (`_version`,
+    `journal_seq`) no se importan. Las reservas se importan con los nombres
+    del catálogo (ver `ResourceCatalog.canonical_columns`).
+
+    Args:
+        base_dir: Directorio con los archivos JSON (y destino del `.db`).
+        sqlite_file: Nombre del archivo de base de datos.
+
+    Returns:
+        Dict con el número de registros importados por tabla.
+    """
+    # `database` y `journal` importan este módulo
+    from database import DatabaseManager
+    from journal import ReservationJournal, UserJournal
+
+    source = DatabaseManager(base_dir, cache_enabled=False)
+    readers = {
+        USERS_DOC: UserJournal(source).load,
+        RESOURCES_DOC: lambda: source.load_json_file(RESOURCES_DOC),
+        RESERVATIONS_DOC: ReservationJournal(source).load,
+    }
+    store = SQLiteStore(os.path.join(base_dir, sqlite_file))
+    counts = {}
+    catalog = None
+    try:
+        for doc_name, read in readers.items():
+            # Se omiten los que faltan o no se pueden leer en ningún codec
+            if source.file_version(doc_name) is None or source.is_damaged(doc_name):
+                continue
+            data = read()
+            if doc_name == RESOURCES_DOC and isinstance(data, dict):
+                catalog = ResourceCatalog(data)
+            elif doc_name == RESERVATIONS_DOC and catalog is not None:
+                _canonicalize_reservations(data, catalog)
+            store.save_document(doc_name, data)
+        for table in ("users", "cars", "hotels", "rooms", "drivers", "reservations"):
+            counts[table] = store._query(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+    finally:
+        store.close()
+    return counts
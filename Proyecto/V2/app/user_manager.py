@@ -1,8 +1,10 @@
 """
 User Manager - Gestiona autenticación y usuarios
 """
-from database import DatabaseManager
-from typing import Tuple, Optional, List, Dict
+from database import DatabaseManager, clone_json
+from journal import UserJournal
+from metrics import METRICS
+from typing import Any, Tuple, Optional, List, Dict
 import os
 import hashlib
 
@@ -14,15 +16,20 @@ _SALT_BYTES = 16
 class UserManager:
     """Gestiona usuarios, autenticación y roles"""
     
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, journal: UserJournal = None):
         """
         Inicializa el gestor de usuarios.
         
         Args:
             db: Instancia de DatabaseManager
+            journal: Si se indica, altas y cambios de usuarios se agregan a este
+                journal en lugar de reescribir `login.json` (solo backend JSON)
         """
         self.db = db
+        self.journal = journal
         self.user_file = "login.json"
+        # Índice username -> usuario y versión de `login.json` desde la que se construyó
+        self._index: Optional[Tuple[Any, Dict[str, Dict]]] = None
     
     def register_user(self, username: str, password: str) -> bool:
         """Registra un nuevo usuario y lo persiste en `login.json`.
@@ -31,7 +38,9 @@ class UserManager:
             - Normaliza `username` a minúsculas y recorta espacios.
             - Valida que `username` y `password` no estén vacíos.
             - Comprueba que el usuario no exista ya en la lista.
-            - Añade al usuario con rol `'user'` y guarda usando `_save_users`.
+            - Añade al usuario con rol `'user'` y guarda usando `_modify_users`
+              (o un registro del journal), que vuelve a comprobar que no exista
+              si otro proceso escribió a la vez.
 
         Returns:
             True si el usuario fue agregado correctamente, False si ya existía o hubo error.
@@ -43,14 +52,41 @@ class UserManager:
             print("Error: Username and password cannot be empty.")
             return False
         
-        users = self._get_users()
-        
-        if any(user.get("username", "") == username for user in users):
+        if self._find_user(username) is not None:
             print("Error: User already exists.")
             return False
         password = self._hash_password(password)
-        users.append({"username": username, "password": password, "role": "user"})
-        return self._save_users(users)
+        new_user = {"username": username, "password": password, "role": "user"}
+        
+        if self.db.sql is not None:
+            # La PRIMARY KEY hace la comprobación exacta aunque otro proceso registre a la vez
+            if not self.db.sql.insert_user(new_user):
+                print("Error: User already exists.")
+                return False
+            print("User data saved successfully.")
+            return True
+        
+        def add_user(users):
+            if any(user.get("username", "") == username for user in users):
+                return (False, False)
+            users.append(new_user)
+            return (True, True)
+        
+        def add_record():
+            if self.journal.get(username) is not None:
+                return ([], False)
+            return ([{"op": "put", "user": new_user}], True)
+        
+        if self.journal is not None:
+            ok, added = self.journal.update(add_record)
+        else:
+            ok, added = self._modify_users(add_user)
+        if not added:
+            print("Error: User already exists.")
+            return False
+        if ok:
+            print("User data saved successfully.")
+        return ok
     
     def login(self, username: str = None, password: str = None) -> Optional[Tuple[str, str, str]]:
         """Autentica un usuario contra los datos almacenados.
@@ -76,33 +112,42 @@ class UserManager:
         if not username or not password:
             print("Error: Username and password cannot be empty.")
             return None
-        users = self._get_users()
+        user = self._find_user(username)
+        if user is None:
+            print("Error: User not found.")
+            return None
         
-        for user in users:
-            if user.get('username', '') == username:
-                stored = user.get('password')
-                # Si el password almacenado es una tupla/list usar el verificador
-                if isinstance(stored, (list, tuple)):
-                    if stored and self._verify_password(password, stored):
-                        print("Login successful.")
-                        return (user.get('username'), None, user.get('role'))
-                    else:
-                        print("Error: Incorrect password.")
-                        return None
-                else:
-                    # Posible contraseña en claro almacenada (migración): comprobar igualdad directa
-                    if isinstance(stored, str) and stored == password:
-                        # Migrar a hash seguro y guardar
-                        user['password'] = self._hash_password(password)
-                        self._save_users(users)
-                        print("Login successful. Password migrated to hashed storage.")
-                        return (user.get('username'), None, user.get('role'))
-                    else:
-                        print("Error: Incorrect password.")
-                        return None
+        valid, rehashed = self.check_password(user, password)
+        if not valid:
+            print("Error: Incorrect password.")
+            return None
         
-        print("Error: User not found.")
-        return None
+        if rehashed is not None:
+            # Migrar a hash seguro y guardar (sobre una copia mutable)
+            self.update_user(dict(user, password=rehashed))
+            print("Login successful. Password migrated to hashed storage.")
+        else:
+            print("Login successful.")
+        return (user.get('username'), None, user.get('role'))
+    
+    def check_password(self, user: Dict, password: str) -> Tuple[bool, Optional[Tuple]]:
+        """Verifica `password` contra el registro `user` sin leer ni escribir archivos.
+
+        Solo usa CPU (PBKDF2), así que puede ejecutarse en un hilo aparte.
+
+        Returns:
+            (válida, nuevo_hash): `nuevo_hash` no es None cuando la contraseña
+            estaba guardada en claro y debe migrarse con `update_user`.
+        """
+        stored = user.get('password')
+        # Si el password almacenado es una tupla/list usar el verificador
+        if isinstance(stored, (list, tuple)):
+            return (bool(stored) and self._verify_password(password, stored), None)
+        
+        # Posible contraseña en claro almacenada (migración): comprobar igualdad directa
+        if isinstance(stored, str) and stored == password:
+            return (True, self._hash_password(password))
+        return (False, None)
     
     def make_admin(self, username: str = None) -> bool:
         """Promueve el usuario indicado a rol 'admin'.
@@ -125,15 +170,12 @@ class UserManager:
             print("Error: Username cannot be empty.")
             return False
         
-        users = self._get_users()
-        
-        for user in users:
-            if user.get("username", "") == username:
-                user["role"] = "admin"
-                return self._save_users(users)
+        user = self._find_user(username)
+        if user is None:
+            print(f"Error: User '{username}' does not exist.")
+            return False
         
-        print(f"Error: User '{username}' does not exist.")
-        return False
+        return self.update_user(dict(user, role="admin"))
     
     def display_user_data(self, username: str, role: str) -> None:
         """Muestra en consola datos de usuarios.
@@ -146,26 +188,26 @@ class UserManager:
             username: Nombre del usuario que solicita ver datos.
             role: Rol del usuario actual, controla el alcance de la visualización.
         """
-        users = self._get_users()
-        
-        if role == 'admin':
-            if not users:
-                print("No users found.")
+        if role != 'admin':
+            user = self._find_user(username)
+            if user is None:
+                print("Error: User profile not found.")
                 return
-            
-            print("\n--- All Users ---")
-            for user in users:
-                print(f"Username: {user.get('username')}")
-                print(f"Role: {user.get('role')}")
-                print("---")
-        else:
-            for user in users:
-                if user.get('username', '') == username:
-                    print(f"\n--- Your Profile ---")
-                    print(f"Username: {user.get('username')}")
-                    print(f"Role: {user.get('role')}")
-                    return
-            print("Error: User profile not found.")
+            print(f"\n--- Your Profile ---")
+            print(f"Username: {user.get('username')}")
+            print(f"Role: {user.get('role')}")
+            return
+        
+        users = self._get_users(readonly=True)
+        if not users:
+            print("No users found.")
+            return
+        
+        print("\n--- All Users ---")
+        for user in users:
+            print(f"Username: {user.get('username')}")
+            print(f"Role: {user.get('role')}")
+            print("---")
     
     def get_all_users(self) -> List[Dict]:
         """Retorna la lista completa de usuarios almacenados.
@@ -173,20 +215,98 @@ class UserManager:
         Nota: este método delega en `_get_users` y devuelve una lista (vacía si no hay usuarios).
         """
         return self._get_users()
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        """Retorna el registro de `username` (vista de solo lectura) o None si no existe."""
+        return self._find_user(str(username or '').lower().strip())
+
+    def update_user(self, user: Dict) -> bool:
+        """Reemplaza el registro del usuario `user['username']` y persiste el cambio.
+
+        Lo usan `login` (migración de contraseñas), `make_admin` y el servidor HTTP.
+
+        Returns:
+            True si el guardado fue exitoso, False si el usuario no existe o falló.
+        """
+        if self.db.sql is not None:
+            if not self.db.sql.update_user(user):
+                return False
+            print("User data saved successfully.")
+            return True
+        
+        def replace_user(users):
+            for i, existing in enumerate(users):
+                if existing.get('username', '') == user['username']:
+                    users[i] = user
+                    return (True, True)
+            return (False, False)
+        
+        def replace_record():
+            if self.journal.get(user['username']) is None:
+                return ([], False)
+            return ([{"op": "put", "user": user}], True)
+        
+        if self.journal is not None:
+            ok, found = self.journal.update(replace_record)
+        else:
+            ok, found = self._modify_users(replace_user)
+        if ok and found:
+            print("User data saved successfully.")
+        return ok and found
     
     # ===== Métodos Privados (Gestión de formato) =====
     
-    def _get_users(self) -> List[Dict]:
+    def _find_user(self, username: str) -> Optional[Dict]:
+        """Busca un usuario por nombre exacto (ya normalizado).
+
+        Con el backend SQLite es una consulta por clave primaria; en modo
+        journal y con JSON es un acceso a diccionario (ver `_get_index`).
+
+        Returns:
+            Dict del usuario (no debe modificarse) o None si no existe.
+        """
+        if self.db.sql is not None:
+            return self.db.sql.get_user(username)
+        if self.journal is not None:
+            return self.journal.get(username)
+        return self._get_index().get(username)
+    
+    def _get_index(self) -> Dict[str, Dict]:
+        """Retorna el índice `username -> usuario` de `login.json`.
+
+        Se reconstruye solo cuando cambia la versión del archivo (ver
+        `DatabaseManager.file_version`). Con nombres repetidos gana el primero,
+        igual que el recorrido lineal.
+        """
+        version = self.db.file_version(self.user_file)
+        if self._index is None or self._index[0] != version:
+            index = {}
+            users = self._get_users(readonly=True)
+            for user in users:
+                index.setdefault(user.get('username', ''), user)
+            self._index = (version, index)
+            if METRICS.enabled:
+                METRICS.incr("rows_scanned", "users", len(users))
+        return self._index[1]
+    
+    def _get_users(self, readonly: bool = False) -> List[Dict]:
         """Carga y retorna la lista interna de usuarios desde `login.json`.
 
         Formatos soportados en el archivo:
             - `{ "users": [...] }` (estructura preferida)
             - Lista directa `[...]`
 
+        Args:
+            readonly: Si es True la lista es la vista compartida del caché y no
+                debe modificarse.
+
         Returns:
             Lista de usuarios (cada uno es un dict con keys `username`, `password`, `role`).
         """
-        data = self.db.load_json_file(self.user_file)
+        if self.journal is not None:
+            users = self.journal.users()
+            return users if readonly else clone_json(users)
+        data = self.db.load_json_file(self.user_file, readonly)
         
         # Si tiene estructura {"users": [...]}, extrae la lista
         if isinstance(data, dict) and 'users' in data:
@@ -198,27 +318,36 @@ class UserManager:
         
         return []
     
-    def _save_users(self, users: List[Dict]) -> bool:
-        """Guarda la lista de usuarios en `login.json` con el formato {"users": [...]}.
+    def _modify_users(self, mutate) -> Tuple[bool, Any]:
+        """Aplica `mutate(users)` a la lista actual de usuarios y la guarda.
+
+        Usa `DatabaseManager.update_json_file`: si otro proceso guarda usuarios
+        entre la lectura y la escritura, `mutate` se vuelve a ejecutar sobre la
+        lista nueva, así que no se pierden registros.
 
         Args:
-            users: Lista de diccionarios de usuario que se persistirán.
+            mutate: Función `users -> (guardar, resultado)` que modifica la lista en sitio.
 
         Returns:
-            True si el guardado fue exitoso, False si falló.
+            (ok, resultado): `ok` es False solo si falló la escritura.
         """
-        formatted_data = {"users": users}
-        if self.db.save(self.user_file, formatted_data):
-            print("User data saved successfully.")
-            return True
-        return False
+        def operation(data):
+            if isinstance(data, list):
+                users = data
+            else:
+                users = data.setdefault('users', [])
+            return mutate(users)
+        return self.db.update_json_file(self.user_file, operation)
     
     def get_all_users(self) -> List[Dict]:
         """(Alias) Retorna la lista de todos los usuarios usando `DatabaseManager.load`.
 
         Nota: existe otro método `get_all_users` que delega en `_get_users`; este
-        método actúa como un alias que devuelve la carga cruda del archivo.
+        método actúa como un alias que devuelve la carga cruda del archivo (en
+        modo journal, el snapshot con los registros pendientes aplicados).
         """
+        if self.journal is not None:
+            return self.journal.load()
         return self.db.load(self.user_file, [])
     
     def _hash_password(self, password: str):
@@ -0,0 +1,18 @@
+"""
+Benchmarks - Datos sintéticos reproducibles y escenarios cronometrados
+
+Uso (desde `Proyecto/V2/`):
+
+    python -m benchmarks generate --scale 100k --out benchmarks/data/100k
+    python -m benchmarks run --data benchmarks/data/100k --output results.json
+    python -m benchmarks compare results.json benchmarks/baseline.json
+    python -m benchmarks coldstart --data benchmarks/data/100k
+    python -m benchmarks codecs --data benchmarks/data/100k
+"""
+import os
+import sys
+
+# Los módulos de la aplicación se importan sin paquete (igual que en `python app`)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
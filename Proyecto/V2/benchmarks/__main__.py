@@ -0,0 +1,156 @@
+"""
+Punto de entrada: `python -m benchmarks {generate,run,compare,coldstart,codecs}` desde `Proyecto/V2/`
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from typing import List
+
+from database import BACKENDS
+from metrics import METRICS
+
+from .coldstart import coldstart, print_coldstart
+from .encoding import measure, print_encoding
+from .generator import SCALES, generate
+from .runner import compare, load_results, print_comparison, print_results, run
+from .scenarios import SCENARIOS
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construye el parser de la línea de comandos."""
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Reservation system benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Write a synthetic, seeded data set")
+    gen.add_argument("--scale", choices=SCALES, default="1k", help="Data set size (default: 1k)")
+    gen.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    gen.add_argument("--start-date", type=date.fromisoformat, default=None,
+                     help="'Today' of the data set, YYYY-MM-DD (default: today)")
+    gen.add_argument("--out", required=True, help="Output directory")
+
+    bench = commands.add_parser("run", help="Time the scenarios against a data set copy")
+    bench.add_argument("--data", required=True, help="Directory written by 'generate'")
+    bench.add_argument("--scenarios", default=None,
+                       help=f"Comma-separated subset of: {', '.join(SCENARIOS)} (default: all)")
+    bench.add_argument("--iterations", type=int, default=200, help="Calls per scenario (default: 200)")
+    bench.add_argument("--seed", type=int, default=1, help="Random seed for the arguments (default: 1)")
+    bench.add_argument("--backend", choices=BACKENDS, default="json", help="Storage backend (default: json)")
+    bench.add_argument("--journal", action="store_true", help="Use journal mode (json backend)")
+    bench.add_argument("--metrics", action="store_true",
+                       help="Also record per-method instrumentation (adds its overhead to the timings)")
+    bench.add_argument("--output", default=None, help="Write the results to this JSON file")
+    bench.add_argument("--baseline", default=None, help="Compare against this results file")
+    bench.add_argument("--tolerance", type=float, default=0.10,
+                       help="Allowed slowdown vs the baseline before flagging a regression (default: 0.10)")
+    bench.add_argument("--min-delta-ms", type=float, default=0.05,
+                       help="Ignore differences smaller than this many milliseconds (default: 0.05)")
+
+    cold = commands.add_parser("coldstart",
+                               help="Compare cold starts of reservations.json and the mmap binary file")
+    cold.add_argument("--data", required=True, help="Directory written by 'generate'")
+    cold.add_argument("--repeat", type=int, default=5, help="Fresh processes per method (default: 5)")
+    cold.add_argument("--output", default=None, help="Write the results to this JSON file")
+
+    codecs = commands.add_parser("codecs", help="Size and encode/decode time of each storage codec")
+    codecs.add_argument("--data", required=True, help="Directory written by 'generate'")
+    codecs.add_argument("--codecs", default=None,
+                        help="Comma-separated subset of the codecs (default: all)")
+    codecs.add_argument("--repeat", type=int, default=5, help="Runs per codec and file (default: 5)")
+    codecs.add_argument("--output", default=None, help="Write the results to this JSON file")
+
+    cmp = commands.add_parser("compare", help="Compare two results files")
+    cmp.add_argument("current", help="Results file to check")
+    cmp.add_argument("baseline", help="Baseline results file")
+    cmp.add_argument("--tolerance", type=float, default=0.10,
+                     help="Allowed slowdown before flagging a regression (default: 0.10)")
+    cmp.add_argument("--min-delta-ms", type=float, default=0.05,
+                     help="Ignore differences smaller than this many milliseconds (default: 0.05)")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """Ejecuta el comando; retorna 1 si hubo regresiones o errores."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        counts = generate(args.out, args.scale, args.seed, args.start_date)
+        print(f"Generated '{args.scale}' data set (seed {args.seed}) in {args.out}:")
+        for name, count in counts.items():
+            print(f"  {name}: {count}")
+        return 0
+
+    if args.command == "coldstart":
+        try:
+            results = coldstart(args.data, args.repeat)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        print_coldstart(results)
+        if args.output:
+            try:
+                with open(args.output, 'w', encoding='utf-8') as file:
+                    json.dump(results, file, indent=4)
+            except IOError as e:
+                print(f"Error saving to {args.output}: {e}")
+                return 1
+        return 0
+
+    if args.command == "codecs":
+        try:
+            results = measure(args.data, args.repeat, args.codecs.split(",") if args.codecs else None)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        print_encoding(results)
+        if args.output:
+            try:
+                with open(args.output, 'w', encoding='utf-8') as file:
+                    json.dump(results, file, indent=4)
+            except IOError as e:
+                print(f"Error saving to {args.output}: {e}")
+                return 1
+        return 0
+
+    if args.command == "run":
+        if args.journal and args.backend != "json":
+            parser.error("--journal requires the json backend")
+        names = args.scenarios.split(",") if args.scenarios else None
+        try:
+            results = run(args.data, names, args.iterations, args.seed, args.backend, args.journal,
+                          args.metrics)
+        except ValueError as e:
+            parser.error(str(e))
+        print_results(results)
+        if args.metrics:
+            print()
+            print(METRICS.format_table())
+        if args.output:
+            try:
+                with open(args.output, 'w', encoding='utf-8') as file:
+                    json.dump(results, file, indent=4)
+            except IOError as e:
+                print(f"Error saving to {args.output}: {e}")
+                return 1
+        if not args.baseline:
+            return 0
+        baseline = load_results(args.baseline)
+        if baseline is None:
+            return 1
+        current = results
+    else:
+        current, baseline = load_results(args.current), load_results(args.baseline)
+        if current is None or baseline is None:
+            return 1
+
+    rows, regressed = compare(current, baseline, args.tolerance, args.min_delta_ms)
+    print()
+    print_comparison(rows)
+    if regressed:
+        print(f"\nRegression: some scenario is more than {args.tolerance:.0%} slower than the baseline.")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
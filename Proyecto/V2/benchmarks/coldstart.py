@@ -0,0 +1,189 @@
+"""
+Cold start - Compara el arranque en frío de `reservations.json` con el archivo binario (mmap)
+
+Cada medición corre en un proceso nuevo (`python -m benchmarks.coldstart`),
+así que el tiempo incluye leer el archivo desde cero y la memoria es la del
+proceso recién creado.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows: sin `getrusage` ni `/proc`, no se mide la memoria
+    resource = None
+
+from . import APP_DIR
+from .runner import summarize
+
+# Formas de abrir las reservas que se comparan
+METHODS = ("json", "binary")
+
+
+def _max_rss_kb() -> int:
+    """Pico de memoria residente del proceso en KiB (0 si no se puede medir).
+
+    En Linux se lee `VmHWM` de `/proc/self/status`: `ru_maxrss` conserva tras
+    `exec` el pico del proceso padre y falsearía la medida del hijo.
+    """
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def probe(method: str, path: str, user: str, car_type: str, start: int, end: int) -> Dict:
+    """Abre las reservas con `method` y hace una consulta por usuario y otra de disponibilidad.
+
+    Returns:
+        Tiempos en ms (`open_ms`, `user_ms`, `scan_ms`), pico de memoria
+        (`rss_kb`, y `rss_base_kb` antes de abrir) y los resultados de las
+        consultas para comprobar que ambos métodos coinciden.
+    """
+    from binary_store import BinaryReservationFile
+    from database import DatabaseManager
+    from occupancy import OccupancyLedger
+    from records import to_epoch
+
+    base_rss = _max_rss_kb()
+    started = time.perf_counter()
+    if method == "json":
+        db = DatabaseManager(os.path.dirname(path))
+        data = db.load_json_file(os.path.basename(path), readonly=True)
+        opened = time.perf_counter()
+        mine = [res for key in ("vehicle_reservations", "hotel_reservations")
+                for res in data.get(key, []) if res.get("user") == user]
+        looked_up = time.perf_counter()
+        ledger = OccupancyLedger()
+        for res in data.get("vehicle_reservations", []):
+            if res.get("car_type") == car_type:
+                ledger.add(None, to_epoch(res["start"]), to_epoch(res["end"]))
+        units = ledger.max_units(None, start, end)
+    else:
+        store = BinaryReservationFile(path)
+        opened = time.perf_counter()
+        mine = store.user_reservations(user)
+        looked_up = time.perf_counter()
+        units = store.max_units("vehicle", car_type, "", start, end)
+    scanned = time.perf_counter()
+    return {
+        "open_ms": round((opened - started) * 1000, 3),
+        "user_ms": round((looked_up - opened) * 1000, 3),
+        "scan_ms": round((scanned - looked_up) * 1000, 3),
+        "rss_base_kb": base_rss,
+        "rss_kb": _max_rss_kb(),
+        "user_reservations": len(mine),
+        "max_units": units,
+    }
+
+
+def coldstart(data_dir: str, repeat: int = 5) -> Dict:
+    """Mide `repeat` arranques en frío de cada método sobre `data_dir/reservations.json`.
+
+    El archivo binario se genera en un directorio temporal (`write_binary`) y
+    su conversión se mide aparte. La consulta por usuario y la de
+    disponibilidad usan la primera reserva de vehículo del conjunto.
+
+    Returns:
+        `{"meta": {...}, "methods": {método: resumen}}`; cada resumen tiene los
+        percentiles del tiempo total (`summarize`), la media de cada fase y el
+        pico de memoria medio.
+
+    Raises:
+        ValueError si los dos métodos no devuelven lo mismo.
+    """
+    from binary_store import write_binary
+    from records import to_epoch
+
+    workdir = tempfile.mkdtemp(prefix="coldstart-")
+    try:
+        json_path = os.path.join(workdir, "reservations.json")
+        shutil.copy(os.path.join(data_dir, "reservations.json"), json_path)
+        with open(json_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        vehicles = data.get("vehicle_reservations", [])
+        sample = vehicles[0] if vehicles else {"user": "", "car_type": "", "start": "1970-01-01",
+                                               "end": "1970-01-02"}
+        query = [sample["user"], sample["car_type"], str(to_epoch(sample["start"])),
+                 str(to_epoch(sample["end"]))]
+        bin_path = os.path.join(workdir, "reservations.bin")
+        converting = time.perf_counter()
+        count = write_binary(data, bin_path)
+        convert_ms = (time.perf_counter() - converting) * 1000
+        del data, vehicles
+
+        methods, answers = {}, {}
+        for method in METHODS:
+            path = json_path if method == "json" else bin_path
+            runs = [_run_probe(method, path, query) for _ in range(repeat)]
+            answers[method] = (runs[0]["user_reservations"], runs[0]["max_units"])
+            summary = summarize([(r["open_ms"] + r["user_ms"] + r["scan_ms"]) / 1000 for r in runs])
+            for phase in ("open_ms", "user_ms", "scan_ms"):
+                summary[f"{phase[:-3]}_mean_ms"] = round(sum(r[phase] for r in runs) / repeat, 3)
+            summary["rss_mean_kb"] = sum(r["rss_kb"] for r in runs) // repeat
+            summary["rss_growth_mean_kb"] = sum(r["rss_kb"] - r["rss_base_kb"] for r in runs) // repeat
+            methods[method] = summary
+        if len(set(answers.values())) != 1:
+            raise ValueError(f"JSON and binary stores disagree: {answers}")
+
+        return {
+            "meta": {
+                "data_dir": os.path.abspath(data_dir),
+                "reservations": count,
+                "repeat": repeat,
+                "json_bytes": os.path.getsize(json_path),
+                "binary_bytes": os.path.getsize(bin_path),
+                "convert_ms": round(convert_ms, 3),
+                "rss_measured": any(summary["rss_mean_kb"] for summary in methods.values()),
+            },
+            "methods": methods,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_probe(method: str, path: str, query: List[str]) -> Dict:
+    """Ejecuta `probe` en un proceso nuevo y retorna su resultado.
+
+    Raises:
+        ValueError si el proceso falla.
+    """
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.coldstart", method, path, *query],
+                               cwd=os.path.dirname(APP_DIR), capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise ValueError(f"{method} probe failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout)
+
+
+def print_coldstart(results: Dict) -> None:
+    """Imprime la comparación de arranque en frío."""
+    meta = results["meta"]
+    print(f"Cold start | {meta['reservations']} reservations | {meta['repeat']} runs per method")
+    print(f"Files: JSON {meta['json_bytes']} bytes, binary {meta['binary_bytes']} bytes "
+          f"(conversion {meta['convert_ms']} ms)")
+    print(f"{'method':<10}{'p50 ms':>10}{'open ms':>10}{'user ms':>10}{'scan ms':>10}"
+          f"{'RSS MiB':>10}{'growth MiB':>12}")
+    for method, summary in results["methods"].items():
+        rss = f"{summary['rss_mean_kb'] / 1024:.1f}" if meta["rss_measured"] else "-"
+        growth = f"{summary['rss_growth_mean_kb'] / 1024:.1f}" if meta["rss_measured"] else "-"
+        print(f"{method:<10}{summary.get('p50_ms', 0):>10.3f}{summary['open_mean_ms']:>10.3f}"
+              f"{summary['user_mean_ms']:>10.3f}{summary['scan_mean_ms']:>10.3f}{rss:>10}{growth:>12}")
+
+
+if __name__ == "__main__":
+    # Proceso hijo de `_run_probe`: método, ruta, usuario, tipo de coche, inicio y fin
+    method_arg, path_arg, user_arg, car_arg, start_arg, end_arg = sys.argv[1:7]
+    print(json.dumps(probe(method_arg, path_arg, user_arg, car_arg, int(start_arg), int(end_arg))))
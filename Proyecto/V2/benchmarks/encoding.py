@@ -0,0 +1,96 @@
+"""
+Encoding - Tamaño y tiempo de codificación/decodificación de cada codec sobre los documentos reales
+
+Mide los codecs de `serialization.CODECS` con los archivos de un conjunto de
+`generate` (usuarios, recursos y reservas) más el libro de ocupación
+(`occupancy.json`), que se calcula a partir de las reservas si no existe.
+La decodificación pasa por `decode_document`, igual que `DatabaseManager`,
+así que incluye la detección del formato.
+"""
+import os
+import time
+from typing import Any, Dict, List
+
+from .runner import summarize
+
+# Documentos medidos, en el orden del informe
+DOCUMENTS = ("login.json", "res_data.json", "reservations.json", "occupancy.json")
+
+
+def _load_documents(data_dir: str) -> Dict[str, Any]:
+    """Lee los documentos de `data_dir` (cualquier codec); calcula el libro si falta."""
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir, cache_enabled=False)
+    documents = {}
+    for name in DOCUMENTS:
+        if os.path.exists(db.resolve_path(name)):
+            documents[name] = db.load_json_file(name)
+    if "occupancy.json" not in documents and "reservations.json" in documents:
+        reservations = ReservationManager(db, ResourceManager(db))
+        documents["occupancy.json"] = reservations._get_ledger().to_json(reservations._index_version)
+    if not documents:
+        raise ValueError(f"No data files found in {data_dir}")
+    return documents
+
+
+def measure(data_dir: str, repeat: int = 5, codecs: List[str] = None) -> Dict:
+    """Codifica y decodifica `repeat` veces cada documento de `data_dir` con cada codec.
+
+    Los archivos de `data_dir` no se modifican: todo ocurre en memoria.
+
+    Returns:
+        `{"meta": {...}, "documents": {documento: {codec: resumen}}}`; cada
+        resumen tiene el tamaño en bytes y los percentiles (`summarize`) de
+        `encode` y `decode`.
+
+    Raises:
+        ValueError si algún codec no existe o no devuelve el mismo documento.
+    """
+    from serialization import CODECS, decode_document, get_codec
+
+    selected = [get_codec(name) for name in (codecs or CODECS)]
+    documents = _load_documents(data_dir)
+    results = {}
+    for name, data in documents.items():
+        results[name] = {}
+        for codec in selected:
+            encode_times, decode_times = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                raw = codec.encode(data)
+                encoded = time.perf_counter()
+                decoded = decode_document(raw)
+                decode_times.append(time.perf_counter() - encoded)
+                encode_times.append(encoded - started)
+            if decoded != data:
+                raise ValueError(f"{codec.name} does not round-trip {name}")
+            results[name][codec.name] = {
+                "bytes": len(raw),
+                "encode": summarize(encode_times),
+                "decode": summarize(decode_times),
+            }
+    return {
+        "meta": {
+            "data_dir": os.path.abspath(data_dir),
+            "repeat": repeat,
+            "codecs": [codec.name for codec in selected],
+        },
+        "documents": results,
+    }
+
+
+def print_encoding(results: Dict) -> None:
+    """Imprime tamaño y tiempos de cada codec, documento por documento."""
+    meta = results["meta"]
+    print(f"Codecs | {meta['repeat']} runs per codec | {meta['data_dir']}")
+    for name, codecs in results["documents"].items():
+        baseline = codecs.get("json-pretty", next(iter(codecs.values())))["bytes"] or 1
+        print()
+        print(name)
+        print(f"  {'codec':<14}{'bytes':>12}{'size':>8}{'encode p50 ms':>16}{'decode p50 ms':>16}")
+        for codec, summary in codecs.items():
+            print(f"  {codec:<14}{summary['bytes']:>12}{summary['bytes'] / baseline:>8.0%}"
+                  f"{summary['encode'].get('p50_ms', 0):>16.3f}{summary['decode'].get('p50_ms', 0):>16.3f}")
@@ -0,0 +1,184 @@
+"""
+Generator - Crea `res_data.json`, `login.json` y `reservations.json` sintéticos
+"""
+import hashlib
+import os
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import DatabaseManager
+from user_manager import _HASH_NAME, _ITERATIONS
+
+# Contraseña de todos los usuarios generados
+PASSWORD = "benchmark"
+
+# Tamaños predefinidos: número de reservas y del resto de entidades
+SCALES = {
+    "1k": {"reservations": 1_000, "users": 200, "hotels": 20, "car_types": 8, "drivers": 20},
+    "100k": {"reservations": 100_000, "users": 20_000, "hotels": 400, "car_types": 40, "drivers": 400},
+    "1m": {"reservations": 1_000_000, "users": 100_000, "hotels": 2_000, "car_types": 120, "drivers": 2_000},
+}
+
+# Proporción de reservas de vehículo (el resto son de hotel)
+VEHICLE_SHARE = 0.4
+
+_CAR_MODELS = ["sedan", "suv", "van", "compact", "pickup", "minibus", "convertible", "motorcycle"]
+_LICENCES = ["A", "B", "C", "D"]
+_ROOM_TYPES = [("Single", 1), ("Double", 2), ("Triple", 3), ("Suite", 4)]
+_CITIES = ["Varadero", "La Habana", "Trinidad", "Viñales", "Cienfuegos", "Holguín", "Santiago"]
+
+
+def _password_hash(rng: random.Random):
+    """Hash PBKDF2 de `PASSWORD` en el formato de `UserManager._hash_password`.
+
+    Se calcula una sola vez y lo comparten todos los usuarios: el coste de un
+    login es el mismo (mismas iteraciones) y generar 100k hashes llevaría horas.
+    """
+    salt = bytes(rng.getrandbits(8) for _ in range(16))
+    dk = hashlib.pbkdf2_hmac(_HASH_NAME, PASSWORD.encode('utf-8'), salt, _ITERATIONS)
+    return [f"pbkdf2_{_HASH_NAME}", _ITERATIONS, salt.hex(), dk.hex()]
+
+
+def _resources(rng: random.Random, scale: Dict) -> Dict:
+    """Construye hoteles, coches y choferes con inventario proporcional a la escala."""
+    # Capacidad pensada para que el calendario de reservas cubra unos dos años
+    lanes = max(1, scale["reservations"] // 90)
+    car_count = max(2, int(lanes * VEHICLE_SHARE / scale["car_types"]))
+    room_count = max(2, int(lanes * (1 - VEHICLE_SHARE) / (scale["hotels"] * 2.5)))
+
+    cars = []
+    for i in range(scale["car_types"]):
+        model = _CAR_MODELS[i % len(_CAR_MODELS)]
+        cars.append({
+            "type": model if i < len(_CAR_MODELS) else f"{model}-{i // len(_CAR_MODELS)}",
+            "price_per_day": rng.randint(20, 150),
+            "seats": rng.choice([2, 4, 5, 7, 9]),
+            "count": rng.randint(car_count // 2 + 1, car_count * 3 // 2 + 1),
+            "licence_type": "A" if model == "motorcycle" else rng.choice(_LICENCES[1:]),
+        })
+
+    hotels = []
+    for i in range(scale["hotels"]):
+        rooms = [{"type": name, "count": rng.randint(room_count // 2 + 1, room_count * 3 // 2 + 1),
+                  "pax": pax}
+                 for name, pax in _ROOM_TYPES[:rng.randint(2, len(_ROOM_TYPES))]]
+        hotels.append({
+            "name": f"Hotel {i:05d}",
+            "location": rng.choice(_CITIES),
+            "room": rooms,
+            "pax_price": rng.randint(30, 200),
+        })
+
+    drivers = [{"name": f"Driver {i:05d}", "license_type": rng.choice(_LICENCES),
+                "CI": f"{rng.randrange(10**10, 10**11)}"}
+               for i in range(scale["drivers"])]
+    return {"cars": cars, "hotels": hotels, "chofer": drivers}
+
+
+def _reservations(rng: random.Random, scale: Dict, resources: Dict,
+                  usernames: List[str], start_date: date) -> Dict:
+    """Genera reservas válidas: sin sobreventa ni solapes por usuario o chofer.
+
+    Cada unidad de inventario es un "carril" con la fecha desde la que está
+    libre; una reserva toma un carril, empieza tras un hueco aleatorio y lo
+    ocupa hasta su fin. Los usuarios y choferes llevan su propia fecha libre,
+    así que se respeta la política de exclusión mutua. El calendario empieza un
+    año antes de `start_date`, de modo que hay historial y reservas futuras.
+    """
+    origin = start_date - timedelta(days=365)
+    vehicle_lanes = [(car, [origin] * car["count"]) for car in resources["cars"]]
+    hotel_lanes = [(hotel, room, [origin] * room["count"])
+                   for hotel in resources["hotels"] for room in hotel["room"]]
+    drivers_by_licence: Dict[str, List[Dict]] = {}
+    for driver in resources["chofer"]:
+        drivers_by_licence.setdefault(driver["license_type"], []).append(driver)
+    driver_free = {driver["name"]: origin for driver in resources["chofer"]}
+    user_free = {"vehicle": {}, "hotel": {}}
+
+    created = datetime.combine(origin, datetime.min.time()) - timedelta(days=30)
+    vehicles, hotels = [], []
+    for n in range(scale["reservations"]):
+        user = rng.choice(usernames)
+        days = rng.choice([1, 1, 2, 2, 3, 3, 4, 5, 7, 10, 14])
+        # Ids únicos y crecientes con el formato anterior (`created_at`), que se sigue aceptando
+        created_at = (created + timedelta(seconds=n, microseconds=rng.randrange(1_000_000))).isoformat()
+        if rng.random() < VEHICLE_SHARE:
+            car, lanes = rng.choice(vehicle_lanes)
+            lane = rng.randrange(len(lanes))
+            start = max(lanes[lane], user_free["vehicle"].get(user, origin)) + timedelta(days=rng.randint(0, 6))
+            end = start + timedelta(days=days)
+            driver = None
+            if car["type"] != "motorcycle" and rng.random() < 0.6:
+                candidates = drivers_by_licence.get(car["licence_type"], [])
+                for candidate in rng.sample(candidates, min(3, len(candidates))):
+                    if driver_free[candidate["name"]] <= start:
+                        driver = candidate["name"]
+                        driver_free[driver] = end
+                        break
+            lanes[lane] = end
+            user_free["vehicle"][user] = end
+            vehicles.append({
+                "id": created_at, "user": user, "car_type": car["type"], "driver": driver,
+                "start": f"{start.isoformat()}T00:00:00", "end": f"{end.isoformat()}T00:00:00",
+                "days": days, "total_price": car["price_per_day"] * days, "created_at": created_at,
+            })
+        else:
+            hotel, room, lanes = rng.choice(hotel_lanes)
+            lane = rng.randrange(len(lanes))
+            start = max(lanes[lane], user_free["hotel"].get(user, origin)) + timedelta(days=rng.randint(0, 6))
+            end = start + timedelta(days=days)
+            pax = rng.randint(1, room["pax"])
+            lanes[lane] = end
+            user_free["hotel"][user] = end
+            hotels.append({
+                "id": created_at, "user": user, "hotel": hotel["name"], "room_type": room["type"],
+                "pax": pax, "start": f"{start.isoformat()}T00:00:00", "end": f"{end.isoformat()}T00:00:00",
+                "days": days, "total_price": hotel["pax_price"] * pax * days, "created_at": created_at,
+            })
+    return {"vehicle_reservations": vehicles, "hotel_reservations": hotels}
+
+
+def generate(out_dir: str, scale: str = "1k", seed: int = 42,
+             start_date: Optional[date] = None) -> Dict[str, int]:
+    """Escribe un conjunto de datos sintético en `out_dir`.
+
+    Con la misma `scale`, `seed` y `start_date` el resultado es idéntico.
+
+    Args:
+        out_dir: Carpeta destino (se crea si no existe).
+        scale: Clave de `SCALES` ('1k', '100k', '1m').
+        seed: Semilla del generador.
+        start_date: Fecha "actual" de los datos (por defecto hoy): hay un año de
+            historial antes y las reservas futuras empiezan después.
+
+    Returns:
+        Dict con el número de usuarios, recursos y reservas generados.
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale '{scale}' (expected one of {', '.join(SCALES)})")
+    params = SCALES[scale]
+    rng = random.Random(seed)
+    start_date = start_date or date.today()
+    os.makedirs(out_dir, exist_ok=True)
+
+    password = _password_hash(rng)
+    usernames = [f"user{i:06d}" for i in range(params["users"])]
+    users = [{"username": "admin", "password": password, "role": "admin"}]
+    users += [{"username": name, "password": password, "role": "user"} for name in usernames]
+    resources = _resources(rng, params)
+    reservations = _reservations(rng, params, resources, usernames, start_date)
+
+    db = DatabaseManager(out_dir, cache_enabled=False)
+    for file_name, data in (("login.json", {"users": users}), ("res_data.json", resources),
+                            ("reservations.json", reservations)):
+        if not db.save_json_file(file_name, data):
+            raise IOError(f"Could not write {os.path.join(out_dir, file_name)}")
+    return {
+        "users": len(users),
+        "hotels": len(resources["hotels"]),
+        "car_types": len(resources["cars"]),
+        "drivers": len(resources["chofer"]),
+        "vehicle_reservations": len(reservations["vehicle_reservations"]),
+        "hotel_reservations": len(reservations["hotel_reservations"]),
+    }
@@ -0,0 +1,198 @@
+"""
+Runner - Ejecuta los escenarios, resume percentiles y compara con una línea base
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app import ReservationApp
+from metrics import METRICS
+from sqlite_store import migrate_json_to_sqlite
+
+from .scenarios import SCENARIOS, ScenarioContext, resolve
+
+# Archivos del conjunto de datos que se copian al directorio de trabajo
+DATA_FILES = ("login.json", "res_data.json", "reservations.json")
+
+# Métricas que se comparan con la línea base
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil `q` (0-100) con interpolación lineal sobre valores ordenados."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(seconds: List[float], ok: int = None) -> Dict[str, float]:
+    """Resume tiempos (en segundos) como milisegundos: min, media, percentiles y max."""
+    values = sorted(s * 1000 for s in seconds)
+    summary = {"count": len(values)}
+    if ok is not None:
+        summary["ok"] = ok
+    if values:
+        summary.update({
+            "min_ms": round(values[0], 4),
+            "mean_ms": round(sum(values) / len(values), 4),
+            "p50_ms": round(percentile(values, 50), 4),
+            "p90_ms": round(percentile(values, 90), 4),
+            "p95_ms": round(percentile(values, 95), 4),
+            "p99_ms": round(percentile(values, 99), 4),
+            "max_ms": round(values[-1], 4),
+        })
+    return summary
+
+
+def run(data_dir: str, scenarios: List[str] = None, iterations: int = 200, seed: int = 1,
+        backend: str = "json", journal: bool = False, metrics: bool = False) -> Dict:
+    """Ejecuta los escenarios sobre una copia de `data_dir`.
+
+    Los datos originales no se modifican: se copian a un directorio temporal
+    (y se migran a SQLite con `backend='sqlite'`). Cada escenario corre
+    `iterations` veces y se mide cada llamada por separado; la salida por
+    consola de la aplicación se descarta. Con `metrics=True` se activa la
+    instrumentación por método y su resumen se añade como `instrumentation`
+    (los tiempos incluyen entonces su coste).
+
+    Returns:
+        `{"meta": {...}, "setup": {...}, "scenarios": {nombre: resumen}}`.
+    """
+    names = resolve(scenarios)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        for file_name in DATA_FILES:
+            shutil.copy(os.path.join(data_dir, file_name), workdir)
+        if backend == "sqlite":
+            migrate_json_to_sqlite(workdir)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            if metrics:
+                METRICS.reset()
+            app = ReservationApp(workdir, backend=backend, journal=journal, metrics=metrics)
+            ctx = ScenarioContext(app, random.Random(seed))
+            loaded = time.perf_counter()
+            # La primera consulta construye los índices en memoria
+            app.reservation_mgr.get_user_reservations(ctx.user())
+            indexed = time.perf_counter()
+
+            results = {}
+            for name in names:
+                scenario = SCENARIOS[name]
+                timings, ok = [], 0
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    ok += bool(scenario(ctx))
+                    timings.append(time.perf_counter() - start)
+                results[name] = summarize(timings, ok)
+
+        reservations = app.reservation_mgr.load_reservations(readonly=True)
+        output = {
+            "meta": {
+                "data_dir": os.path.abspath(data_dir),
+                "backend": backend,
+                "journal": journal,
+                "iterations": iterations,
+                "seed": seed,
+                "users": len(ctx.usernames),
+                "reservations": sum(len(reservations.get(key, []))
+                                    for key in ("vehicle_reservations", "hotel_reservations")),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+            },
+            "setup": {
+                "load_ms": round((loaded - started) * 1000, 3),
+                "index_build_ms": round((indexed - loaded) * 1000, 3),
+            },
+            "scenarios": results,
+        }
+        if metrics:
+            output["instrumentation"] = METRICS.to_json()
+        return output
+    finally:
+        if metrics:
+            METRICS.disable()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.10,
+            min_delta_ms: float = 0.05) -> Tuple[List[Dict], bool]:
+    """Compara los escenarios de `current` con los de `baseline`.
+
+    Hay regresión cuando alguna métrica de `COMPARED_METRICS` supera el valor
+    de la línea base en más de `tolerance` (0.10 = 10 %) y además en más de
+    `min_delta_ms`, para no marcar el ruido de operaciones de microsegundos.
+
+    Returns:
+        (filas, hay_regresión): una fila por escenario y métrica con
+        `scenario`, `metric`, `baseline`, `current`, `ratio` y `status`.
+    """
+    rows = []
+    regressed = False
+    for name, summary in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(name)
+        for metric in COMPARED_METRICS:
+            if base is None or not base.get(metric) or metric not in summary:
+                rows.append({"scenario": name, "metric": metric, "baseline": None,
+                             "current": summary.get(metric), "ratio": None, "status": "new"})
+                continue
+            ratio = summary[metric] / base[metric]
+            delta = summary[metric] - base[metric]
+            if ratio > 1 + tolerance and delta > min_delta_ms:
+                status = "REGRESSION"
+                regressed = True
+            elif ratio < 1 - tolerance and -delta > min_delta_ms:
+                status = "faster"
+            else:
+                status = "ok"
+            rows.append({"scenario": name, "metric": metric, "baseline": base[metric],
+                         "current": summary[metric], "ratio": round(ratio, 3), "status": status})
+    return rows, regressed
+
+
+def print_results(results: Dict) -> None:
+    """Imprime la tabla de percentiles de una corrida."""
+    meta = results["meta"]
+    print(f"Backend: {meta['backend']}{' + journal' if meta['journal'] else ''} | "
+          f"{meta['reservations']} reservations | {meta['users']} users | "
+          f"{meta['iterations']} iterations")
+    print(f"Setup: load {results['setup']['load_ms']} ms, "
+          f"index build {results['setup']['index_build_ms']} ms")
+    print(f"{'scenario':<26}{'ok':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for name, summary in results["scenarios"].items():
+        print(f"{name:<26}{summary.get('ok', 0):>6}{summary.get('p50_ms', 0):>11.3f}"
+              f"{summary.get('p95_ms', 0):>11.3f}{summary.get('p99_ms', 0):>11.3f}"
+              f"{summary.get('max_ms', 0):>11.3f}")
+
+
+def print_comparison(rows: List[Dict]) -> None:
+    """Imprime la comparación con la línea base."""
+    print(f"{'scenario':<26}{'metric':>8}{'baseline':>12}{'current':>12}{'ratio':>8}  status")
+    for row in rows:
+        baseline = "-" if row["baseline"] is None else f"{row['baseline']:.3f}"
+        current = "-" if row["current"] is None else f"{row['current']:.3f}"
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}"
+        print(f"{row['scenario']:<26}{row['metric']:>8}{baseline:>12}{current:>12}{ratio:>8}  {row['status']}")
+
+
+def load_results(path: str) -> Optional[Dict]:
+    """Lee un archivo de resultados; None (con mensaje) si no se puede."""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (IOError, ValueError) as e:
+        print(f"Error reading {path}: {e}")
+        return None
@@ -0,0 +1,124 @@
+"""
+Scenarios - Operaciones de la aplicación que se cronometran
+"""
+import random
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from .generator import PASSWORD
+
+
+class ScenarioContext:
+    """Estado compartido por los escenarios de una corrida.
+
+    Guarda la `ReservationApp` caliente, el generador aleatorio (con semilla) y
+    las listas de usuarios, recursos e ids de reservas de las que se eligen los
+    argumentos de cada operación.
+    """
+
+    def __init__(self, app, rng: random.Random):
+        """Extrae del conjunto de datos lo necesario para elegir argumentos.
+
+        Args:
+            app: `ReservationApp` sobre una copia del conjunto de datos.
+            rng: Generador aleatorio de la corrida.
+        """
+        self.app = app
+        self.rng = rng
+        self.today = date.today()
+        resources = app.resource_mgr.load_resources(readonly=True)
+        users = app.user_mgr.get_all_users()
+        if isinstance(users, dict):
+            users = users.get("users", [])
+        self.usernames = [u.get("username") for u in users if u.get("role") == "user"]
+        self.car_types = [car["type"] for car in resources.get("cars", [])]
+        self.rooms = [(hotel["name"], room["type"], room.get("pax", 1))
+                      for hotel in resources.get("hotels", []) for room in hotel.get("room", [])]
+        reservations = app.reservation_mgr.load_reservations(readonly=True)
+        # Ids a cancelar, en orden aleatorio y sin repetir
+        self.cancellable = [(res["id"], "vehicle") for res in reservations.get("vehicle_reservations", [])]
+        self.cancellable += [(res["id"], "hotel") for res in reservations.get("hotel_reservations", [])]
+        rng.shuffle(self.cancellable)
+
+    def user(self) -> str:
+        """Usuario aleatorio."""
+        return self.rng.choice(self.usernames)
+
+    def dates(self):
+        """Rango futuro aleatorio que cumple la antelación mínima de 72 horas."""
+        start = self.today + timedelta(days=self.rng.randint(4, 365))
+        return start.isoformat(), (start + timedelta(days=self.rng.randint(1, 7))).isoformat()
+
+
+def rent_vehicle(ctx: ScenarioContext) -> bool:
+    """Alquiler de un coche aleatorio (con chofer en la mitad de los casos)."""
+    start, end = ctx.dates()
+    ok, _ = ctx.app.reservation_mgr.rent_vehicle(ctx.user(), ctx.rng.choice(ctx.car_types),
+                                                 start, end, ctx.rng.random() < 0.5)
+    return ok
+
+
+def reserve_hotel(ctx: ScenarioContext) -> bool:
+    """Reserva de una habitación aleatoria."""
+    hotel, room_type, pax = ctx.rng.choice(ctx.rooms)
+    start, end = ctx.dates()
+    ok, _ = ctx.app.reservation_mgr.reserve_hotel(ctx.user(), hotel, room_type, start, end,
+                                                  ctx.rng.randint(1, pax))
+    return ok
+
+
+def find_next_available_slot(ctx: ScenarioContext) -> bool:
+    """Siguiente hueco libre de un coche o una habitación aleatorios."""
+    duration = ctx.rng.randint(1, 7)
+    if ctx.rng.random() < 0.5:
+        car_type = ctx.rng.choice(ctx.car_types)
+        slot = ctx.app.reservation_mgr.find_next_available_slot(car_type, car_type, duration, 'vehicle')
+    else:
+        hotel, room_type, _ = ctx.rng.choice(ctx.rooms)
+        slot = ctx.app.reservation_mgr.find_next_available_slot(hotel, room_type, duration, 'hotel')
+    return slot is not None
+
+
+def get_user_reservations(ctx: ScenarioContext) -> bool:
+    """Listado "View My Reservations" de un usuario aleatorio."""
+    vehicles, hotels = ctx.app.reservation_mgr.get_user_reservations(ctx.user())
+    return bool(vehicles or hotels)
+
+
+def cancel_reservation(ctx: ScenarioContext) -> bool:
+    """Cancelación de una reserva existente (cada id se cancela una sola vez)."""
+    if not ctx.cancellable:
+        return False
+    res_id, res_type = ctx.cancellable.pop()
+    return ctx.app.reservation_mgr.cancel_reservation(res_id, res_type)
+
+
+def login(ctx: ScenarioContext) -> bool:
+    """Login de un usuario aleatorio (incluye PBKDF2)."""
+    return ctx.app.user_mgr.login(ctx.user(), PASSWORD) is not None
+
+
+# Escenarios disponibles, en el orden en que se ejecutan
+SCENARIOS: Dict[str, Callable[[ScenarioContext], bool]] = {
+    "rent_vehicle": rent_vehicle,
+    "reserve_hotel": reserve_hotel,
+    "find_next_available_slot": find_next_available_slot,
+    "get_user_reservations": get_user_reservations,
+    "cancel_reservation": cancel_reservation,
+    "login": login,
+}
+
+
+def resolve(names: List[str] = None) -> List[str]:
+    """Valida nombres de escenarios; None equivale a todos.
+
+    Raises:
+        ValueError: si algún nombre no existe.
+    """
+    if not names:
+        return list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)} "
+                         f"(expected some of {', '.join(SCENARIOS)})")
+    return names
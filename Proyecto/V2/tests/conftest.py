@@ -0,0 +1,53 @@
+"""
+Fixtures comunes: un directorio de datos mínimo y los gestores sobre él
+"""
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# Los módulos de la aplicación se importan sin paquete (igual que en `python app`)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# Una unidad de cada recurso: basta una reserva para agotarlo
+RESOURCES = {
+    "cars": [{"type": "Sedan", "price_per_day": 50, "seats": 5, "count": 1, "licence_type": "B"}],
+    "hotels": [{"name": "Hotel Sol", "location": "Varadero", "pax_price": 30,
+                "room": [{"type": "Double", "count": 1, "pax": 2}]}],
+    "chofer": [{"name": "Ana", "license_type": "B", "CI": "90010112345"},
+               {"name": "Luis", "license_type": "B", "CI": "85030354321"}],
+}
+
+
+def day(offset: int) -> str:
+    """Fecha 'YYYY-MM-DD' a `offset` días de hoy (las reservas piden 72 h de antelación)."""
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Directorio con `login.json`, `res_data.json` y `reservations.json` mínimos."""
+    documents = {
+        "login.json": {"users": []},
+        "res_data.json": RESOURCES,
+        "reservations.json": {"vehicle_reservations": [], "hotel_reservations": []},
+    }
+    for name, data in documents.items():
+        (tmp_path / name).write_text(json.dumps(data, indent=4), encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def managers(data_dir):
+    """`(db, resource_mgr, reservation_mgr)` sobre `data_dir`, backend JSON."""
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir)
+    resources = ResourceManager(db)
+    return db, resources, ReservationManager(db, resources)
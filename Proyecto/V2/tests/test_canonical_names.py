@@ -0,0 +1,81 @@
+"""
+Nombres de recurso: las reservas se guardan y cuentan con los nombres del catálogo
+"""
+import json
+
+from conftest import day
+
+
+def test_vehicle_stored_with_catalog_name(managers):
+    _, _, reservations = managers
+    ok, entry = reservations.rent_vehicle("ana", "sedan", day(10), day(12))
+    assert ok, entry
+    assert json.loads(entry)["car_type"] == "Sedan"
+
+
+def test_hotel_stored_with_catalog_names(managers):
+    _, _, reservations = managers
+    ok, entry = reservations.reserve_hotel("ana", "hotel sol", "DOUBLE", day(10), day(12))
+    assert ok, entry
+    entry = json.loads(entry)
+    assert (entry["hotel"], entry["room_type"]) == ("Hotel Sol", "Double")
+
+
+def test_casing_does_not_overbook(managers):
+    _, _, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    ok, message = reservations.rent_vehicle("luis", "SEDAN", day(11), day(13))
+    assert not ok
+    assert "No available" in message
+    assert reservations.reserve_hotel("ana", "Hotel Sol", "Double", day(10), day(12))[0]
+    assert not reservations.reserve_hotel("luis", "HOTEL SOL", "double", day(11), day(13))[0]
+
+
+def test_legacy_entries_count_for_catalog_resource(data_dir, managers):
+    db, _, reservations = managers
+    legacy = {
+        "vehicle_reservations": [{"id": "v1", "user": "old", "car_type": "sedan", "driver": "Ana",
+                                  "start": day(10), "end": day(12)}],
+        "hotel_reservations": [{"id": "h1", "user": "old", "hotel": "hotel sol", "room_type": "double",
+                                "pax": 1, "start": day(10), "end": day(12)}],
+    }
+    assert db.save_json_file("reservations.json", legacy)
+
+    assert not reservations.rent_vehicle("ana", "Sedan", day(11), day(13))[0]
+    assert not reservations.reserve_hotel("ana", "Hotel Sol", "Double", day(11), day(13))[0]
+    assert reservations.check_ledger() == []
+
+
+def test_ledger_written_before_canonical_keys_is_recounted(managers):
+    from occupancy import OccupancyLedger
+
+    db, _, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert reservations.save_ledger()
+    data = db.load_json_file("occupancy.json")
+    data.pop("format")
+    assert OccupancyLedger.from_json(data, reservations._index_version) is None
+
+
+def test_sqlite_migration_imports_catalog_names(data_dir, managers):
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+    from sqlite_store import migrate_json_to_sqlite
+
+    db, _, _ = managers
+    assert db.save_json_file("reservations.json", {
+        "vehicle_reservations": [{"id": "v1", "user": "old", "car_type": "sedan", "driver": "Ana",
+                                  "start": day(10), "end": day(12)}],
+        "hotel_reservations": [],
+    })
+    migrate_json_to_sqlite(data_dir)
+
+    sql_db = DatabaseManager(data_dir, backend="sqlite")
+    reservations = ReservationManager(sql_db, ResourceManager(sql_db))
+    try:
+        assert reservations.load_reservations()["vehicle_reservations"][0]["car_type"] == "Sedan"
+        assert not reservations.rent_vehicle("ana", "SEDAN", day(11), day(13))[0]
+        assert reservations.check_ledger() == []
+    finally:
+        sql_db.sql.close()
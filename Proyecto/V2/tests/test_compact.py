@@ -0,0 +1,39 @@
+"""
+Comando `compact`: solo toca los archivos si hay journals
+"""
+import os
+
+from conftest import day
+
+
+def snapshot(data_dir):
+    return {name: os.path.getmtime(os.path.join(data_dir, name)) for name in sorted(os.listdir(data_dir))}
+
+
+def test_compact_without_journals_writes_nothing(data_dir, capsys):
+    from app import main
+
+    before = snapshot(data_dir)
+    main(["--base-dir", data_dir, "compact"])
+    assert "Nothing to compact" in capsys.readouterr().out
+    assert snapshot(data_dir) == before
+
+
+def test_compact_folds_existing_journal(data_dir, capsys):
+    from app import ReservationApp, main
+
+    app = ReservationApp(data_dir, journal=True)
+    try:
+        assert app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    finally:
+        app.shutdown()
+    journal = os.path.join(data_dir, "reservations.journal")
+    assert os.path.getsize(journal) > 0
+
+    # Sin --journal: se compacta el journal que existe y nada más
+    main(["--base-dir", data_dir, "compact"])
+    out = capsys.readouterr().out
+    assert "compacted into reservations.json" in out
+    assert "login.json" not in out
+    assert os.path.getsize(journal) == 0
+    assert not os.path.exists(os.path.join(data_dir, "login.journal"))
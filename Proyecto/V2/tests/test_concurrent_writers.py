@@ -0,0 +1,76 @@
+"""
+Escrituras desde varios procesos sobre la misma carpeta de datos
+"""
+import multiprocessing
+import os
+
+import pytest
+
+from conftest import APP_DIR, day
+
+WORKERS = 4
+
+
+def _context():
+    """Procesos con `spawn`: cada uno importa los módulos y abre sus propios archivos."""
+    return multiprocessing.get_context("spawn")
+
+
+def _increment(data_dir: str, times: int) -> None:
+    import sys
+    sys.path.insert(0, APP_DIR)
+    from database import DatabaseManager
+
+    db = DatabaseManager(data_dir)
+
+    def operation(data):
+        data["n"] = data.get("n", 0) + 1
+        return True, data["n"]
+
+    for _ in range(times):
+        ok, _ = db.update_json_file("counter.json", operation, retries=2)
+        assert ok
+
+
+def _book(data_dir: str, user: str, barrier, results) -> None:
+    import sys
+    sys.path.insert(0, APP_DIR)
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir)
+    reservations = ReservationManager(db, ResourceManager(db))
+    barrier.wait()
+    results.put((user, reservations.rent_vehicle(user, "Sedan", day(10), day(12))[0]))
+
+
+def _run(processes):
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+
+def test_no_lost_updates(data_dir):
+    from database import DatabaseManager
+
+    ctx = _context()
+    _run([ctx.Process(target=_increment, args=(data_dir, 25)) for _ in range(WORKERS)])
+    assert DatabaseManager(data_dir).load_json_file("counter.json") == {"n": WORKERS * 25}
+    assert not any(name.endswith(".tmp") for name in os.listdir(data_dir))
+
+
+@pytest.mark.parametrize("attempt", range(3))
+def test_processes_do_not_overbook(data_dir, attempt):
+    from database import DatabaseManager
+
+    ctx = _context()
+    barrier, results = ctx.Barrier(WORKERS), ctx.Queue()
+    _run([ctx.Process(target=_book, args=(data_dir, f"user{i}", barrier, results))
+          for i in range(WORKERS)])
+    booked = [user for user, ok in (results.get(timeout=5) for _ in range(WORKERS)) if ok]
+    assert len(booked) == 1
+    stored = DatabaseManager(data_dir).load_json_file("reservations.json")["vehicle_reservations"]
+    assert [r["user"] for r in stored] == booked
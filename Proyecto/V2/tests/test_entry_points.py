@@ -0,0 +1,18 @@
+"""
+Formas de arrancar la aplicación: `python app`, `python -m app` y `python app/app.py`
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+V2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("args", [["app"], ["-m", "app"], [os.path.join("app", "app.py")]])
+def test_cli_starts(args):
+    result = subprocess.run([sys.executable, *args, "serve", "--help"], cwd=V2_DIR,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "--port" in result.stdout
@@ -0,0 +1,156 @@
+"""
+Group commit: escritura fuera del mutex, errores aislados por llamador y reservas concurrentes
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import day
+
+
+@pytest.fixture
+def db(tmp_path):
+    from database import DatabaseManager
+
+    db = DatabaseManager(str(tmp_path), group_commit_interval=60.0)
+    yield db
+    db.close()
+
+
+def increment(data):
+    data["n"] = data.get("n", 0) + 1
+    return True, data["n"]
+
+
+def test_batch_is_written_once(db):
+    futures = [db.group_commit.submit("counter.json", increment) for _ in range(5)]
+    db.group_commit.flush()
+    assert [f.result() for f in futures] == [(True, n) for n in range(1, 6)]
+    assert db.group_commit.flushes == 1
+    assert db.load_json_file("counter.json") == {"n": 5}
+
+
+def test_failing_operation_keeps_other_waiters(db):
+    first = db.group_commit.submit("counter.json", increment)
+
+    def broken(data):
+        data["n"] = 100  # Modificación a medias: no debe llegar al disco
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        db.group_commit.submit("counter.json", broken)
+    second = db.group_commit.submit("counter.json", increment)
+    db.group_commit.flush()
+    assert first.result() == (True, 1)
+    assert second.result() == (True, 2)
+    assert db.load_json_file("counter.json") == {"n": 2}
+
+
+def test_failing_atomic_operation_keeps_other_waiters(db):
+    first = db.group_commit.submit("counter.json", increment)
+
+    def rejected(data):
+        raise ValueError("invalid")
+
+    with pytest.raises(ValueError):
+        db.group_commit.submit("counter.json", rejected, atomic=True)
+    db.group_commit.flush()
+    assert first.result() == (True, 1)
+    assert db.load_json_file("counter.json") == {"n": 1}
+
+
+def test_write_does_not_block_other_files(db, monkeypatch):
+    writing, release = threading.Event(), threading.Event()
+    write_atomic = db._write_atomic
+
+    def slow_write(json_file, *args, **kwargs):
+        if json_file == "slow.json":
+            writing.set()
+            assert release.wait(10)
+        return write_atomic(json_file, *args, **kwargs)
+
+    monkeypatch.setattr(db, "_write_atomic", slow_write)
+    slow = db.group_commit.submit("slow.json", increment)
+    flusher = threading.Thread(target=db.group_commit.flush, args=("slow.json",))
+    flusher.start()
+    try:
+        assert writing.wait(10)
+        # Con la escritura en curso: otro archivo se encola y el lote sigue visible
+        other = db.group_commit.submit("other.json", increment)
+        assert db.group_commit.pending("slow.json") == {"n": 1}
+    finally:
+        release.set()
+        flusher.join(10)
+    assert slow.result(10) == (True, 1)
+    db.group_commit.flush()
+    assert other.result(10) == (True, 1)
+
+
+def test_same_file_waits_for_write_in_progress(db, monkeypatch):
+    writing, release = threading.Event(), threading.Event()
+    write_atomic = db._write_atomic
+
+    def slow_write(*args, **kwargs):
+        if not writing.is_set():
+            writing.set()
+            assert release.wait(10)
+        return write_atomic(*args, **kwargs)
+
+    monkeypatch.setattr(db, "_write_atomic", slow_write)
+    db.group_commit.submit("counter.json", increment)
+    flusher = threading.Thread(target=db.group_commit.flush)
+    flusher.start()
+    assert writing.wait(10)
+    with ThreadPoolExecutor(1) as pool:
+        second = pool.submit(db.group_commit.submit, "counter.json", increment)
+        release.set()
+        flusher.join(10)
+        future = second.result(10)
+    db.group_commit.flush()
+    assert future.result(10) == (True, 2)
+    assert db.load_json_file("counter.json") == {"n": 2}
+
+
+def test_concurrent_bookings_do_not_overbook(data_dir):
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir, group_commit_interval=0.01)
+    reservations = ReservationManager(db, ResourceManager(db))
+    try:
+        users = [f"user{n}" for n in range(16)]
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(
+                lambda user: reservations.reserve_hotel(user, "Hotel Sol", "Double", day(10), day(12)),
+                users))
+        assert sum(ok for ok, _ in results) == 1
+        stored = DatabaseManager(data_dir, cache_enabled=False).load_json_file("reservations.json")
+        assert len(stored["hotel_reservations"]) == 1
+        assert reservations.check_ledger() == []
+    finally:
+        db.close()
+
+
+def test_bookings_see_pending_batch(data_dir):
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir, group_commit_interval=60.0)
+    reservations = ReservationManager(db, ResourceManager(db))
+    try:
+        with db.deferred_commits() as futures:
+            ok, entry = reservations.rent_vehicle("ana", "Sedan", day(10), day(12))
+            assert ok, entry
+            # Todavía no está en disco, pero ya cuenta para la disponibilidad
+            assert db.group_commit.pending("reservations.json")["vehicle_reservations"]
+            assert not reservations.rent_vehicle("luis", "Sedan", day(11), day(13))[0]
+        db.group_commit.flush()
+        assert [f.result(10)[0] for f in futures] == [True, True]
+        assert json.loads(entry)["id"] in [r["id"] for r in db.load_json_file("reservations.json")
+                                           ["vehicle_reservations"]]
+    finally:
+        db.close()
@@ -0,0 +1,100 @@
+"""
+Journal de reservas: durabilidad de cada cambio y recuperación tras un corte
+"""
+import json
+import os
+
+import pytest
+
+from conftest import day
+
+
+@pytest.fixture
+def journaled(data_dir):
+    """Abre una `ReservationApp` en modo journal sobre `data_dir` (se cierran al final)."""
+    from app import ReservationApp
+
+    apps = []
+
+    def open_app():
+        app = ReservationApp(base_dir=data_dir, journal=True)
+        apps.append(app)
+        return app
+
+    yield open_app
+    for app in apps:
+        app.shutdown()
+
+
+def test_changes_survive_without_rewriting_the_snapshot(data_dir, journaled):
+    app = journaled()
+    snapshot = os.path.join(data_dir, "reservations.json")
+    before = open(snapshot, 'rb').read()
+    ok, entry = app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))
+    assert ok, entry
+    cancelled = json.loads(app.reservation_mgr.reserve_hotel("ana", "Hotel Sol", "Double", day(10), day(12))[1])
+    assert app.reservation_mgr.cancel_reservation(cancelled["id"], "hotel")
+    assert open(snapshot, 'rb').read() == before
+
+    # Un proceso nuevo (tras un corte) reconstruye el estado desde el journal
+    state = journaled().reservation_mgr.load_reservations()
+    assert [r["id"] for r in state["vehicle_reservations"]] == [json.loads(entry)["id"]]
+    assert state["hotel_reservations"] == []
+
+
+def test_recover_discards_torn_tail(data_dir, journaled):
+    app = journaled()
+    assert app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    # Un proceso murió a mitad de escribir un registro
+    torn = b'{"op": "add", "type": "hotel", "entry": {"id": "h'
+    with open(app.journal.journal_path, 'ab') as file:
+        file.write(torn)
+
+    restarted = journaled()
+    assert restarted.journal.last_recovery["torn_bytes"] == len(torn)
+    assert restarted.journal.last_recovery["replayed"] == 1
+    assert restarted.reservation_mgr.load_reservations()["hotel_reservations"] == []
+    # El siguiente registro no queda pegado a la línea rota
+    assert restarted.reservation_mgr.reserve_hotel("ana", "Hotel Sol", "Double", day(10), day(12))[0]
+    state = journaled().reservation_mgr.load_reservations()
+    assert len(state["vehicle_reservations"]) == len(state["hotel_reservations"]) == 1
+
+
+def test_compaction_keeps_pending_records(data_dir, journaled):
+    app = journaled()
+    assert app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert app.journal.compact()
+    assert os.path.getsize(app.journal.journal_path) == 0
+    assert app.reservation_mgr.reserve_hotel("ana", "Hotel Sol", "Double", day(10), day(12))[0]
+
+    restarted = journaled()
+    assert restarted.journal.last_recovery["replayed"] == 1
+    state = restarted.reservation_mgr.load_reservations()
+    assert len(state["vehicle_reservations"]) == len(state["hotel_reservations"]) == 1
+
+
+def test_unreadable_snapshot_is_never_overwritten(data_dir, journaled, capsys):
+    snapshot = os.path.join(data_dir, "reservations.json")
+    with open(snapshot, 'w') as file:
+        file.write('{"vehicle_reservations": [{"id": "v1"')  # truncado por un corte
+    app = journaled()
+    assert app.journal.damaged
+    assert not app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert not app.journal.compact()
+    assert "unreadable" in capsys.readouterr().out
+    assert open(snapshot).read() == '{"vehicle_reservations": [{"id": "v1"'
+
+
+def test_truncated_document_is_damaged_not_empty(data_dir, managers):
+    db, _, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    path = os.path.join(data_dir, "reservations.json")
+    raw = open(path, 'rb').read()
+    with open(path, 'wb') as file:
+        file.write(raw[:len(raw) // 2])
+
+    assert db.load_json_file("reservations.json") == {}
+    assert db.is_damaged("reservations.json")
+    ok, _ = db.update_json_file("reservations.json", lambda data: (True, None))
+    assert not ok
+    assert open(path, 'rb').read() == raw[:len(raw) // 2]
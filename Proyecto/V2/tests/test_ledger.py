@@ -0,0 +1,70 @@
+"""
+Libro de ocupación: comprobación contra un recuento completo y reparación
+"""
+import pytest
+
+from conftest import day
+
+
+@pytest.fixture
+def drifted(data_dir, managers):
+    """Un `occupancy.json` vigente (mismo sello) pero con un día mal contado."""
+    from reservation_manager import ReservationManager
+
+    db, resources, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert reservations.save_ledger()
+    data = db.load_json_file("occupancy.json")
+    data["ledger"][0]["units"][0] += 2
+    assert db.save_json_file("occupancy.json", data)
+    return ReservationManager(db, resources)
+
+
+def test_consistent_ledger(managers):
+    _, _, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert reservations.reserve_hotel("ana", "Hotel Sol", "Double", day(11), day(14))[0]
+    assert reservations.check_ledger() == []
+
+
+def test_check_reports_drift_and_rebuild_repairs_it(drifted):
+    [(key, when, units, expected)] = drifted.check_ledger()
+    assert key[0] == "vehicle" and key[1] == "Sedan"
+    assert (when, units, expected) == (day(10), 3, 1)
+    # Mientras tanto el libro manda: el Sedan parece ocupado
+    assert not drifted.rent_vehicle("luis", "Sedan", day(10), day(11))[0]
+
+    assert drifted.rebuild_ledger()
+    assert drifted.check_ledger() == []
+    assert drifted.rent_vehicle("luis", "Sedan", day(12), day(13))[0]
+
+
+def test_unusable_ledger_file_is_recounted(data_dir, managers):
+    from reservation_manager import ReservationManager
+
+    db, resources, reservations = managers
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert reservations.save_ledger()
+    with open(db.resolve_path("occupancy.json"), 'w') as file:
+        file.write('{"format": 2, "ledger": [')
+    restarted = ReservationManager(db, resources)
+    assert restarted.check_ledger() == []
+    assert not restarted.rent_vehicle("luis", "Sedan", day(11), day(13))[0]
+
+
+def test_check_ledger_command(data_dir, drifted, capsys):
+    from app import ReservationApp, check_ledger
+
+    app = ReservationApp(base_dir=data_dir)
+    try:
+        assert not check_ledger(app)
+        out = capsys.readouterr().out
+        assert f"vehicle Sedan {day(10)}: ledger 3, recount 1" in out
+        assert "--repair" in out
+
+        assert check_ledger(app, repair=True)
+        assert "Ledger rebuilt." in capsys.readouterr().out
+        assert check_ledger(app)
+        assert "consistent" in capsys.readouterr().out
+    finally:
+        app.shutdown()
@@ -0,0 +1,41 @@
+"""
+Búsqueda de disponibilidad: `search_availability` y `bulk_availability`
+"""
+from conftest import day
+
+
+def test_search_sees_bookings_in_any_casing(managers):
+    db, _, reservations = managers
+    legacy = {
+        "vehicle_reservations": [{"id": "v1", "user": "old", "car_type": "SEDAN", "driver": "Ana",
+                                  "start": day(10), "end": day(12)}],
+        "hotel_reservations": [{"id": "h1", "user": "old", "hotel": "HOTEL SOL", "room_type": "double",
+                                "pax": 1, "start": day(10), "end": day(12)}],
+    }
+    assert db.save_json_file("reservations.json", legacy)
+
+    ok, options = reservations.search_availability(day(10), day(12))
+    assert ok, options
+    assert options == []
+    ok, options = reservations.search_availability(day(12), day(14))
+    assert ok, options
+    assert sorted(option["type"] for option in options) == ["hotel", "vehicle"]
+
+    start, end = reservations.parse_date(day(10)), reservations.parse_date(day(12))
+    assert reservations.bulk_availability(start, end, "vehicle") == [("Sedan", "", 1, 0)]
+    assert reservations.bulk_availability(start, end, "hotel") == [("Hotel Sol", "Double", 1, 0)]
+
+
+def test_search_filters_are_case_insensitive(managers):
+    _, _, reservations = managers
+    ok, options = reservations.search_availability(day(10), day(12), filters={"hotel": "hotel sol"})
+    assert ok, options
+    assert [(o["hotel"], o["room_type"]) for o in options] == [("Hotel Sol", "Double")]
+
+
+def test_search_after_booking_typed_in_other_casing(managers):
+    _, _, reservations = managers
+    assert reservations.reserve_hotel("ana", "HOTEL SOL", "double", day(10), day(12))[0]
+    ok, options = reservations.search_availability(day(11), day(13), filters={"type": "hotel"})
+    assert ok, options
+    assert options == []
@@ -0,0 +1,91 @@
+"""
+Codecs de los documentos: ida y vuelta, detección al leer y contenido corrupto
+"""
+import os
+import pickle
+
+import pytest
+
+from conftest import RESOURCES
+from serialization import CODECS, decode_document, detect_codec, get_codec
+
+DOCUMENT = {"vehicle_reservations": [{"id": "v1", "user": "José", "car_type": "Sedan",
+                                      "start": "2026-01-01", "end": "2026-01-03", "price": 50.5}],
+            "hotel_reservations": [], "resources": RESOURCES, "flags": [True, False, None]}
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_round_trip(name):
+    codec = get_codec(name)
+    raw = codec.encode(DOCUMENT)
+    assert codec.decode(raw) == DOCUMENT
+    assert decode_document(raw) == DOCUMENT
+    assert detect_codec(raw).name == ("json" if name.startswith("json") else name)
+
+
+def test_compact_json_is_smaller():
+    assert len(get_codec("json").encode(DOCUMENT)) < len(get_codec("json-pretty").encode(DOCUMENT))
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_truncated_document_raises_value_error(name):
+    raw = get_codec(name).encode(DOCUMENT)
+    for cut in (len(raw) // 2, len(get_codec(name).magic) + 1, len(get_codec(name).magic)):
+        with pytest.raises(ValueError):
+            decode_document(raw[:cut])
+
+
+def test_garbage_after_magic_raises_value_error():
+    for magic in (get_codec("pickle").magic, get_codec("marshal").magic):
+        with pytest.raises(ValueError):
+            decode_document(magic + b"\xff\x00garbage")
+
+
+def test_marshal_from_newer_python_is_rejected():
+    raw = bytearray(get_codec("marshal").encode(DOCUMENT))
+    raw[len(get_codec("marshal").magic)] = 255
+    with pytest.raises(ValueError, match="newer"):
+        decode_document(bytes(raw))
+
+
+def test_pickle_refuses_globals():
+    # Un archivo manipulado no debe poder ejecutar código al leerse
+    raw = get_codec("pickle").magic + pickle.dumps(os.getcwd)
+    with pytest.raises(ValueError):
+        decode_document(raw)
+
+
+def test_database_writes_with_configured_codec_and_autodetects(data_dir):
+    from database import DatabaseManager
+
+    db = DatabaseManager(data_dir, codecs={"reservations.json": "pickle"})
+    assert db.save_json_file("reservations.json", DOCUMENT)
+    path = os.path.join(data_dir, "reservations.json")
+    assert open(path, 'rb').read().startswith(get_codec("pickle").magic)
+    assert db.load_json_file("reservations.json") == DOCUMENT
+
+    # Otro proceso con otra configuración lo lee igual y lo convierte al escribir
+    other = DatabaseManager(data_dir, default_codec="json")
+    assert other.load_json_file("reservations.json") == DOCUMENT
+    ok, _ = other.update_json_file("reservations.json", lambda data: (True, data.update(extra=1)))
+    assert ok
+    assert open(path, 'rb').read().startswith(b'{"')
+    assert db.load_json_file("reservations.json") == dict(DOCUMENT, extra=1)
+
+
+def test_corrupt_binary_document_is_damaged(data_dir):
+    from database import DatabaseManager
+
+    db = DatabaseManager(data_dir, default_codec="marshal")
+    assert db.save_json_file("reservations.json", DOCUMENT)
+    path = os.path.join(data_dir, "reservations.json")
+    raw = open(path, 'rb').read()
+    with open(path, 'wb') as file:
+        file.write(raw[:len(raw) - 10])
+    assert db.load_json_file("reservations.json") == {}
+    assert db.is_damaged("reservations.json")
@@ -0,0 +1,140 @@
+"""
+API HTTP: autenticación de los endpoints y respuestas de error
+"""
+import asyncio
+import json
+
+import pytest
+
+from conftest import day
+
+
+@pytest.fixture
+def app(data_dir):
+    from app import ReservationApp
+
+    app = ReservationApp(base_dir=data_dir)
+    yield app
+    app.shutdown()
+
+
+def dispatch(app, *requests, **options):
+    """Despacha `requests` `(método, ruta, rol_o_None[, cuerpo])` en un `ReservationServer`.
+
+    El rol emite un token para el usuario 'ana' (sin pasar por PBKDF2).
+    Retorna `[(estado, cuerpo)]`.
+    """
+    from server import ReservationServer
+
+    async def run():
+        server = ReservationServer(app, port=0, **options)
+        await server.start()
+        try:
+            responses = []
+            for method, target, role, *body in requests:
+                headers = {}
+                if role is not None:
+                    token, _ = server.sessions.issue("ana", role)
+                    headers["authorization"] = f"Bearer {token}"
+                payload = json.dumps(body[0]).encode() if body else b""
+                status, data, _ = await server._dispatch(method, target, headers, payload)
+                responses.append((int(status), data))
+            return responses
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_resources_require_session(app):
+    [(status, _)] = dispatch(app, ("GET", "/resources", None))
+    assert status == 401
+
+
+def test_resources_hide_driver_ci_from_users(app):
+    responses = dispatch(app, ("GET", "/resources", "user"), ("GET", "/resources?type=chofer", "user"))
+    for status, data in responses:
+        assert status == 200
+        assert data["chofer"] == [{"name": "Ana", "license_type": "B"},
+                                  {"name": "Luis", "license_type": "B"}]
+    # La proyección no toca el caché compartido
+    assert app.resource_mgr.get_all_drivers()[0]["CI"] == "90010112345"
+
+
+def test_resources_show_driver_ci_to_admin(app):
+    [(status, data)] = dispatch(app, ("GET", "/resources", "admin"))
+    assert status == 200
+    assert [d["CI"] for d in data["chofer"]] == ["90010112345", "85030354321"]
+
+
+def test_metrics_require_admin(app):
+    responses = dispatch(app, ("GET", "/metrics", None), ("GET", "/metrics", "user"),
+                         ("GET", "/metrics", "admin"))
+    assert [status for status, _ in responses] == [401, 403, 200]
+    assert "kdf" in responses[2][1]
+
+
+def test_public_metrics_flag(app):
+    [(status, _)] = dispatch(app, ("GET", "/metrics", None), public_metrics=True)
+    assert status == 200
+
+
+def test_internal_errors_are_generic(app, monkeypatch, caplog):
+    def broken(*args):
+        raise RuntimeError("secret path /srv/data/reservations.json")
+
+    monkeypatch.setattr(app.reservation_mgr, "search_availability", broken)
+    [(status, data)] = dispatch(app, ("GET", f"/search?start={day(10)}&end={day(12)}", None))
+    assert status == 500
+    assert data == {"error": "Internal server error"}
+    assert "secret path" in caplog.text  # Queda en el log del servidor
+
+
+def test_cancel_does_not_print(app, capsys):
+    ok, entry = app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))
+    assert ok, entry
+    res_id = json.loads(entry)["id"]
+    capsys.readouterr()
+    responses = dispatch(app, ("DELETE", f"/reservations/{res_id}", "user"),
+                         ("DELETE", f"/reservations/{res_id}", "user"),
+                         ("DELETE", f"/reservations/{res_id}", "admin"))
+    assert [status for status, _ in responses] == [200, 404, 404]
+    assert capsys.readouterr().out == ""
+    assert app.reservation_mgr.get_user_reservations("ana") == ([], [])
+
+
+def test_cancel_reports_save_errors(app, monkeypatch):
+    ok, entry = app.reservation_mgr.rent_vehicle("ana", "Sedan", day(10), day(12))
+    assert ok, entry
+    monkeypatch.setattr(app.reservation_mgr, "_remove_reservations", lambda *args: None)
+    [(status, data)] = dispatch(app, ("DELETE", f"/reservations/{json.loads(entry)['id']}", "user"))
+    assert status == 500
+    assert data == {"error": "Error saving changes"}
+
+
+def test_logout_revokes_the_token_in_every_server(app, data_dir):
+    from app import ReservationApp
+    from server import ReservationServer
+
+    other = ReservationApp(base_dir=data_dir)
+
+    async def run():
+        servers = [ReservationServer(app, port=0, session_secret="secret"),
+                   ReservationServer(other, port=0, session_secret="secret")]
+        for server in servers:
+            await server.start()
+        try:
+            token, _ = servers[0].sessions.issue("ana", "user")
+            headers = {"authorization": f"Bearer {token}"}
+            before = await servers[1]._dispatch("GET", "/resources", headers, b"")
+            logout = await servers[0]._dispatch("POST", "/logout", headers, b"")
+            after = [await server._dispatch("GET", "/resources", headers, b"") for server in servers]
+        finally:
+            for server in servers:
+                await server.close()
+        return [int(status) for status, _, _ in (before, logout, *after)]
+
+    try:
+        assert asyncio.run(run()) == [200, 200, 401, 401]
+    finally:
+        other.shutdown()
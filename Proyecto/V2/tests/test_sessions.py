@@ -0,0 +1,75 @@
+"""
+Tokens de sesión: firma, caducidad y revocación compartida entre procesos
+"""
+from auth import REVOKED_SESSIONS_FILE, SessionTokens
+
+
+def test_issue_and_verify():
+    sessions = SessionTokens("secret")
+    token, _ = sessions.issue("ana", "admin")
+    assert sessions.verify(token) == ("ana", "admin")
+    # Otro firmador con la misma clave acepta el token; con otra clave, no
+    assert SessionTokens("secret").verify(token) == ("ana", "admin")
+    assert SessionTokens("other").verify(token) is None
+
+
+def test_rejects_tampered_and_garbage_tokens():
+    sessions = SessionTokens("secret")
+    token, _ = sessions.issue("ana", "user")
+    payload, _, signature = token.partition(".")
+    forged, _ = sessions.issue("ana", "admin")
+    assert sessions.verify(f"{forged.partition('.')[0]}.{signature}") is None
+    assert sessions.verify(payload) is None
+    for garbage in (None, "", ".", "a.b", "ñ.ñ"):
+        assert sessions.verify(garbage) is None
+
+
+def test_expired_token_is_rejected():
+    sessions = SessionTokens("secret", ttl=-1)
+    token, _ = sessions.issue("ana", "user")
+    assert sessions.verify(token) is None
+    assert sessions.revoke(token) is False
+
+
+def test_revoke_in_process():
+    sessions = SessionTokens("secret")
+    token, _ = sessions.issue("ana", "user")
+    other, _ = sessions.issue("ana", "user")
+    assert sessions.revoke(token) is True
+    assert sessions.verify(token) is None
+    assert sessions.verify(other) == ("ana", "user")
+    assert sessions.revoke(token) is False
+
+
+def test_revocation_is_shared_through_the_data_directory(data_dir):
+    from database import DatabaseManager
+
+    # Dos "procesos": cada uno con su DatabaseManager sobre la misma carpeta
+    first = SessionTokens("secret", db=DatabaseManager(data_dir))
+    second = SessionTokens("secret", db=DatabaseManager(data_dir))
+    token, _ = first.issue("ana", "user")
+    assert second.verify(token) == ("ana", "user")
+
+    assert first.revoke(token) is True
+    assert second.verify(token) is None
+    # Un proceso que arranca después también lo rechaza
+    assert SessionTokens("secret", db=DatabaseManager(data_dir)).verify(token) is None
+
+    revoked = DatabaseManager(data_dir).load_json_file(REVOKED_SESSIONS_FILE)["revoked"]
+    assert list(revoked) == [token.partition(".")[2]]
+
+
+def test_expired_revocations_are_pruned(data_dir):
+    from database import DatabaseManager
+
+    db = DatabaseManager(data_dir)
+    stale = SessionTokens("secret", ttl=0.01, db=db)
+    old, _ = stale.issue("ana", "user")
+    old_sig = old.partition(".")[2]
+    db.update_json_file(REVOKED_SESSIONS_FILE, lambda data: (True, data.update(revoked={old_sig: 1})))
+
+    sessions = SessionTokens("secret", db=db)
+    token, _ = sessions.issue("ana", "user")
+    assert sessions.revoke(token) is True
+    revoked = db.load_json_file(REVOKED_SESSIONS_FILE)["revoked"]
+    assert old_sig not in revoked and token.partition(".")[2] in revoked
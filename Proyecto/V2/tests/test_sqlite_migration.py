@@ -0,0 +1,99 @@
+"""
+`migrate_json_to_sqlite`: importa el estado que ve la aplicación, journals incluidos
+"""
+import json
+import os
+
+from conftest import day
+
+
+def _journal_managers(data_dir):
+    from database import DatabaseManager
+    from journal import ReservationJournal, UserJournal
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+    from user_manager import UserManager
+
+    db = DatabaseManager(data_dir)
+    reservations = ReservationManager(db, ResourceManager(db), journal=ReservationJournal(db))
+    return db, UserManager(db, journal=UserJournal(db)), reservations
+
+
+def _sqlite_managers(data_dir):
+    from database import DatabaseManager
+    from reservation_manager import ReservationManager
+    from resource_manager import ResourceManager
+
+    db = DatabaseManager(data_dir, backend="sqlite")
+    return db, ReservationManager(db, ResourceManager(db))
+
+
+def test_migration_replays_journals(data_dir):
+    from sqlite_store import migrate_json_to_sqlite
+
+    _, users, reservations = _journal_managers(data_dir)
+    assert users.register_user("ana", "secret123")
+    ok, kept = reservations.rent_vehicle("ana", "Sedan", day(10), day(12))
+    assert ok, kept
+    ok, dropped = reservations.reserve_hotel("ana", "Hotel Sol", "Double", day(10), day(12))
+    assert ok, dropped
+    assert reservations.cancel_reservation(json.loads(dropped)["id"])
+    # Los cambios solo están en los journals: los snapshots siguen vacíos
+    assert os.path.getsize(os.path.join(data_dir, "reservations.journal")) > 0
+    assert os.path.getsize(os.path.join(data_dir, "login.journal")) > 0
+
+    counts = migrate_json_to_sqlite(data_dir)
+    assert counts["users"] == 1
+    assert counts["reservations"] == 1
+
+    db, migrated = _sqlite_managers(data_dir)
+    try:
+        stored = migrated.load_reservations()
+        assert [r["id"] for r in stored["vehicle_reservations"]] == [json.loads(kept)["id"]]
+        assert stored["hotel_reservations"] == []
+        assert not migrated.rent_vehicle("luis", "Sedan", day(11), day(13))[0]
+        assert migrated.check_ledger() == []
+    finally:
+        db.sql.close()
+
+
+def test_migration_drops_json_backend_keys(data_dir):
+    from sqlite_store import migrate_json_to_sqlite
+
+    db, _, reservations = _journal_managers(data_dir)
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    assert reservations.journal.compact()
+    # Snapshots escritos por la app: llevan `_version` y `journal_seq`
+    with open(os.path.join(data_dir, "reservations.json"), encoding="utf-8") as file:
+        assert {"_version", "journal_seq"} <= set(json.load(file))
+    assert db.save_json_file("res_data.json", db.load_json_file("res_data.json"))
+
+    migrate_json_to_sqlite(data_dir)
+    sql_db, _ = _sqlite_managers(data_dir)
+    try:
+        for name in ("login.json", "res_data.json", "reservations.json"):
+            data = sql_db.load_json_file(name)
+            assert "_version" not in data and "journal_seq" not in data, name
+        rows = sql_db.sql._query("SELECT name, doc FROM documents")
+        assert all("_version" not in row["doc"] and "journal_seq" not in row["doc"] for row in rows)
+    finally:
+        sql_db.sql.close()
+
+
+def test_migration_leaves_source_files_untouched(data_dir):
+    from sqlite_store import migrate_json_to_sqlite
+
+    _, _, reservations = _journal_managers(data_dir)
+    assert reservations.rent_vehicle("ana", "Sedan", day(10), day(12))[0]
+    names = ("reservations.json", "reservations.journal", "login.json", "res_data.json")
+
+    def contents():
+        result = {}
+        for name in names:
+            with open(os.path.join(data_dir, name), "rb") as file:
+                result[name] = file.read()
+        return result
+
+    before = contents()
+    migrate_json_to_sqlite(data_dir)
+    assert contents() == before